@@ -3,8 +3,10 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import karaoke.routing
+from CafeManager.db import enable_server_pragmas
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CafeManager.settings')
+enable_server_pragmas()
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
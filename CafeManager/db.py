@@ -0,0 +1,46 @@
+"""
+Database Connection Tuning for CafeManager
+Applies SQLite PRAGMAs (WAL journal, busy timeout, page cache, mmap) to every new
+connection so concurrent tills and tablets don't lock each other out.
+
+journal_mode is stored in the database file itself, so it is only switched once a
+server entry point (wsgi.py, asgi.py) has called enable_server_pragmas(). Management
+commands such as check or makemigrations leave the file and its journal alone.
+"""
+from django.conf import settings
+
+# PRAGMAs that persist in the database file rather than lasting for the connection
+PERSISTENT_PRAGMAS = {'journal_mode'}
+
+_serving = False
+
+
+def enable_server_pragmas():
+    """Apply PERSISTENT_PRAGMAS from settings.SQLITE_PRAGMAS to connections opened from now on."""
+    global _serving
+    _serving = True
+
+
+def sqlite_pragmas(connection):
+    """
+    PRAGMAs for a connection: a DATABASES entry's 'PRAGMAS' key overrides settings.SQLITE_PRAGMAS
+    and is applied as given; the settings ones skip PERSISTENT_PRAGMAS until the server starts.
+    """
+    if 'PRAGMAS' in connection.settings_dict:
+        return connection.settings_dict['PRAGMAS']
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if _serving:
+        return pragmas
+    return {name: value for name, value in pragmas.items() if name not in PERSISTENT_PRAGMAS}
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created receiver; a no-op for non-SQLite backends."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(connection)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
@@ -0,0 +1,95 @@
+"""
+Read-Replica Routing for CafeManager
+Reporting views marked with @read_replica read from the 'replica' database alias.
+A session that has just written is pinned to the primary for a few seconds so
+users always see their own changes (read-your-writes). Values shared through the
+cache are always loaded from the primary (see primary()).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA_ALIAS = 'replica'
+PIN_SESSION_KEY = '_replica_pin_until'
+
+# Only app data goes to the replica; sessions, auth and contenttypes always use the primary
+REPLICA_APPS = {'core', 'karaoke'}
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote = ContextVar('wrote', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica(queryset):
+    """Explicitly send a read-only queryset to the replica when one is configured."""
+    return queryset.using(REPLICA_ALIAS) if replica_configured() else queryset
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block, even within a @read_replica view."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not replica_configured():
+            return None
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        # Reads inside a write transaction must see that transaction
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None and model._meta.app_label in REPLICA_APPS:
+            wrote['value'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+def read_replica(view_func):
+    """Route the view's reads to the replica unless the session was just pinned to the primary."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        pinned = getattr(request, 'session', None) and request.session.get(PIN_SESSION_KEY, 0) > time.time()
+        token = _use_replica.set(not pinned)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """Pins a session to the primary for REPLICA_PIN_SECONDS after any request that wrote app data."""
+    def process_request(self, request):
+        request._replica_wrote = {'value': False}
+        request._replica_wrote_token = _wrote.set(request._replica_wrote)
+
+    def process_response(self, request, response):
+        wrote = getattr(request, '_replica_wrote', None)
+        if wrote is not None:
+            _wrote.reset(request._replica_wrote_token)
+            if wrote['value'] and replica_configured() and hasattr(request, 'session'):
+                request.session[PIN_SESSION_KEY] = time.time() + getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        return response
@@ -3,33 +3,66 @@ Multi-Tenant Middleware for CafeManager
 Attaches the user's outlet to each request for convenient access
 """
 from django.utils.deprecation import MiddlewareMixin
-from core.multi_tenant import get_user_outlet
+from core.multi_tenant import (
+    OUTLET_SESSION_KEY, can_switch_to, clear_tenant, get_outlet_by_id, get_user_outlet, set_tenant,
+)
 
 
 class OutletMiddleware(MiddlewareMixin):
     """
     Middleware that attaches the user's outlet to the request object.
     Allows views to access request.outlet directly.
-    
+
+    An outlet chosen with switch_outlet (stored in the session) wins when the user
+    may use it. Otherwise:
     For superusers: defaults to the first outlet with data, or first outlet overall.
     For regular users: uses their employee's outlet.
+
+    It also scopes tenant managers (core.multi_tenant.OutletManager) to that outlet
+    while the view runs. Views marked @tenant_exempt and the admin site are unscoped.
     """
     def process_request(self, request):
-        if request.user.is_authenticated:
-            if request.user.is_superuser:
-                # Superusers can access all outlets - default to the first available
-                from core.models import Outlet
-                from karaoke.models import Room
-                
-                # Try to find outlet with rooms first
-                outlet_with_rooms = Outlet.objects.filter(karaoke_rooms__isnull=False).first()
-                if outlet_with_rooms:
-                    request.outlet = outlet_with_rooms
-                else:
-                    # Fall back to first outlet
-                    request.outlet = Outlet.objects.first()
+        clear_tenant()
+        request.outlet = None
+        if not request.user.is_authenticated:
+            return None
+
+        # An outlet chosen with switch_outlet: one cached primary-key lookup
+        outlet_id = request.session.get(OUTLET_SESSION_KEY)
+        if outlet_id:
+            outlet = get_outlet_by_id(outlet_id)
+            if outlet and can_switch_to(request.user, outlet):
+                request.outlet = outlet
+                return None
+            del request.session[OUTLET_SESSION_KEY]
+
+        if request.user.is_superuser:
+            # Superusers can access all outlets - default to the first available
+            from core.models import Outlet
+
+            # Try to find outlet with rooms first
+            outlet_with_rooms = Outlet.objects.filter(karaoke_rooms__isnull=False).first()
+            if outlet_with_rooms:
+                request.outlet = outlet_with_rooms
             else:
-                request.outlet = get_user_outlet(request.user)
+                # Fall back to first outlet
+                request.outlet = Outlet.objects.first()
+            # Pin the default so later requests take the cached lookup above
+            if request.outlet:
+                request.session[OUTLET_SESSION_KEY] = request.outlet.pk
         else:
-            request.outlet = None
+            request.outlet = get_user_outlet(request.user)
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not request.user.is_authenticated or getattr(view_func, 'tenant_exempt', False):
+            return None
+        if request.resolver_match and request.resolver_match.namespace == 'admin':
+            return None
+        # A superuser with no outlets yet has nothing to leak, so only regular users must have one
+        set_tenant(request.outlet, required=not request.user.is_superuser)
         return None
+
+    def process_response(self, request, response):
+        clear_tenant()
+        return response
@@ -0,0 +1,159 @@
+"""
+Rate Limiting for Public Endpoints
+Token buckets per client IP / room session / outlet, kept in a Django cache so
+every worker sharing that cache shares the limits. IP and room session buckets are
+checked as middleware ahead of sessions and auth, so those rejections never touch
+the database. Outlet buckets are keyed on the signed-in user's outlet, never on
+request input, so they are checked in process_view once auth has run. Anonymous
+clients have no outlet bucket: a shared one would let a single client rotating IPs
+lock every outlet's public pages.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+from core.multi_tenant import get_user_outlet
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+METRICS_KEY = 'rl:rejected'
+# Scopes that need the authenticated user, checked after the auth middleware has run
+USER_SCOPES = {'outlet'}
+
+# Serializes read-modify-write of a bucket within this process
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'30/m' -> (capacity 30, refill 0.5 tokens per second)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()[0]]
+
+
+def get_cache():
+    return caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+
+
+def client_ip(request):
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def scope_value(request, scope, match):
+    """The identity a bucket is keyed on for the given scope, or None when the scope doesn't apply."""
+    if scope == 'ip':
+        return client_ip(request)
+    if scope == 'session':
+        return str(match.kwargs.get('session_id', ''))
+    if scope == 'outlet':
+        # A client-supplied outlet could be rotated for a fresh bucket on every request
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        outlet = getattr(request, 'outlet', None) or get_user_outlet(user)
+        return str(outlet.pk) if outlet else 'none'
+    raise ValueError(f"Unknown rate limit scope: {scope}")
+
+
+def take_token(key, rate, now=None):
+    """
+    Take one token from the bucket stored at key.
+    Returns 0 if allowed, else the seconds until a token is available.
+    """
+    capacity, refill = parse_rate(rate)
+    now = now or time.time()
+    cache = get_cache()
+    with _lock:
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            cache.set(key, (tokens, now), timeout=int(capacity / refill) + 1)
+            return (1 - tokens) / refill
+        cache.set(key, (tokens - 1, now), timeout=int(capacity / refill) + 1)
+    return 0
+
+
+def record_rejection(route, scope):
+    cache = get_cache()
+    for key in (METRICS_KEY, f"{METRICS_KEY}:{route}", f"{METRICS_KEY}:{route}:{scope}"):
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+
+
+def get_rejection_metrics():
+    """Rejected request counts, total and per route/scope."""
+    cache = get_cache()
+    limits = getattr(settings, 'RATE_LIMITS', {})
+    keys = [METRICS_KEY]
+    for route, rules in limits.items():
+        keys.append(f"{METRICS_KEY}:{route}")
+        keys.extend(f"{METRICS_KEY}:{route}:{scope}" for scope, _ in rules)
+    values = cache.get_many(keys)
+    return {
+        'total': values.get(METRICS_KEY, 0),
+        'routes': {
+            route: {
+                'total': values.get(f"{METRICS_KEY}:{route}", 0),
+                'scopes': {scope: values.get(f"{METRICS_KEY}:{route}:{scope}", 0) for scope, _ in rules},
+            }
+            for route, rules in limits.items()
+        },
+    }
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """
+    Applies settings.RATE_LIMITS, a dict of URL name -> [(scope, rate), ...].
+    Every rule of a route must have a token for the request to pass.
+    """
+    def process_request(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return self.check(request, match, lambda scope: scope not in USER_SCOPES)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return self.check(request, request.resolver_match, lambda scope: scope in USER_SCOPES)
+
+    def check(self, request, match, applies):
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True) or match is None:
+            return None
+        rules = getattr(settings, 'RATE_LIMITS', {}).get(match.url_name)
+        if not rules:
+            return None
+
+        for scope, rate in rules:
+            if not applies(scope):
+                continue
+            value = scope_value(request, scope, match)
+            if value is None:
+                continue
+            retry_after = take_token(f"rl:{match.url_name}:{scope}:{value}", rate)
+            if retry_after:
+                record_rejection(match.url_name, scope)
+                logger.warning("Rate limit hit on %s (%s=%s)", match.url_name, scope, value)
+                response = JsonResponse({'success': False, 'error': 'Too many requests'}, status=429)
+                response['Retry-After'] = str(int(retry_after) + 1)
+                return response
+        return None
+
+
+@staff_member_required
+def rate_limit_metrics(request):
+    return JsonResponse(get_rejection_metrics())
@@ -25,7 +25,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'CafeManager.ratelimit.RateLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'CafeManager.db_routers.ReplicaPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -47,6 +49,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.outlet_switcher',
             ],
         },
     },
@@ -55,11 +58,101 @@ TEMPLATES = [
 WSGI_APPLICATION = 'CafeManager.wsgi.application'
 ASGI_APPLICATION = 'CafeManager.asgi.application'
 
+# Database engine: 'sqlite' (single server, default) or 'postgres' (multi-outlet / multi-worker)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds the sqlite3 driver waits on a locked database before raising
+            'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+            # Take the write lock at BEGIN so readers upgrading to writers can't deadlock
+            'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        },
+    }
+}
+
+if DB_ENGINE == 'postgres':
+    # Use either psycopg's connection pool (DB_POOL_MAX_SIZE > 0) or persistent
+    # connections (DB_CONN_MAX_AGE seconds); Django doesn't allow both at once.
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'cafemanager'),
+            'USER': os.environ.get('POSTGRES_USER', 'cafemanager'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': DB_POOL_MAX_SIZE,
+                    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL_MAX_SIZE else {},
+        }
     }
+
+# Optional read replica for reporting views marked with CafeManager.db_routers.read_replica.
+# Postgres: set POSTGRES_REPLICA_HOST. Local stand-in: set SQLITE_REPLICA_NAME and refresh it
+# with `manage.py sync_sqlite_replica`.
+if DB_ENGINE == 'postgres' and os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif DB_ENGINE == 'sqlite' and os.environ.get('SQLITE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['SQLITE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['CafeManager.db_routers.ReplicaRouter']
+
+# After a request writes, that session reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
+# Applied on every new SQLite connection by CafeManager.db.apply_sqlite_pragmas; journal_mode
+# only once the server is running (see CafeManager.db.enable_server_pragmas)
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 20000)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),  # negative = KiB, so ~20 MB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 134217728)),  # 128 MB
+    'temp_store': 'MEMORY',
+}
+
+# Cache backend: 'locmem' (per process), 'file' (shared by workers on one host) or 'redis'
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cafemanager',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'cafemanager'),
+        'TIMEOUT': 300,
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -82,4 +175,24 @@ LOGIN_URL = '/admin/login/' # Temporary login redirect
 
 import os
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Notification outbox (see karaoke/notifications.py); run `manage.py dispatch_notifications --loop`
+KARAOKE_NOTIFICATION_BACKEND = os.environ.get('KARAOKE_NOTIFICATION_BACKEND', 'karaoke.notifications.EmailBackend')
+KARAOKE_NOTIFICATION_RECIPIENTS = ['sita@chillokay.com']
+KARAOKE_NOTIFICATION_FROM = 'system@chillokay.com'
+
+# Rate limits for unauthenticated endpoints (see CafeManager/ratelimit.py)
+# URL name -> [(scope, rate)], scope is 'ip', 'session' (URL session_id) or 'outlet' (the
+# signed-in user's outlet; not applied to anonymous clients)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_CACHE = 'default'
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', '0') == '1'
+BOOKING_RATE_LIMITS = [('ip', '5/m'), ('outlet', '60/m')]
+RATE_LIMITS = {
+    'submit_booking_request': BOOKING_RATE_LIMITS,
+    'submit_booking_legacy': BOOKING_RATE_LIMITS,
+    'check_availability': [('ip', '60/m')],
+    'tablet_order': [('ip', '60/m'), ('session', '120/m')],
+    'get_session_bill': [('ip', '120/m'), ('session', '60/m')],
+}
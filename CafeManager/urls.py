@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
+from CafeManager.ratelimit import rate_limit_metrics
 
 urlpatterns = [
     # 1. Admin Site
@@ -19,9 +20,12 @@ urlpatterns = [
     
     # 5. Redirect after login (prevents the 'accounts/profile/' 404)
     path('accounts/profile/', lambda r: redirect('dashboard')),
+
+    # 6. Operational metrics (staff only)
+    path('metrics/rate-limits/', rate_limit_metrics, name='rate_limit_metrics'),
 ]
 
-# 6. Serving Media and Static Files
+# 7. Serving Media and Static Files
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
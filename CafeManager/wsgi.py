@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from CafeManager.db import enable_server_pragmas
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CafeManager.settings')
+enable_server_pragmas()
 
 application = get_wsgi_application()
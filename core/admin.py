@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Outlet, Employee, Product, SaleTransaction, SaleItem, Expense, InventoryLog, Customer, CreditPayment, Attendance, Payroll
+from .models import Outlet, Employee, Product, ProductComponent, ProductVariant, ModifierGroup, Modifier, Tax, SaleTransaction, SaleItem, SaleTaxLine, Expense, InventoryLog, Customer, CreditPayment, Attendance, Payroll, OutletDailyRollup, StockSnapshot, InventoryLogArchive, InventoryMonthlySummary, Supplier, ProductForecast, PurchaseOrder, PurchaseOrderLine
 
 @admin.register(Outlet)
 class OutletAdmin(admin.ModelAdmin):
@@ -13,21 +13,59 @@ class EmployeeAdmin(admin.ModelAdmin):
     list_filter = ('outlet', 'payment_type', 'is_active')
     search_fields = ('name', 'phone', 'email')
 
+class ProductComponentInline(admin.TabularInline):
+    model = ProductComponent
+    fk_name = 'product'
+    exclude = ('outlet',)
+    extra = 0
+    raw_id_fields = ('component',)
+
+class ProductVariantInline(admin.TabularInline):
+    model = ProductVariant
+    exclude = ('outlet',)
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'sku', 'category', 'selling_price', 'current_stock_level', 'outlet')
-    list_filter = ('outlet', 'category')
+    list_display = ('name', 'sku', 'category', 'selling_price', 'current_stock_level', 'low_stock_threshold', 'optimal_stock', 'supplier', 'outlet')
+    list_filter = ('outlet', 'category', 'supplier')
+    list_select_related = ('supplier', 'outlet')
     search_fields = ('name', 'sku')
+    filter_horizontal = ('modifier_groups', 'taxes')
+    readonly_fields = ('stock_remainder',)
+    inlines = [ProductVariantInline, ProductComponentInline]
+
+class ModifierInline(admin.TabularInline):
+    model = Modifier
+    exclude = ('outlet',)
+    extra = 0
+
+@admin.register(ModifierGroup)
+class ModifierGroupAdmin(admin.ModelAdmin):
+    list_display = ('name', 'outlet')
+    list_filter = ('outlet',)
+    search_fields = ('name',)
+    inlines = [ModifierInline]
 
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
     extra = 0
 
+class SaleTaxLineInline(admin.TabularInline):
+    model = SaleTaxLine
+    extra = 0
+    readonly_fields = ('tax', 'name', 'rate', 'taxable_amount', 'amount')
+
 @admin.register(SaleTransaction)
 class SaleTransactionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'date', 'outlet', 'total_amount', 'payment_method', 'status')
+    list_display = ('id', 'date', 'outlet', 'subtotal', 'tax_total', 'total_amount', 'payment_method', 'status')
     list_filter = ('outlet', 'status', 'payment_method')
-    inlines = [SaleItemInline]
+    inlines = [SaleItemInline, SaleTaxLineInline]
+
+@admin.register(Tax)
+class TaxAdmin(admin.ModelAdmin):
+    list_display = ('name', 'rate', 'applies_to_rooms', 'is_active', 'outlet')
+    list_filter = ('outlet', 'is_active')
 
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
@@ -36,10 +74,35 @@ class ExpenseAdmin(admin.ModelAdmin):
 
 @admin.register(InventoryLog)
 class InventoryLogAdmin(admin.ModelAdmin):
-    list_display = ('product', 'action', 'quantity_changed', 'created_at', 'outlet')
-    list_filter = ('outlet', 'action', 'created_at')
+    list_display = ('product', 'action', 'reason', 'quantity_changed', 'created_at', 'outlet')
+    list_filter = ('outlet', 'action', 'reason', 'created_at')
     search_fields = ('product__name', 'reference')
     readonly_fields = ('created_at', 'previous_level', 'new_level')
+    # Large tables: join product/outlet in the page query, skip the unfiltered COUNT(*)
+    list_select_related = ('product', 'outlet')
+    show_full_result_count = False
+    raw_id_fields = ('product',)
+
+@admin.register(InventoryLogArchive)
+class InventoryLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'action', 'quantity_changed', 'created_at', 'outlet')
+    list_filter = ('outlet', 'action', 'created_at')
+    search_fields = ('product__name', 'reference')
+    list_select_related = ('product', 'outlet')
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(InventoryMonthlySummary)
+class InventoryMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ('month', 'outlet', 'product', 'action', 'quantity_changed', 'entry_count')
+    list_filter = ('outlet', 'action', 'month')
+    search_fields = ('product__name',)
+    list_select_related = ('product', 'outlet')
 
 # --- NEW: CUSTOMER & CREDIT ADMIN ---
 
@@ -66,4 +129,44 @@ class PayrollAdmin(admin.ModelAdmin):
     list_display = ('employee', 'outlet', 'year', 'month', 'total_earnings', 'net_pay', 'status')
     list_filter = ('outlet', 'status', 'year', 'month')
     search_fields = ('employee__name',)
-    readonly_fields = ('total_hours_worked', 'base_amount', 'commission_amount', 'total_earnings', 'calculated_at')
\ No newline at end of file
+    readonly_fields = ('total_hours_worked', 'base_amount', 'commission_amount', 'total_earnings', 'calculated_at')
+
+@admin.register(OutletDailyRollup)
+class OutletDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'outlet', 'pos_sales', 'karaoke_revenue', 'expenses', 'transaction_count', 'session_count', 'built_at')
+    list_filter = ('outlet', 'date')
+    readonly_fields = ('built_at',)
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'outlet', 'product', 'quantity', 'unit_cost', 'taken_at')
+    list_filter = ('outlet', 'date')
+    list_select_related = ('outlet', 'product')
+    search_fields = ('product__name', 'product__sku')
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'outlet', 'phone', 'email', 'lead_time_days')
+    list_filter = ('outlet',)
+    search_fields = ('name',)
+
+@admin.register(ProductForecast)
+class ProductForecastAdmin(admin.ModelAdmin):
+    list_display = ('product', 'outlet', 'daily_velocity', 'days_of_cover', 'forecast_demand', 'suggested_order', 'computed_at')
+    list_filter = ('outlet',)
+    search_fields = ('product__name',)
+    list_select_related = ('product', 'outlet')
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model = PurchaseOrderLine
+    extra = 0
+    raw_id_fields = ('product',)
+    readonly_fields = ('quantity_received',)
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'outlet', 'supplier', 'status', 'created_at', 'received_at')
+    list_filter = ('outlet', 'status', 'supplier')
+    list_select_related = ('outlet', 'supplier')
+    readonly_fields = ('created_at', 'received_at')
+    inlines = [PurchaseOrderLineInline]
@@ -2,4 +2,26 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from CafeManager.db import apply_sqlite_pragmas
+        from core.cache import watch_model, watch_m2m
+        from core.models import Outlet, Product, ProductComponent, ProductVariant, ModifierGroup, Modifier, Tax, Customer, SaleTransaction, SaleItem, Expense, Payroll
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
+        watch_model(Product, ['catalog', 'menu', 'dashboard', 'finance'])
+        watch_model(ProductVariant, ['menu'])
+        watch_model(ModifierGroup, ['menu'])
+        watch_model(Modifier, ['menu'])
+        watch_m2m(Product.modifier_groups.through, ['menu'])
+        watch_model(ProductComponent, ['bom', 'dashboard'])
+        watch_model(Tax, ['tax'])
+        watch_m2m(Product.taxes.through, ['tax'])
+        watch_model(Customer, ['customers'])
+        watch_model(Outlet, ['outlets'], outlet_attr='pk')
+        watch_model(SaleTransaction, ['finance', 'dashboard'])
+        watch_model(SaleItem, ['finance'], outlet_attr='sale.outlet_id')
+        watch_model(Expense, ['finance'])
+        watch_model(Payroll, ['finance'])
@@ -0,0 +1,133 @@
+"""
+Cache Utilities for CafeManager
+Outlet-namespaced cache keys with versioned invalidation and a cache-aside helper.
+
+Every cached value lives under a (namespace, outlet) pair whose version number is
+part of the key. Invalidating a namespace just bumps its version, so stale entries
+are never read again and simply expire. watch_model() wires that bump to a model's
+post_save/post_delete signals, watch_m2m() to a many-to-many relation's m2m_changed.
+"""
+from functools import wraps
+from operator import attrgetter
+
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from CafeManager.db_routers import primary
+
+DEFAULT_TIMEOUT = 300
+
+
+def get_cache():
+    return caches['default']
+
+
+def _outlet_part(outlet):
+    """Accept an Outlet, an outlet id or None."""
+    if outlet is None:
+        return 'all'
+    return str(getattr(outlet, 'pk', outlet))
+
+
+def _version_key(namespace, outlet):
+    return f"ns:{namespace}:{_outlet_part(outlet)}:v"
+
+
+def namespace_version(namespace, outlet):
+    """Current version of a namespace for an outlet (starts at 1)."""
+    cache = get_cache()
+    key = _version_key(namespace, outlet)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def make_key(namespace, outlet, *parts):
+    """Build a versioned, outlet-scoped cache key."""
+    version = namespace_version(namespace, outlet)
+    suffix = ':'.join(str(p) for p in parts)
+    return f"{namespace}:{_outlet_part(outlet)}:v{version}:{suffix}"
+
+
+def invalidate(namespace, outlet):
+    """Bump a namespace's version so every key built from it goes stale."""
+    cache = get_cache()
+    key = _version_key(namespace, outlet)
+    if not cache.add(key, 2, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+
+def cache_aside(namespace, outlet, parts, loader, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for (namespace, outlet, parts), calling loader() on a miss.
+    The loader reads from the primary: a value read from a lagging replica would be served
+    to every user until it expires.
+    """
+    cache = get_cache()
+    key = make_key(namespace, outlet, *parts)
+    sentinel = object()
+    value = cache.get(key, sentinel)
+    if value is sentinel:
+        with primary():
+            value = loader()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cached(namespace, timeout=DEFAULT_TIMEOUT):
+    """
+    Decorator for functions whose first argument is the outlet.
+    Remaining positional arguments become part of the key, so they must be simple values.
+
+        @cached('catalog')
+        def product_categories(outlet): ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(outlet, *args):
+            return cache_aside(namespace, outlet, (func.__name__, *args), lambda: func(outlet, *args), timeout)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def watch_model(model, namespaces, outlet_attr='outlet_id'):
+    """
+    Invalidate the given namespaces for the instance's outlet whenever the model is saved or deleted.
+    outlet_attr may be a dotted path for models without their own outlet, e.g. 'sale.outlet_id'.
+    """
+    get_outlet_id = attrgetter(outlet_attr)
+
+    def handler(sender, instance, **kwargs):
+        try:
+            outlet_id = get_outlet_id(instance)
+        except (AttributeError, ObjectDoesNotExist):
+            outlet_id = None
+        for namespace in namespaces:
+            invalidate(namespace, outlet_id)
+
+    dispatch_uid = f"cache_watch_{model._meta.label_lower}"
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=dispatch_uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+
+def watch_m2m(through, namespaces, outlet_attr='outlet_id'):
+    """
+    Invalidate the given namespaces when a many-to-many relation changes (add/remove/clear from
+    either side). outlet_attr is read from the instance whose relation changed.
+    """
+    get_outlet_id = attrgetter(outlet_attr)
+
+    def handler(sender, instance, action, **kwargs):
+        if not action.startswith('post_'):
+            return
+        for namespace in namespaces:
+            invalidate(namespace, get_outlet_id(instance))
+
+    m2m_changed.connect(handler, sender=through, weak=False, dispatch_uid=f"cache_watch_{through._meta.label_lower}")
@@ -0,0 +1,204 @@
+"""
+POS Catalog for CafeManager
+Product variants and modifiers: Loyverse CSV import, the cached POS menu and server-side cart pricing.
+
+pos_catalog builds an outlet's menu as one pre-joined structure: each product once, the
+variants and modifier group ids of the products that have any, and every modifier group
+once. It is cached per outlet under the 'menu' namespace, which Product, ProductVariant,
+ModifierGroup and Modifier changes invalidate. Stock levels change on every sale, so they
+are left out and pos_products merges them in with a single query.
+
+Checkout never trusts prices from the client: price_cart prices every line from the cached
+price_list and product_options maps in one Decimal pass, without a per-line query, and
+rejects carts whose prices or total don't match.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from django.db import transaction
+
+from core.cache import cached, invalidate
+from core.inventory import normalise_sku
+from core.models import Modifier, ModifierGroup, Product, ProductVariant, SaleItem
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+OPTION_COLUMNS = ('Option 1 value', 'Option 2 value', 'Option 3 value')
+MODIFIER_COLUMN = re.compile(r'^Modifier - "(.+)"$')
+
+
+@cached('menu')
+def pos_catalog(outlet):
+    """
+    {'products': [{id, name, category, price, image, favorite}] by name,
+     'options': {product id: {'variants': [{id, name, price}], 'modifier_groups': [group ids]}},
+     'modifier_groups': {group id: {'name', 'modifiers': [{id, name, price}]}}}
+    """
+    image_storage = Product._meta.get_field('image').storage
+    products = [
+        {'id': product_id, 'name': name, 'category': category, 'price': price,
+         'image': image_storage.url(image) if image else '', 'favorite': favorite}
+        for product_id, name, category, price, image, favorite in Product.all_outlets.filter(outlet=outlet).order_by('name')
+        .values_list('id', 'name', 'category', 'selling_price', 'image', 'is_favorite')
+    ]
+    prices = {product['id']: product['price'] for product in products}
+
+    options = {}
+    for variant_id, product_id, name, price in ProductVariant.all_outlets.filter(outlet=outlet).values_list('id', 'product_id', 'name', 'selling_price'):
+        entry = options.setdefault(product_id, {'variants': [], 'modifier_groups': []})
+        entry['variants'].append({'id': variant_id, 'name': name, 'price': prices.get(product_id) if price is None else price})
+    for product_id, group_id in Product.modifier_groups.through.objects.filter(product__outlet=outlet).values_list('product_id', 'modifiergroup_id'):
+        options.setdefault(product_id, {'variants': [], 'modifier_groups': []})['modifier_groups'].append(group_id)
+
+    groups = {group_id: {'name': name, 'modifiers': []} for group_id, name in ModifierGroup.all_outlets.filter(outlet=outlet).values_list('id', 'name')}
+    for group_id, modifier_id, name, price in Modifier.all_outlets.filter(outlet=outlet).values_list('group_id', 'id', 'name', 'price'):
+        groups[group_id]['modifiers'].append({'id': modifier_id, 'name': name, 'price': price})
+    return {'products': products, 'options': options, 'modifier_groups': groups}
+
+
+def pos_products(outlet):
+    """pos_catalog products with their current stock levels merged in."""
+    stock = dict(Product.all_outlets.filter(outlet=outlet).values_list('id', 'current_stock_level'))
+    return [{**product, 'stock': stock.get(product['id'], 0)} for product in pos_catalog(outlet)['products']]
+
+
+@cached('menu')
+def product_options(outlet):
+    """
+    {product id: {'variants': {variant id: (price, cost)}, 'modifiers': {modifier id: price}}} for
+    checking cart lines server-side. A None price or cost means the product's own.
+    """
+    options = {}
+    for variant_id, product_id, price, cost in ProductVariant.all_outlets.filter(outlet=outlet).values_list('id', 'product_id', 'selling_price', 'cost_price'):
+        options.setdefault(product_id, {'variants': {}, 'modifiers': {}})['variants'][variant_id] = (price, cost)
+    for product_id, modifier_id, price in Modifier.all_outlets.filter(outlet=outlet, group__products__isnull=False).values_list('group__products', 'id', 'price'):
+        options.setdefault(product_id, {'variants': {}, 'modifiers': {}})['modifiers'][modifier_id] = price
+    return options
+
+
+def check_line_options(options, product_id, variant_id=None, modifier_ids=()):
+    """
+    Validate a cart line's variant and modifier ids against product_options(). Returns
+    (variant id or None, sorted modifier ids); raises ValueError for ids the product doesn't offer.
+    """
+    offered = options.get(product_id, {'variants': {}, 'modifiers': {}})
+    variant_id = int(variant_id) if variant_id else None
+    modifier_ids = sorted({int(modifier_id) for modifier_id in modifier_ids or ()})
+    if variant_id is not None and variant_id not in offered['variants']:
+        raise ValueError(f"Variant {variant_id} is not offered on product {product_id}")
+    unknown = [modifier_id for modifier_id in modifier_ids if modifier_id not in offered['modifiers']]
+    if unknown:
+        raise ValueError(f"Modifiers {unknown} are not offered on product {product_id}")
+    return variant_id, modifier_ids
+
+
+@cached('menu')
+def price_list(outlet):
+    """{product id: (selling price, cost price)} for pricing carts server-side."""
+    return {
+        product_id: (price, cost)
+        for product_id, price, cost in Product.all_outlets.filter(outlet=outlet).values_list('id', 'selling_price', 'cost_price')
+    }
+
+
+def _money(value):
+    try:
+        return Decimal(str(value).strip()).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount {value!r}")
+
+
+def price_cart(outlet, items, claimed_total=None):
+    """
+    Price POS cart lines ({'id', 'quantity', 'variant_id', 'modifier_ids', 'price'}) from the
+    cached menu. A line's unit price is its variant's price (or the product's) plus its
+    modifiers'; the client's 'price' and claimed_total are only compared against it.
+    Returns (unsaved SaleItems without a sale, modifier ids per line, subtotal); raises
+    ValueError for malformed lines, unknown products, bad quantities or options, and mismatched prices.
+    """
+    prices, options = price_list(outlet), product_options(outlet)
+    sale_items, line_modifiers, subtotal = [], [], ZERO
+    for item in items:
+        try:
+            product_id, quantity = int(item['id']), int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Invalid cart line")
+        if product_id not in prices:
+            raise ValueError(f"Product {product_id} is not on the menu")
+        if quantity < 1:
+            raise ValueError(f"Invalid quantity {quantity} for product {product_id}")
+        variant_id, modifier_ids = check_line_options(options, product_id, item.get('variant_id'), item.get('modifier_ids'))
+        price, cost = prices[product_id]
+        if variant_id is not None:
+            variant_price, variant_cost = options[product_id]['variants'][variant_id]
+            price = price if variant_price is None else variant_price
+            cost = cost if variant_cost is None else variant_cost
+        price += sum((options[product_id]['modifiers'][modifier_id] for modifier_id in modifier_ids), ZERO)
+        if item.get('price') is not None and _money(item['price']) != price:
+            raise ValueError(f"Price of product {product_id} has changed, please reload the menu")
+        sale_items.append(SaleItem(product_id=product_id, variant_id=variant_id, quantity=quantity, price=price, unit_cost=cost))
+        line_modifiers.append(modifier_ids)
+        subtotal += price * quantity
+    if claimed_total not in (None, '') and _money(claimed_total) != subtotal:
+        raise ValueError("Cart total does not match the menu prices, please reload the menu")
+    return sale_items, line_modifiers, subtotal
+
+
+def _value(value):
+    return None if pd.isna(value) else value
+
+
+def import_options(outlet, df):
+    """
+    Load variants and modifier groups from a Loyverse items export. Each row of a Handle with
+    'Option 1..3 value' set becomes a variant of the product named on the Handle's first row,
+    upserted by name so past sales keep their variant. The 'Modifier - "..."' Y/N columns
+    decide which modifier groups each product offers; the modifiers themselves are not in
+    the export and are kept in the admin. Returns (variants, modifier group links).
+    """
+    products = dict(Product.all_outlets.filter(outlet=outlet).values_list('name', 'id'))
+    names = df.groupby('Handle', dropna=False)['Name'].transform('first')
+
+    variants, positions = {}, {}
+    option_columns = [column for column in OPTION_COLUMNS if column in df.columns]
+    option_rows = df[df[option_columns].notna().any(axis=1)] if option_columns else df.iloc[:0]
+    for index, row in option_rows.iterrows():
+        product_id = products.get(names[index])
+        if product_id is None:
+            continue
+        name = ' / '.join(str(row[column]).strip() for column in option_columns if pd.notna(row[column]))
+        sku, price, cost = _value(row.get('SKU')), _value(row.get('Price [Chillo]')), _value(row.get('Cost'))
+        positions[product_id] = positions.get(product_id, -1) + 1
+        variants[(product_id, name)] = ProductVariant(
+            outlet=outlet, product_id=product_id, name=name,
+            sku=normalise_sku(sku) if sku is not None else None,
+            selling_price=price, cost_price=cost, position=positions[product_id],
+        )
+
+    group_columns = {}
+    for column in df.columns:
+        match = MODIFIER_COLUMN.match(column)
+        if match:
+            group_columns[match.group(1)] = column
+    named = df[df['Name'].notna()]
+    through = Product.modifier_groups.through
+
+    with transaction.atomic():
+        ProductVariant.all_outlets.bulk_create(
+            variants.values(), update_conflicts=True,
+            unique_fields=['product', 'name'], update_fields=['sku', 'selling_price', 'cost_price', 'position'],
+        )
+        ModifierGroup.all_outlets.bulk_create([ModifierGroup(outlet=outlet, name=name) for name in group_columns], ignore_conflicts=True)
+        groups = dict(ModifierGroup.all_outlets.filter(outlet=outlet, name__in=group_columns).values_list('name', 'id'))
+        links = {
+            (products[name], groups[group])
+            for group, column in group_columns.items()
+            for name, flag in zip(named['Name'], named[column])
+            if name in products and str(flag).strip().upper() == 'Y'
+        }
+        # Only the groups in the file are replaced; ones set up in the admin alone are kept
+        through.objects.filter(product_id__in=[products[name] for name in named['Name'] if name in products], modifiergroup_id__in=groups.values()).delete()
+        through.objects.bulk_create([through(product_id=product_id, modifiergroup_id=group_id) for product_id, group_id in links])
+    invalidate('menu', outlet.pk)
+    return len(variants), len(links)
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from core.reporting import owner_outlets
+
+
+def outlet_switcher(request):
+    """Outlets the user can switch between; only queried when a template uses it."""
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return {}
+    return {'switchable_outlets': SimpleLazyObject(lambda: list(owner_outlets(user).only('id', 'name')))}
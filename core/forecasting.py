@@ -0,0 +1,180 @@
+"""
+Demand Forecasting for CafeManager
+Nightly batch (manage.py forecast_demand) that turns sales history into reorder suggestions.
+
+build_daily_sales folds closed days of SaleItem and RoomOrderItem quantities into
+ProductDailySales, starting from each outlet's last day already built, so each run only
+reads new sales. compute_forecasts then loads an outlet's recent daily sales into a
+product x day matrix, with composites (cocktails, set meals) expanded into the stocked
+products their recipes use, and works out, for all stocked products at once: recent velocity, the
+outlet's weekday profile, a year-on-year seasonal factor, expected demand over the
+supplier's lead time plus a review period, days of cover and a suggested order.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.inventory import bill_of_materials, stocked_products
+from core.models import ProductDailySales, ProductForecast, SaleItem
+
+VELOCITY_DAYS = 28        # recent window for units per day
+PROFILE_WEEKS = 12        # history used for the weekday profile
+SEASON_DAYS = 14          # window compared with the same weeks last year
+SEASON_LIMITS = (0.5, 2.0)
+REVIEW_DAYS = 7           # stock should last until the next ordering round
+DEFAULT_LEAD_DAYS = 2     # products without a supplier
+REBUILD_DAYS = 2          # recently built days are re-read to pick up voids and late edits
+BATCH_SIZE = 1000
+
+
+def _since_cursors(cursors, outlet_field, date_field):
+    """Q for rows of outlets never built, or from their outlet's cursor day ({day: [outlet ids]}) onwards."""
+    started = [outlet_id for outlet_ids in cursors.values() for outlet_id in outlet_ids]
+    condition = ~Q(**{f'{outlet_field}__in': started})
+    for since, outlet_ids in cursors.items():
+        condition |= Q(**{f'{outlet_field}__in': outlet_ids, f'{date_field}__gte': since})
+    return condition
+
+
+def build_daily_sales(until=None, outlets=None):
+    """
+    Write ProductDailySales for closed days up to `until` (default yesterday). Each outlet
+    is read from REBUILD_DAYS before its own last built day, or over its whole history
+    on its first run. Returns the number of rows written.
+    """
+    from karaoke.models import RoomOrderItem
+
+    until = until or timezone.localdate() - timedelta(days=1)
+    built = ProductDailySales.all_outlets.all()
+    # Room session checkouts repeat their RoomOrderItem lines as SaleItems; count them once
+    sales = SaleItem.all_outlets.filter(
+        product__isnull=False, sale__outlet__isnull=False, sale__room_session__isnull=True, sale__date__date__lte=until,
+    )
+    orders = RoomOrderItem.all_outlets.filter(outlet__isnull=False, order__created_at__date__lte=until)
+    if outlets is not None:
+        built = built.filter(outlet__in=outlets)
+        sales = sales.filter(sale__outlet__in=outlets)
+        orders = orders.filter(outlet__in=outlets)
+
+    # A cursor per outlet, so a run limited to some outlets doesn't move the others on
+    cursors = {}
+    for outlet_id, last in built.values('outlet').annotate(last=Max('date')).order_by().values_list('outlet', 'last'):
+        cursors.setdefault(last - timedelta(days=REBUILD_DAYS - 1), []).append(outlet_id)
+    if cursors:
+        built = built.filter(_since_cursors(cursors, 'outlet_id', 'date'))
+        sales = sales.filter(_since_cursors(cursors, 'sale__outlet_id', 'sale__date__date'))
+        orders = orders.filter(_since_cursors(cursors, 'outlet_id', 'order__created_at__date'))
+
+    totals = {}
+    sources = (
+        sales.annotate(day=TruncDate('sale__date')).values_list('sale__outlet_id', 'product_id', 'day'),
+        orders.annotate(day=TruncDate('order__created_at')).values_list('outlet_id', 'product_id', 'day'),
+    )
+    for rows in sources:
+        for outlet_id, product_id, day, quantity in rows.annotate(units=Sum('quantity')).order_by():
+            entry = totals.setdefault((product_id, day), [outlet_id, 0])
+            entry[1] += quantity or 0
+
+    with transaction.atomic():
+        built.filter(date__lte=until).delete()
+        ProductDailySales.all_outlets.bulk_create(
+            [ProductDailySales(outlet_id=outlet_id, product_id=product_id, date=day, quantity=quantity)
+             for (product_id, day), (outlet_id, quantity) in totals.items()],
+            batch_size=BATCH_SIZE,
+        )
+    return len(totals)
+
+
+def _daily_matrix(outlet, start, end, product_ids):
+    """
+    Units used per product (rows) and day (columns) from ProductDailySales, zero-filled.
+    Composite sales are counted as their components, through bill_of_materials.
+    """
+    days = pd.date_range(start, end, freq='D')
+    bom = bill_of_materials(outlet)
+    records = [
+        (stock_id, day, float(quantity * per_unit))
+        for product_id, day, quantity in ProductDailySales.all_outlets.filter(
+            outlet=outlet, date__range=(start, end)).values_list('product_id', 'date', 'quantity')
+        for stock_id, per_unit in bom.get(product_id, {product_id: 1}).items()
+    ]
+    sales = pd.DataFrame.from_records(records, columns=['product', 'date', 'quantity'])
+    if sales.empty:
+        return pd.DataFrame(0.0, index=product_ids, columns=days)
+    sales['date'] = pd.to_datetime(sales['date'])
+    matrix = sales.pivot_table(index='product', columns='date', values='quantity', aggfunc='sum')
+    return matrix.reindex(index=product_ids, columns=days).fillna(0.0)
+
+
+def _seasonal_factor(outlet, today):
+    """Outlet sales in the coming SEASON_DAYS last year relative to the weeks before them; 1.0 without that history."""
+    year_ago = today - timedelta(days=364)  # whole weeks, so weekdays line up
+    history = ProductDailySales.all_outlets.filter(outlet=outlet)
+    ahead = history.filter(date__range=(year_ago, year_ago + timedelta(days=SEASON_DAYS - 1))).aggregate(total=Sum('quantity'))['total']
+    before = history.filter(date__range=(year_ago - timedelta(days=VELOCITY_DAYS), year_ago - timedelta(days=1))).aggregate(total=Sum('quantity'))['total']
+    if not ahead or not before:
+        return 1.0
+    ratio = (ahead / SEASON_DAYS) / (before / VELOCITY_DAYS)
+    return float(np.clip(ratio, *SEASON_LIMITS))
+
+
+def compute_forecasts(outlet, today=None):
+    """
+    Rebuild ProductForecast for every stocked product of an outlet from ProductDailySales.
+    Composites are made from their components, so they get no forecast. Returns the number of products.
+    """
+    today = today or timezone.localdate()
+    end = today - timedelta(days=1)
+    start = end - timedelta(days=PROFILE_WEEKS * 7 - 1)
+
+    ProductForecast.all_outlets.filter(outlet=outlet, product__components__isnull=False).delete()
+    products = pd.DataFrame.from_records(
+        list(stocked_products(outlet).values(
+            'id', 'current_stock_level', 'low_stock_threshold', 'supplier__lead_time_days')),
+        columns=['id', 'current_stock_level', 'low_stock_threshold', 'supplier__lead_time_days'],
+    ).set_index('id')
+    if products.empty:
+        return 0
+
+    matrix = _daily_matrix(outlet, start, end, products.index)
+    velocity = matrix.iloc[:, -VELOCITY_DAYS:].mean(axis=1)
+
+    # Outlet-wide weekday profile (Mon..Sun), 1.0 = an average day
+    by_weekday = matrix.sum(axis=0).groupby(matrix.columns.weekday).mean().reindex(range(7))
+    profile = (by_weekday / by_weekday.mean()).fillna(1.0).to_numpy() if by_weekday.mean() else np.ones(7)
+
+    season = _seasonal_factor(outlet, today)
+    horizon = products['supplier__lead_time_days'].fillna(DEFAULT_LEAD_DAYS).astype(int) + REVIEW_DAYS
+    upcoming = profile[[(today + timedelta(days=k)).weekday() for k in range(int(horizon.max()))]]
+    weighted_days = np.cumsum(upcoming)[horizon.to_numpy() - 1]
+
+    daily = velocity * season
+    demand = daily * weighted_days
+    stock = products['current_stock_level'].clip(lower=0)
+    safety = products['low_stock_threshold'].fillna(0)
+    cover = (stock / daily).where(daily > 0)
+    suggested = np.ceil((demand + safety - stock).clip(lower=0)).astype(int)
+
+    ProductForecast.all_outlets.bulk_create(
+        [
+            ProductForecast(
+                outlet=outlet, product_id=product_id,
+                daily_velocity=round(float(daily[product_id]), 3),
+                forecast_demand=round(float(demand[product_id]), 2),
+                horizon_days=int(horizon[product_id]),
+                days_of_cover=None if pd.isna(cover[product_id]) else round(float(cover[product_id]), 1),
+                suggested_order=int(suggested[product_id]),
+            )
+            for product_id in products.index
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['daily_velocity', 'forecast_demand', 'horizon_days', 'days_of_cover', 'suggested_order', 'computed_at'],
+    )
+    return len(products)
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Expense, StockAdjustment
+from .models import Expense, InventoryLog
 
 class ExpenseForm(forms.ModelForm):
     class Meta:
@@ -10,11 +10,11 @@ class ExpenseForm(forms.ModelForm):
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '0.00'}),
         }
 
-class SpoilageForm(forms.ModelForm):
-    class Meta:
-        model = StockAdjustment
-        fields = ['product', 'quantity']
-        widgets = {
-            'product': forms.Select(attrs={'class': 'form-select'}),
-            'quantity': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Quantity wasted'}),
-        }
\ No newline at end of file
+class StockAdjustmentForm(forms.Form):
+    """Header of a spoilage / stock-take batch; per-product quantities are posted as qty_<product id>."""
+    reason = forms.ChoiceField(choices=InventoryLog.REASON_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    reference = forms.CharField(max_length=60, required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. Night count 12 May'}))
+    notes = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Optional'}))
+
+# Legacy alias for backward compatibility
+SpoilageForm = StockAdjustmentForm
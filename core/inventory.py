@@ -0,0 +1,550 @@
+"""
+Inventory Utilities for CafeManager
+Stock snapshots, point-in-time stock ("stock as of") queries, InventoryLog archival,
+the low-stock report with reorder suggestions, bulk stock changes (goods received,
+spoilage, stock-takes) with their variance report, and recipe (bill of materials) expansion
+of sales.
+
+stock_as_of starts from the snapshot nearest the requested day and applies only the
+InventoryLog rows between the two, so its cost depends on the snapshot interval rather
+than on how long the log has grown. Without snapshots it falls back to replaying the
+log backwards from current_stock_level.
+
+archive_inventory_logs keeps InventoryLog small: old rows move to InventoryLogArchive
+and are totalled per product, month and action in InventoryMonthlySummary.
+
+Composite products (cocktails, set meals) carry no stock of their own: selling one deducts
+its ProductComponent rows instead. bill_of_materials flattens nested recipes once per outlet
+and caches the result, so expanding a cart is a dictionary merge and the deduction is a
+single apply_stock_deltas call however many components each line explodes into. The
+low-stock report leaves composites out and counts their sales towards their components. Stock levels
+are whole units, so fractional usage (0.05 of a bottle of gin) accumulates in
+Product.stock_remainder until it adds up to a unit.
+"""
+import math
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.cache import cached, invalidate
+from core.models import (
+    InventoryLog, InventoryLogArchive, InventoryMonthlySummary, Product, ProductComponent, PurchaseOrder, PurchaseOrderLine,
+    SaleItem, StockSnapshot,
+)
+
+ZERO = Decimal('0')
+SNAPSHOT_BATCH_SIZE = 1000
+STOCK_UPDATE_BATCH_SIZE = 500
+ARCHIVE_BATCH_SIZE = 2000
+ARCHIVE_FIELDS = (
+    'id', 'outlet_id', 'product_id', 'action', 'quantity_changed',
+    'previous_level', 'new_level', 'reason', 'reference', 'notes', 'created_at',
+)
+
+
+def take_stock_snapshots(outlets=None):
+    """
+    Record every product's current stock level and cost_price. Re-running on the same
+    day replaces that day's rows. Returns the number of rows written.
+    """
+    products = Product.all_outlets.filter(outlet__isnull=False)
+    if outlets is not None:
+        products = products.filter(outlet__in=outlets)
+    taken_at = timezone.now()
+    day = timezone.localdate(taken_at)
+    rows = [
+        StockSnapshot(outlet_id=outlet_id, product_id=product_id, date=day,
+                      quantity=quantity, unit_cost=cost, taken_at=taken_at)
+        for product_id, outlet_id, quantity, cost in products.values_list('id', 'outlet_id', 'current_stock_level', 'cost_price')
+    ]
+    StockSnapshot.all_outlets.bulk_create(
+        rows,
+        batch_size=SNAPSHOT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product', 'date'],
+        update_fields=['quantity', 'unit_cost', 'taken_at'],
+    )
+    return len(rows)
+
+
+def _log_deltas(outlet, since=None, until=None, product_ids=None):
+    """{product_id: net quantity_changed} for one outlet's logs created in [since, until), archived ones included."""
+    deltas = {}
+    for model in (InventoryLog, InventoryLogArchive):
+        logs = model.all_outlets.filter(outlet=outlet)
+        if since is not None:
+            logs = logs.filter(created_at__gte=since)
+        if until is not None:
+            logs = logs.filter(created_at__lt=until)
+        if product_ids is not None:
+            logs = logs.filter(product_id__in=product_ids)
+        for row in logs.values('product_id').annotate(change=Sum('quantity_changed')).order_by():
+            deltas[row['product_id']] = deltas.get(row['product_id'], 0) + (row['change'] or 0)
+    return deltas
+
+
+def _nearest_snapshot(outlet, cutoff):
+    """taken_at of the outlet's snapshot closest to cutoff, on either side, or None."""
+    snapshots = StockSnapshot.all_outlets.filter(outlet=outlet)
+    before = snapshots.filter(taken_at__lt=cutoff).aggregate(at=Max('taken_at'))['at']
+    after = snapshots.filter(taken_at__gte=cutoff).aggregate(at=Min('taken_at'))['at']
+    if before is None or after is None:
+        return before or after
+    return before if cutoff - before <= after - cutoff else after
+
+
+def stock_as_of(outlet, day):
+    """
+    Each product's stock level and value at the end of day, from the nearest snapshot plus
+    the log between it and day. Products the snapshot predates are replayed back from
+    current_stock_level. Values use the snapshot's unit cost, else today's cost_price.
+    """
+    cutoff = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    taken_at = _nearest_snapshot(outlet, cutoff)
+
+    snapshot, changes = {}, {}
+    if taken_at is not None:
+        snapshot = {
+            row['product_id']: row
+            for row in StockSnapshot.all_outlets.filter(outlet=outlet, taken_at=taken_at)
+            .values('product_id', 'quantity', 'unit_cost')
+        }
+        if taken_at < cutoff:
+            # Snapshot before the day: add what happened since
+            changes = _log_deltas(outlet, taken_at, cutoff)
+        else:
+            # Snapshot after the day: take back what happened since the day ended
+            changes = {pid: -change for pid, change in _log_deltas(outlet, cutoff, taken_at).items()}
+
+    products = list(Product.all_outlets.filter(outlet=outlet).values('id', 'name', 'sku', 'category', 'cost_price', 'current_stock_level'))
+    missing = [product['id'] for product in products if product['id'] not in snapshot]
+    replayed = {}
+    if missing:
+        # Usually a few products added since the snapshot; with no snapshot at all, everything
+        replayed = _log_deltas(outlet, since=cutoff, product_ids=missing if snapshot else None)
+
+    rows = []
+    for product in products:
+        base = snapshot.get(product['id'])
+        if base:
+            quantity = base['quantity'] + changes.get(product['id'], 0)
+            unit_cost = base['unit_cost']
+        else:
+            quantity = product['current_stock_level'] - replayed.get(product['id'], 0)
+            unit_cost = product['cost_price']
+        rows.append({
+            'product_id': product['id'],
+            'name': product['name'],
+            'sku': product['sku'],
+            'category': product['category'],
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'value': unit_cost * quantity,
+        })
+    return {
+        'as_of': day,
+        'snapshot_taken_at': taken_at,
+        'rows': rows,
+        'total_quantity': sum(row['quantity'] for row in rows),
+        'total_value': sum((row['value'] for row in rows), ZERO),
+    }
+
+
+# --- ARCHIVAL ---
+
+def _fold_into_summaries(rows):
+    """Add InventoryLog rows (dicts of ARCHIVE_FIELDS) to their InventoryMonthlySummary totals."""
+    totals = {}
+    for row in rows:
+        month = timezone.localtime(row['created_at']).date().replace(day=1)
+        entry = totals.setdefault((row['product_id'], month, row['action']), [row['outlet_id'], 0, 0])
+        entry[1] += row['quantity_changed']
+        entry[2] += 1
+
+    existing = InventoryMonthlySummary.all_outlets.filter(
+        product_id__in={key[0] for key in totals}, month__in={key[1] for key in totals},
+    )
+    for summary in existing:
+        entry = totals.get((summary.product_id, summary.month, summary.action))
+        if entry:
+            entry[1] += summary.quantity_changed
+            entry[2] += summary.entry_count
+
+    InventoryMonthlySummary.all_outlets.bulk_create(
+        [
+            InventoryMonthlySummary(outlet_id=outlet_id, product_id=product_id, month=month, action=action,
+                                    quantity_changed=quantity, entry_count=count)
+            for (product_id, month, action), (outlet_id, quantity, count) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['product', 'month', 'action'],
+        update_fields=['quantity_changed', 'entry_count'],
+    )
+
+
+def archive_inventory_logs(before, outlets=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move InventoryLog rows created before `before` to InventoryLogArchive and add them to
+    the monthly summaries. Each batch is its own transaction, so an interrupted run loses
+    nothing and the next run carries on. Returns the number of rows moved.
+    """
+    logs = InventoryLog.all_outlets.filter(created_at__lt=before)
+    if outlets is not None:
+        logs = logs.filter(outlet__in=outlets)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(logs.order_by('pk').values(*ARCHIVE_FIELDS)[:batch_size])
+            if not batch:
+                return moved
+            _fold_into_summaries(batch)
+            InventoryLogArchive.all_outlets.bulk_create([InventoryLogArchive(**row) for row in batch])
+            InventoryLog.all_outlets.filter(pk__in=[row['id'] for row in batch]).delete()
+        moved += len(batch)
+
+
+# --- LOW STOCK ---
+
+DEFAULT_LOW_STOCK_THRESHOLD = 10
+CRITICAL_STOCK_LEVEL = 5
+VELOCITY_DAYS = 28
+REORDER_COVER_DAYS = 14
+
+
+def _threshold(default_threshold):
+    """Each product's own low_stock_threshold, else the report default."""
+    return Coalesce('low_stock_threshold', Value(default_threshold))
+
+
+def low_stock_stats(outlet, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """Product, low, critical and out-of-stock counts of stocked products in one conditional aggregate."""
+    threshold = _threshold(default_threshold)
+    return stocked_products(outlet).aggregate(
+        total_products=Count('id'),
+        low_stock_count=Count('id', filter=Q(current_stock_level__lt=threshold)),
+        critical_stock=Count('id', filter=Q(current_stock_level__lt=CRITICAL_STOCK_LEVEL)),
+        out_of_stock=Count('id', filter=Q(current_stock_level__lte=0)),
+    )
+
+
+def stocked_products(outlet):
+    """An outlet's products that hold stock: composites are deducted through their recipes instead."""
+    return Product.all_outlets.filter(outlet=outlet, components__isnull=True)
+
+
+def sales_velocity(outlet, product_ids, days=VELOCITY_DAYS):
+    """
+    {product_id: units used per day} over the last `days` days, from SaleItem. Sales of
+    composites count towards their components, through bill_of_materials.
+    """
+    product_ids = set(product_ids)
+    bom = bill_of_materials(outlet)
+    composites = [product_id for product_id, parts in bom.items() if product_ids & parts.keys()]
+    since = timezone.now() - timedelta(days=days)
+    sold = dict(
+        SaleItem.all_outlets.filter(sale__outlet=outlet, sale__date__gte=since, product_id__in=[*product_ids, *composites])
+        .values('product_id').annotate(sold=Sum('quantity')).order_by().values_list('product_id', 'sold')
+    )
+    used = expand_bom(outlet, {product_id: quantity for product_id, quantity in sold.items() if quantity})
+    return {product_id: float(-change) / days for product_id, change in used.items() if product_id in product_ids}
+
+
+def low_stock_products(outlet, default_threshold=DEFAULT_LOW_STOCK_THRESHOLD):
+    """
+    Stocked products below their threshold, most urgent first, each with `threshold`,
+    `units_per_day`, `days_of_stock` (None when it isn't selling) and `reorder_quantity`:
+    up to optimal_stock when set, else the threshold plus REORDER_COVER_DAYS of sales.
+    """
+    products = list(
+        stocked_products(outlet)
+        .annotate(threshold=_threshold(default_threshold))
+        .filter(current_stock_level__lt=F('threshold'))
+        .order_by('current_stock_level', 'name')
+    )
+    velocity = sales_velocity(outlet, [product.id for product in products]) if products else {}
+    for product in products:
+        daily = velocity.get(product.id, 0)
+        stock = max(product.current_stock_level, 0)
+        target = product.optimal_stock
+        if target is None:
+            target = product.threshold + math.ceil(daily * REORDER_COVER_DAYS)
+        product.units_per_day = daily
+        product.days_of_stock = stock / daily if daily else None
+        product.reorder_quantity = max(target - stock, 0)
+    return products
+
+
+# --- BULK STOCK CHANGES ---
+
+def _apply_stock_changes(outlet, product_ids, change_for, action, reference, notes, reason):
+    """
+    Shared by apply_stock_deltas/apply_stock_counts: per batch, one locked read of the
+    current levels, one CASE/WHEN UPDATE and one bulk InventoryLog insert, all in one
+    transaction. change_for(product_id, level) gives each product's change.
+    """
+    levels = {}
+    with transaction.atomic():
+        product_ids = sorted(product_ids)
+        for start in range(0, len(product_ids), STOCK_UPDATE_BATCH_SIZE):
+            current = dict(
+                Product.all_outlets.select_for_update()
+                .filter(outlet=outlet, pk__in=product_ids[start:start + STOCK_UPDATE_BATCH_SIZE])
+                .order_by('pk').values_list('pk', 'current_stock_level')
+            )
+            changes = {product_id: change_for(product_id, level) for product_id, level in current.items()}
+            changes = {product_id: change for product_id, change in changes.items() if change}
+            if not changes:
+                continue
+            Product.all_outlets.filter(pk__in=changes).update(current_stock_level=Case(
+                *[When(pk=product_id, then=F('current_stock_level') + Value(change)) for product_id, change in changes.items()],
+                default=F('current_stock_level'),
+                output_field=IntegerField(),
+            ))
+            InventoryLog.all_outlets.bulk_create([
+                InventoryLog(
+                    outlet=outlet, product_id=product_id, action=action, reason=reason,
+                    quantity_changed=change, previous_level=current[product_id], new_level=current[product_id] + change,
+                    reference=reference, notes=notes,
+                )
+                for product_id, change in changes.items()
+            ])
+            levels.update({product_id: current[product_id] + change for product_id, change in changes.items()})
+    # update() skips post_save, so the Product cache watchers don't fire
+    for namespace in ('catalog', 'dashboard'):
+        invalidate(namespace, outlet.pk)
+    return levels
+
+
+def apply_stock_deltas(outlet, deltas, action, reference='', notes='', reason=''):
+    """
+    Add {product_id: quantity change} to an outlet's stock levels in one transaction, with
+    set-based updates and bulk InventoryLog rows. Products of other outlets are ignored.
+    Returns {product_id: new level} for the products that changed.
+    """
+    deltas = {int(product_id): int(change) for product_id, change in deltas.items() if int(change)}
+    return _apply_stock_changes(outlet, deltas, lambda product_id, level: deltas[product_id], action, reference, notes, reason)
+
+
+def apply_stock_counts(outlet, counts, action='Adjustment', reference='', notes='', reason='stock_take'):
+    """
+    Set {product_id: counted level} (a stock-take), logging the variance against the level
+    read under lock in the same transaction. Returns {product_id: new level} for the products that changed.
+    """
+    counts = {int(product_id): int(count) for product_id, count in counts.items()}
+    with transaction.atomic():
+        levels = _apply_stock_changes(outlet, counts, lambda product_id, level: counts[product_id] - level, action, reference, notes, reason)
+        # The count is the truth, so usage carried towards the next whole unit starts again
+        Product.all_outlets.filter(outlet=outlet, pk__in=counts).exclude(stock_remainder=0).update(stock_remainder=0)
+    return levels
+
+
+def receive_goods(outlet, quantities, user, order=None, reference=''):
+    """
+    Book a delivery of {product_id: quantity received} as 'Purchase' stock movements. With a
+    purchase order, its lines' received quantities and status are updated in the same
+    transaction; products not on the order are added as unordered lines. Returns the new levels.
+    Raises ValueError when the order is no longer open.
+    """
+    quantities = {int(product_id): int(quantity) for product_id, quantity in quantities.items() if int(quantity) > 0}
+    with transaction.atomic():
+        if order is not None:
+            # Locked and re-read, so two receipts of one order can't both add its stock
+            order = PurchaseOrder.all_outlets.select_for_update().get(pk=order.pk, outlet=outlet)
+            if order.status not in PurchaseOrder.OPEN_STATUSES:
+                raise ValueError(f"{order} is {order.get_status_display().lower()} and can't be received again.")
+        levels = apply_stock_deltas(
+            outlet, quantities, 'Purchase',
+            reference=f"PO-{order.pk}" if order else reference,
+            notes=f"Received by {user.username}" + (f" ({reference})" if order and reference else ''),
+        )
+        if order is not None and levels:
+            lines = {line.product_id: line for line in PurchaseOrderLine.all_outlets.select_for_update().filter(order=order)}
+            received = [line for line in lines.values() if line.product_id in levels]
+            for line in received:
+                line.quantity_received += quantities[line.product_id]
+            PurchaseOrderLine.all_outlets.bulk_update(received, ['quantity_received'])
+            PurchaseOrderLine.all_outlets.bulk_create([
+                PurchaseOrderLine(order=order, product_id=product_id, quantity_received=quantities[product_id])
+                for product_id in levels if product_id not in lines
+            ])
+            outstanding = any(line.quantity_outstanding for line in lines.values())
+            order.status = 'Partial' if outstanding else 'Received'
+            order.received_at = timezone.now()
+            order.save(update_fields=['status', 'received_at'])
+    return levels
+
+
+# --- SPOILAGE & ADJUSTMENTS ---
+
+# Reasons whose quantities are losses, entered as positive numbers
+LOSS_REASONS = ('expired', 'damaged', 'waste', 'missing')
+SPOILAGE_REASONS = ('expired', 'damaged', 'waste')
+
+
+def adjust_stock(outlet, reason, quantities, user, reference='', notes=''):
+    """
+    Book a batch of {product_id: quantity} for one InventoryLog reason code. Losses deduct
+    the quantities, a stock-take sets them as counted levels and a correction adds them as
+    signed changes. Returns (reference, {product_id: new level}); the reference ties the
+    batch together for the variance report. Raises ValueError for an unknown reason.
+    """
+    if reason not in dict(InventoryLog.REASON_CHOICES):
+        raise ValueError(f"Unknown adjustment reason: {reason}")
+    reference = reference or f"{reason.upper()}-{timezone.localtime():%Y%m%d-%H%M%S}"
+    notes = notes or f"By {user.username}"
+    if reason == 'stock_take':
+        return reference, apply_stock_counts(outlet, quantities, reference=reference, notes=notes)
+    if reason in LOSS_REASONS:
+        quantities = {product_id: -abs(int(quantity)) for product_id, quantity in quantities.items()}
+    action = 'Spoilage' if reason in SPOILAGE_REASONS else 'Adjustment'
+    return reference, apply_stock_deltas(outlet, quantities, action, reference=reference, notes=notes, reason=reason)
+
+
+def stock_variance(outlet, start=None, end=None, reference=None):
+    """
+    Spoilage and adjustments per product and reason over start..end (dates, inclusive) or for
+    one batch reference, valued at today's cost_price, biggest losses first. Archived logs included.
+    """
+    value = ExpressionWrapper(F('quantity_changed') * F('product__cost_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    rows = {}
+    for model in (InventoryLog, InventoryLogArchive):
+        logs = model.all_outlets.filter(outlet=outlet, action__in=('Spoilage', 'Adjustment'))
+        if reference:
+            logs = logs.filter(reference=reference)
+        if start:
+            logs = logs.filter(created_at__date__gte=start)
+        if end:
+            logs = logs.filter(created_at__date__lte=end)
+        grouped = logs.values('product_id', 'product__name', 'product__sku', 'reason').annotate(
+            quantity=Sum('quantity_changed'), value=Sum(value), entries=Count('id'),
+        ).order_by()
+        for row in grouped:
+            key = (row['product_id'], row['reason'])
+            if key in rows:
+                for field in ('quantity', 'value', 'entries'):
+                    rows[key][field] += row[field] or 0
+            else:
+                rows[key] = {**row, 'value': row['value'] or ZERO}
+
+    reasons = dict(InventoryLog.REASON_CHOICES)
+    by_reason = {}
+    for row in rows.values():
+        row['reason_label'] = reasons.get(row['reason'], 'Unspecified')
+        totals = by_reason.setdefault(row['reason_label'], {'quantity': 0, 'value': ZERO})
+        totals['quantity'] += row['quantity']
+        totals['value'] += row['value']
+    return {
+        'rows': sorted(rows.values(), key=lambda row: row['value']),
+        'by_reason': by_reason,
+        'total_quantity': sum(row['quantity'] for row in rows.values()),
+        'total_value': sum((row['value'] for row in rows.values()), ZERO),
+    }
+
+
+# --- RECIPES (BILL OF MATERIALS) ---
+
+def _flatten_components(product_id, direct, path):
+    """{stocked product id: quantity per unit of product_id}, expanding nested composites. A cycle stops at the repeated product."""
+    flat = {}
+    for component_id, quantity in direct[product_id].items():
+        if component_id in direct and component_id not in path:
+            for leaf_id, leaf_quantity in _flatten_components(component_id, direct, path + (component_id,)).items():
+                flat[leaf_id] = flat.get(leaf_id, ZERO) + quantity * leaf_quantity
+        else:
+            flat[component_id] = flat.get(component_id, ZERO) + quantity
+    return flat
+
+
+@cached('bom')
+def bill_of_materials(outlet):
+    """{composite product id: {stocked product id: quantity per unit}} for an outlet, nested recipes flattened."""
+    direct = {}
+    for product_id, component_id, quantity in ProductComponent.all_outlets.filter(outlet=outlet).values_list('product_id', 'component_id', 'quantity'):
+        direct.setdefault(product_id, {})[component_id] = quantity
+    return {product_id: _flatten_components(product_id, direct, (product_id,)) for product_id in direct}
+
+
+def expand_bom(outlet, quantities):
+    """
+    Turn {product_id: quantity sold} into {product_id: stock change}: composites are replaced by
+    their components, everything else deducts itself. Recipe quantities are kept exact, so
+    changes may be fractional.
+    """
+    bom = bill_of_materials(outlet)
+    deltas = {}
+    for product_id, quantity in quantities.items():
+        for stock_id, per_unit in bom.get(product_id, {product_id: 1}).items():
+            deltas[stock_id] = deltas.get(stock_id, 0) - quantity * per_unit
+    return deltas
+
+
+def deduct_sale_stock(outlet, quantities, reference='', notes=''):
+    """
+    Deduct a sale's {product_id: quantity} from stock, composites through their recipes.
+    Each product's usage is added to its stock_remainder and the nearest whole number of units
+    is deducted, leaving the rest (at most half a unit either way) for the next sale. Returns the new levels.
+    """
+    usage = expand_bom(outlet, quantities)
+    with transaction.atomic():
+        # Same lock order as _apply_stock_changes, which re-reads these rows under the lock we hold
+        remainders = dict(
+            Product.all_outlets.select_for_update().filter(outlet=outlet, pk__in=usage)
+            .order_by('pk').values_list('pk', 'stock_remainder')
+        )
+        deltas, carried = {}, {}
+        for product_id, remainder in remainders.items():
+            total = remainder + usage[product_id]
+            deltas[product_id] = int(total.quantize(Decimal('1'), ROUND_HALF_UP))
+            if total - deltas[product_id] != remainder:
+                carried[product_id] = total - deltas[product_id]
+        if carried:
+            Product.all_outlets.filter(pk__in=carried).update(stock_remainder=Case(
+                *[When(pk=product_id, then=Value(remainder)) for product_id, remainder in carried.items()],
+                default=F('stock_remainder'),
+                output_field=DecimalField(max_digits=10, decimal_places=3),
+            ))
+        return apply_stock_deltas(outlet, deltas, 'Sale', reference=reference, notes=notes)
+
+
+def normalise_sku(sku):
+    """pandas reads SKU columns with gaps as floats, so 10001 may arrive as 10001.0."""
+    sku = str(sku).strip()
+    return sku[:-2] if sku.endswith('.0') else sku
+
+
+def import_components(outlet, df):
+    """
+    Load the Loyverse 'SKU of included item' / 'Quantity of included item' columns of an items
+    export into ProductComponent, replacing the recipes of the composites it contains. Extra
+    components follow on rows of the same Handle without a Name. Composites made ahead with
+    'Use production' hold their own stock and are skipped. Returns the number of components.
+    """
+    if 'SKU of included item' not in df.columns:
+        return 0
+    first = df.groupby('Handle', dropna=False).transform('first')
+    rows = df['SKU of included item'].notna()
+    if 'Use production' in df.columns:
+        rows &= first['Use production'].fillna('N').astype(str).str.upper() != 'Y'
+
+    products = dict(Product.all_outlets.filter(outlet=outlet).values_list('name', 'id'))
+    by_sku = {normalise_sku(sku): product_id for product_id, sku in Product.all_outlets.filter(outlet=outlet, sku__isnull=False).values_list('id', 'sku')}
+    recipes = {}
+    for name, sku, quantity in zip(first.loc[rows, 'Name'], df.loc[rows, 'SKU of included item'], df.loc[rows, 'Quantity of included item'].fillna(1)):
+        product_id, component_id = products.get(name), by_sku.get(normalise_sku(sku))
+        if product_id and component_id and product_id != component_id:
+            recipes.setdefault(product_id, {})[component_id] = Decimal(str(quantity))
+
+    with transaction.atomic():
+        ProductComponent.all_outlets.filter(outlet=outlet, product_id__in=recipes).delete()
+        ProductComponent.all_outlets.bulk_create([
+            ProductComponent(outlet=outlet, product_id=product_id, component_id=component_id, quantity=quantity)
+            for product_id, components in recipes.items() for component_id, quantity in components.items()
+        ])
+    # Low-stock figures leave composites out, so a new recipe changes the dashboard too
+    for namespace in ('bom', 'dashboard'):
+        invalidate(namespace, outlet.pk)
+    return sum(len(components) for components in recipes.values())
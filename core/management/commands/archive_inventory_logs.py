@@ -0,0 +1,34 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.inventory import ARCHIVE_BATCH_SIZE, archive_inventory_logs
+from core.models import Outlet
+
+
+class Command(BaseCommand):
+    help = (
+        "Move InventoryLog rows older than the retention window to InventoryLogArchive and total "
+        "them per product and month in InventoryMonthlySummary. Safe to stop and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=6, help="Whole months to keep in InventoryLog besides the current one")
+        parser.add_argument('--outlet', type=int, help="Only archive this outlet id")
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help="Rows moved per transaction")
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError("--months must be at least 1.")
+        today = timezone.localdate()
+        month_index = today.year * 12 + today.month - 1 - options['months']
+        cutoff = today.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+        outlets = None
+        if options['outlet']:
+            outlets = Outlet.objects.filter(pk=options['outlet'])
+        moved = archive_inventory_logs(
+            timezone.make_aware(datetime.combine(cutoff, time.min)), outlets, options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{moved} inventory log row(s) archived (created before {cutoff})."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SaleItem
+from core.reporting import BACKFILL_BATCH_SIZE, backfill_unit_costs
+from karaoke.models import RoomOrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill unit_cost on sale and room order items that have none, from the product's "
+        "current cost_price. Safe to re-run; rows that already have a cost are left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help="Primary keys per UPDATE")
+
+    def handle(self, *args, **options):
+        for model in (SaleItem, RoomOrderItem):
+            filled = backfill_unit_costs(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: {filled} row(s) filled."))
@@ -0,0 +1,166 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F, Sum
+
+from core.models import Outlet, Product, SaleTransaction, SaleItem, InventoryLog
+from karaoke.models import Room, RoomSession, RoomOrder, RoomOrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate POS terminals, room tablets and report readers hitting a scratch SQLite "
+        "database at once, with default SQLite settings and with the tuned settings, and "
+        "report throughput and lock errors for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminals', type=int, default=4, help="Concurrent POS terminals")
+        parser.add_argument('--tablets', type=int, default=4, help="Concurrent room tablets")
+        parser.add_argument('--readers', type=int, default=2, help="Concurrent report readers")
+        parser.add_argument('--ops', type=int, default=200, help="Operations per worker")
+        parser.add_argument('--products', type=int, default=50)
+
+    def handle(self, *args, **options):
+        default = connections['default'].settings_dict
+        if default['ENGINE'] != 'django.db.backends.sqlite3':
+            self.stderr.write("This benchmark targets SQLite; the default database is not SQLite.")
+            return
+
+        profiles = {
+            'sqlite defaults': {'OPTIONS': {}, 'PRAGMAS': {}},
+            'tuned': {'OPTIONS': default.get('OPTIONS', {}), 'PRAGMAS': getattr(settings, 'SQLITE_PRAGMAS', {})},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, (label, profile) in enumerate(profiles.items()):
+                alias = f"bench_{i}"
+                connections.settings[alias] = {
+                    **default, **profile,
+                    'NAME': os.path.join(tmp, f"{alias}.sqlite3"),
+                    'TEST': {**default.get('TEST', {}), 'NAME': None},
+                }
+                try:
+                    self.run_profile(label, alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+    def run_profile(self, label, alias, options):
+        call_command('migrate', database=alias, verbosity=0)
+        fixture = self.setup_data(alias, options)
+
+        results = {'pos': [], 'tablet': [], 'reader': []}
+        errors = {'pos': 0, 'tablet': 0, 'reader': 0}
+        lock = threading.Lock()
+
+        def worker(kind, op):
+            rng = random.Random()
+            latencies = []
+            failures = 0
+            try:
+                for _ in range(options['ops']):
+                    started = time.perf_counter()
+                    try:
+                        op(alias, fixture, rng)
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        failures += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connections[alias].close()
+            with lock:
+                results[kind].extend(latencies)
+                errors[kind] += failures
+
+        threads = (
+            [threading.Thread(target=worker, args=('pos', self.pos_sale)) for _ in range(options['terminals'])] +
+            [threading.Thread(target=worker, args=('tablet', self.tablet_order)) for _ in range(options['tablets'])] +
+            [threading.Thread(target=worker, args=('reader', self.read_report)) for _ in range(options['readers'])]
+        )
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+        self.stdout.write(f"  wall time {elapsed:.2f}s")
+        for kind, latencies in results.items():
+            if not latencies and not errors[kind]:
+                continue
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) >= 2 else 0
+            self.stdout.write(
+                f"  {kind:<7} {len(latencies) / elapsed:8.1f} ops/s   p95 {p95:7.1f} ms   "
+                f"lock errors {errors[kind]}"
+            )
+
+    def setup_data(self, alias, options):
+        owner = User.objects.db_manager(alias).create_user('bench', password=None)
+        outlet = Outlet.objects.using(alias).create(name='Bench', owner=owner)
+        Product.objects.using(alias).bulk_create([
+            Product(outlet=outlet, name=f"Item {i}", selling_price=Decimal('25.00'), cost_price=Decimal('10.00'),
+                    current_stock_level=1_000_000)
+            for i in range(options['products'])
+        ])
+        sessions = []
+        for i in range(max(options['tablets'], 1)):
+            room = Room.objects.using(alias).create(outlet=outlet, name=f"Room {i}")
+            sessions.append(RoomSession.objects.using(alias).create(outlet=outlet, room=room, status='Active'))
+        return {
+            'outlet_id': outlet.id,
+            'product_ids': list(Product.objects.using(alias).values_list('id', flat=True)),
+            'session_ids': [s.id for s in sessions],
+        }
+
+    # --- Workloads ---
+
+    def pos_sale(self, alias, fixture, rng):
+        product_id = rng.choice(fixture['product_ids'])
+        qty = rng.randint(1, 3)
+        with transaction.atomic(using=alias):
+            # Read before writing, as the POS checkout does
+            product = Product.objects.using(alias).get(pk=product_id)
+            sale = SaleTransaction.objects.using(alias).create(
+                outlet_id=fixture['outlet_id'], total_amount=Decimal('25.00') * qty, payment_method='Cash'
+            )
+            SaleItem.objects.using(alias).create(sale=sale, product=product, quantity=qty, price=product.selling_price)
+            Product.objects.using(alias).filter(pk=product_id).update(current_stock_level=F('current_stock_level') - qty)
+            InventoryLog.objects.using(alias).create(
+                outlet_id=fixture['outlet_id'], product_id=product_id, action='Sale',
+                quantity_changed=-qty, reference=f"Transaction #{sale.id}"
+            )
+
+    def tablet_order(self, alias, fixture, rng):
+        session_id = rng.choice(fixture['session_ids'])
+        product_id = rng.choice(fixture['product_ids'])
+        with transaction.atomic(using=alias):
+            price = Product.objects.using(alias).values_list('selling_price', flat=True).get(pk=product_id)
+            order = RoomOrder.objects.using(alias).create(
+                session_id=session_id, outlet_id=fixture['outlet_id'], total_price=price, item_count=1
+            )
+            RoomOrderItem.objects.using(alias).create(
+                order=order, outlet_id=fixture['outlet_id'], product_id=product_id, quantity=1, price=price
+            )
+            RoomSession.objects.using(alias).filter(pk=session_id).update(
+                food_beverage_charge=F('food_beverage_charge') + price,
+                item_count=F('item_count') + 1,
+                pending_order_count=F('pending_order_count') + 1,
+            )
+
+    def read_report(self, alias, fixture, rng):
+        SaleTransaction.objects.using(alias).filter(outlet_id=fixture['outlet_id']).aggregate(Sum('total_amount'))
+        RoomSession.objects.using(alias).filter(outlet_id=fixture['outlet_id']).aggregate(Sum('food_beverage_charge'))
@@ -0,0 +1,103 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.cache import invalidate
+from core.models import Customer, Modifier, ModifierGroup, Outlet, Product, Tax
+from core.sales import checkout, day_takings, receipt_sale, sales_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the shared sales service (checkout, sales history, receipts, day takings) on a "
+        "scratch outlet and report latency and queries per operation. Everything runs in one "
+        "transaction that is rolled back, so the database is left as it was."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help="Runs per operation")
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 5, 20], help="Cart sizes to check out")
+        parser.add_argument('--history', type=int, default=500, help="Sales to fill the history with")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            outlet = self.setup_data(options)
+            try:
+                self.run(outlet, options)
+            finally:
+                transaction.set_rollback(True)
+                # The scratch outlet's id can be reused once rolled back, so drop what was cached for it
+                for namespace in ('menu', 'tax', 'bom', 'catalog', 'dashboard', 'finance', 'customers'):
+                    invalidate(namespace, outlet.pk)
+
+    def setup_data(self, options):
+        owner = User.objects.create_user('bench-sales', password=None)
+        outlet = Outlet.objects.create(name='Bench', owner=owner)
+        Product.all_outlets.bulk_create([
+            Product(outlet=outlet, name=f"Item {i}", selling_price=Decimal('25.00'), cost_price=Decimal('10.00'),
+                    current_stock_level=1_000_000)
+            for i in range(max(options['lines']))
+        ])
+        products = list(Product.all_outlets.filter(outlet=outlet).order_by('pk'))
+        group = ModifierGroup.all_outlets.create(outlet=outlet, name='Extras')
+        Modifier.all_outlets.create(group=group, name='Extra shot', price=Decimal('5.00'))
+        products[0].modifier_groups.add(group)
+        products[0].taxes.add(Tax.all_outlets.create(outlet=outlet, name='GST', rate=Decimal('8.00')))
+        self.customer = Customer.all_outlets.create(outlet=outlet, name='Bench customer')
+        self.modifier_ids = list(group.modifiers.values_list('pk', flat=True))
+        self.product_ids = [product.pk for product in products]
+        return outlet
+
+    def cart(self, lines):
+        cart = [{'id': product_id, 'quantity': 2} for product_id in self.product_ids[:lines]]
+        cart[0]['modifier_ids'] = self.modifier_ids
+        return cart
+
+    def measure(self, label, runs, op):
+        op()  # warm the menu and tax caches
+        latencies, queries = [], 0
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                op()
+                latencies.append(time.perf_counter() - started)
+            queries = len(captured)
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) >= 2 else latencies[0] * 1000
+        self.stdout.write(
+            f"  {label:<24} {statistics.mean(latencies) * 1000:7.2f} ms mean   p95 {p95:7.2f} ms   {queries:3d} queries"
+        )
+
+    def run(self, outlet, options):
+        runs = options['runs']
+        self.stdout.write(self.style.MIGRATE_HEADING("Checkout"))
+        for lines in options['lines']:
+            cart = self.cart(lines)
+            self.measure(f"{lines} line(s)", runs, lambda: checkout(outlet, cart, sold_by='bench'))
+            self.measure(f"{lines} line(s), credit", runs, lambda: checkout(
+                outlet, cart, payment_method='Credit', customer_id=self.customer.pk, sold_by='bench'))
+
+        cart = self.cart(min(options['lines']))
+        for _ in range(max(options['history'] - runs * 2 * len(options['lines']), 0)):
+            checkout(outlet, cart, sold_by='bench')
+        sale = checkout(outlet, self.cart(max(options['lines'])), customer_id=self.customer.pk, sold_by='bench')
+
+        def history():
+            # Touch what the history page shows, so lazy loads are counted
+            for row in sales_page(outlet, 1):
+                row.customer and row.customer.name
+
+        def receipt():
+            loaded = receipt_sale(outlet, sale.pk)
+            for item in loaded.items.all():
+                item.product.name, item.variant, [modifier.name for modifier in item.modifiers.all()]
+            list(loaded.tax_lines.all())
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Reads"))
+        self.measure("sales history page", runs, history)
+        self.measure(f"receipt ({max(options['lines'])} lines)", runs, receipt)
+        self.measure("day takings", runs, lambda: day_takings(outlet, sale.date.date()))
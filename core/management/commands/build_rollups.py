@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Outlet
+from core.reporting import build_daily_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Build OutletDailyRollup rows for closed days (yesterday by default). "
+        "Re-running a day overwrites it, so late edits can be picked up with --days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Last day to build (YYYY-MM-DD), default yesterday")
+        parser.add_argument('--days', type=int, default=1, help="Number of days to build, ending at --date")
+        parser.add_argument('--outlet', type=int, help="Only build rollups for this outlet id")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        last = options['date'] or today - timedelta(days=1)
+        if last >= today:
+            raise CommandError("Only closed days can be rolled up; today is still aggregated live.")
+
+        outlets = Outlet.objects.all()
+        if options['outlet']:
+            outlets = outlets.filter(pk=options['outlet'])
+
+        rows = 0
+        for offset in range(options['days'] - 1, -1, -1):
+            rows += build_daily_rollups(last - timedelta(days=offset), outlets)
+        self.stdout.write(self.style.SUCCESS(f"{rows} rollup row(s) written for {options['days']} day(s) ending {last}."))
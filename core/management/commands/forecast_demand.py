@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.forecasting import build_daily_sales, compute_forecasts
+from core.models import Outlet
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly demand forecast: add yesterday's sales to ProductDailySales, then rebuild "
+        "ProductForecast (velocity, days of cover, suggested order) for every product."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outlet', type=int, help="Only forecast this outlet id")
+
+    def handle(self, *args, **options):
+        outlets = Outlet.objects.all()
+        if options['outlet']:
+            outlets = outlets.filter(pk=options['outlet'])
+
+        rows = build_daily_sales(timezone.localdate() - timedelta(days=1), outlets)
+        self.stdout.write(f"{rows} daily sales row(s) written.")
+        for outlet in outlets:
+            products = compute_forecasts(outlet)
+            self.stdout.write(self.style.SUCCESS(f"{outlet.name}: {products} product forecast(s) updated."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.inventory import take_stock_snapshots
+from core.models import Outlet
+
+
+class Command(BaseCommand):
+    help = (
+        "Record every product's stock level and cost (run daily, e.g. after closing). "
+        "Stock-as-of queries start from the nearest snapshot, so the interval bounds their cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outlet', type=int, help="Only snapshot this outlet id")
+
+    def handle(self, *args, **options):
+        outlets = Outlet.objects.all()
+        if options['outlet']:
+            outlets = outlets.filter(pk=options['outlet'])
+        rows = take_stock_snapshots(outlets)
+        self.stdout.write(self.style.SUCCESS(f"{rows} product snapshot(s) written."))
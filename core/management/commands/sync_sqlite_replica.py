@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the local 'replica' stand-in "
+        "(SQLITE_REPLICA_NAME). Run it periodically to simulate replication lag."
+    )
+
+    def handle(self, *args, **options):
+        default = settings.DATABASES['default']
+        replica = settings.DATABASES.get('replica')
+        if replica is None:
+            raise CommandError("No 'replica' database configured; set SQLITE_REPLICA_NAME.")
+        if default['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_sqlite_replica only works with SQLite databases.")
+
+        # The backup API takes a consistent snapshot even while the primary is being written to
+        source = sqlite3.connect(str(default['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            with target:
+                source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f"Replica refreshed from {default['NAME']}"))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_outlets(apps, schema_editor):
+    """Give legacy rows without an outlet one, so outlet-scoped managers can see them."""
+    Outlet = apps.get_model('core', 'Outlet')
+    Product = apps.get_model('core', 'Product')
+    InventoryLog = apps.get_model('core', 'InventoryLog')
+    Customer = apps.get_model('core', 'Customer')
+    SaleTransaction = apps.get_model('core', 'SaleTransaction')
+    CreditPayment = apps.get_model('core', 'CreditPayment')
+
+    InventoryLog.objects.filter(outlet__isnull=True).update(
+        outlet=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('outlet_id')[:1])
+    )
+    for model in (SaleTransaction, CreditPayment):
+        model.objects.filter(outlet__isnull=True, customer__isnull=False).update(
+            outlet=Subquery(Customer.objects.filter(pk=OuterRef('customer_id')).values('outlet_id')[:1])
+        )
+
+    # Anything still unassigned can only be attributed when there is a single outlet
+    outlet_ids = list(Outlet.objects.values_list('id', flat=True)[:2])
+    if len(outlet_ids) == 1:
+        for model in (Product, InventoryLog, Customer, SaleTransaction, CreditPayment):
+            model.objects.filter(outlet__isnull=True).update(outlet_id=outlet_ids[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_outlet_logo'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_outlets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['outlet', 'current_balance'], name='core_custom_outlet__751204_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saletransaction',
+            index=models.Index(fields=['outlet', 'date'], name='core_saletr_outlet__a36a41_idx'),
+        ),
+    ]
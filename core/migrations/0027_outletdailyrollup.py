@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_customer_core_custom_outlet__751204_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutletDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pos_sales', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('karaoke_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('session_count', models.IntegerField(default=0)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.outlet')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('outlet', 'date')},
+            },
+        ),
+    ]
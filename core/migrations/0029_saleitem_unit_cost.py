@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+def capture_unit_costs(apps, schema_editor):
+    # Existing rows get the product's current cost; see core.reporting.backfill_unit_costs
+    from core.reporting import backfill_unit_costs
+    backfill_unit_costs(apps.get_model('core', 'SaleItem'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_expense_core_expens_outlet__f1b01f_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleitem',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(capture_unit_costs, migrations.RunPython.noop),
+    ]
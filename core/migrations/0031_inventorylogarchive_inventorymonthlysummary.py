@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryLogArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('Sale', 'Sale'), ('Purchase', 'Purchase'), ('Adjustment', 'Adjustment'), ('Spoilage', 'Spoilage'), ('Transfer', 'Transfer')], max_length=20)),
+                ('quantity_changed', models.IntegerField()),
+                ('previous_level', models.IntegerField(default=0)),
+                ('new_level', models.IntegerField(default=0)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('outlet', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_inventory_logs', to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_inventory_logs', to='core.product')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['outlet', 'created_at'], name='core_invent_outlet__94ea30_idx'), models.Index(fields=['product', 'created_at'], name='core_invent_product_72cdba_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('action', models.CharField(choices=[('Sale', 'Sale'), ('Purchase', 'Purchase'), ('Adjustment', 'Adjustment'), ('Spoilage', 'Spoilage'), ('Transfer', 'Transfer')], max_length=20)),
+                ('quantity_changed', models.IntegerField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('outlet', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_summaries', to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_summaries', to='core.product')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['outlet', 'month'], name='core_invent_outlet__b62c15_idx')],
+                'unique_together': {('product', 'month', 'action')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_inventorylogarchive_inventorymonthlysummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_threshold',
+            field=models.IntegerField(blank=True, help_text='Reorder below this level; blank uses the report default', null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='optimal_stock',
+            field=models.IntegerField(blank=True, help_text='Level to reorder up to', null=True),
+        ),
+    ]
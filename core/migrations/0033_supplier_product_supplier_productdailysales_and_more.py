@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_product_low_stock_threshold_product_optimal_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Supplier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('phone', models.CharField(blank=True, max_length=50)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('lead_time_days', models.PositiveIntegerField(default=2, help_text='Days from ordering to delivery')),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suppliers', to='core.outlet')),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('outlet', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='supplier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='core.supplier'),
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='core.product')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['outlet', 'date'], name='core_produc_outlet__79b79c_idx')],
+                'unique_together': {('product', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_velocity', models.FloatField(default=0, help_text='Recent units per day, seasonally adjusted')),
+                ('forecast_demand', models.FloatField(default=0, help_text='Expected units sold over the reorder horizon')),
+                ('horizon_days', models.PositiveIntegerField(default=0, help_text='Supplier lead time plus review period')),
+                ('days_of_cover', models.FloatField(blank=True, help_text='Days current stock lasts; blank when not selling', null=True)),
+                ('suggested_order', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_forecasts', to='core.outlet')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='core.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['outlet', 'suggested_order'], name='core_produc_outlet__7090b1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_purchaseorder_purchaseorderline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorylog',
+            name='reason',
+            field=models.CharField(blank=True, choices=[('expired', 'Expired'), ('damaged', 'Damaged / Breakage'), ('waste', 'Waste'), ('missing', 'Missing / Theft'), ('stock_take', 'Stock-take Count'), ('correction', 'Correction')], help_text='Why a spoilage or adjustment was made', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='inventorylogarchive',
+            name='reason',
+            field=models.CharField(blank=True, choices=[('expired', 'Expired'), ('damaged', 'Damaged / Breakage'), ('waste', 'Waste'), ('missing', 'Missing / Theft'), ('stock_take', 'Stock-take Count'), ('correction', 'Correction')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_inventorylog_reason_inventorylogarchive_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, default=1, help_text='Units of the component per unit sold', max_digits=10)),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='used_in', to='core.product')),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_components', to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='components', to='core.product')),
+            ],
+            options={
+                'unique_together': {('product', 'component')},
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_productcomponent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Modifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('price', models.DecimalField(decimal_places=2, default=0, help_text='Added to the line price', max_digits=10)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modifiers', to='core.outlet')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='modifiers',
+            field=models.ManyToManyField(blank=True, to='core.modifier'),
+        ),
+        migrations.CreateModel(
+            name='ModifierGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modifier_groups', to='core.outlet')),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('outlet', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='modifier',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modifiers', to='core.modifiergroup'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='modifier_groups',
+            field=models.ManyToManyField(blank=True, related_name='products', to='core.modifiergroup'),
+        ),
+        migrations.CreateModel(
+            name='ProductVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Option values, e.g. 'Large / Oat'", max_length=200)),
+                ('sku', models.CharField(blank=True, max_length=50, null=True)),
+                ('selling_price', models.DecimalField(blank=True, decimal_places=2, help_text='Blank uses the product price', max_digits=10, null=True)),
+                ('cost_price', models.DecimalField(blank=True, decimal_places=2, help_text='Blank uses the product cost', max_digits=10, null=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_variants', to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='core.product')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'unique_together': {('product', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.productvariant'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_subtotals(apps, schema_editor):
+    # Sales before the tax engine carried no tax, so their subtotal is the total
+    SaleTransaction = apps.get_model('core', 'SaleTransaction')
+    SaleTransaction.objects.update(subtotal=models.F('total_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_variants_modifiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleitem',
+            name='tax_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Tax on the whole line', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='saletransaction',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Before tax', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='saletransaction',
+            name='tax_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Tax',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rate', models.DecimalField(decimal_places=2, help_text='Percent, e.g. 8 for 8%', max_digits=5)),
+                ('applies_to_rooms', models.BooleanField(default=False, help_text='Also charged on karaoke room time')),
+                ('is_active', models.BooleanField(default=True)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taxes', to='core.outlet')),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('outlet', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleTaxLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('taxable_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_lines', to='core.saletransaction')),
+                ('tax', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.tax')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='taxes',
+            field=models.ManyToManyField(blank=True, related_name='products', to='core.tax'),
+        ),
+        migrations.RunPython(backfill_subtotals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_taxes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_remainder',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='Fractional recipe usage carried to the next sale', max_digits=10),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def net_pos_sales(apps, schema_editor):
+    # Rollups built since the tax engine summed total_amount; POS sales are reported net of tax
+    OutletDailyRollup = apps.get_model('core', 'OutletDailyRollup')
+    SaleTransaction = apps.get_model('core', 'SaleTransaction')
+    net = SaleTransaction.objects.filter(
+        outlet=models.OuterRef('outlet'), date__date=models.OuterRef('date'), room_session__isnull=True,
+    ).values('outlet').annotate(total=models.Sum('subtotal')).values('total')
+    OutletDailyRollup.objects.update(pos_sales=Coalesce(
+        models.Subquery(net), models.Value(Decimal('0')), output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_product_stock_remainder'),
+        ('karaoke', '0019_roomsession_sale'),
+    ]
+
+    operations = [
+        migrations.RunPython(net_pos_sales, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from core.multi_tenant import OutletManager
 
 # --- BASIC INFRASTRUCTURE ---
 
@@ -35,6 +36,9 @@ class Employee(models.Model):
     is_active = models.BooleanField(default=True)
     date_joined = models.DateField(null=True, blank=True)
     
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     # Legacy field for backward compatibility
     @property
     def salary(self):
@@ -49,6 +53,41 @@ class Employee(models.Model):
 
 # --- PRODUCT & INVENTORY ---
 
+class Supplier(models.Model):
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='suppliers')
+    name = models.CharField(max_length=200)
+    phone = models.CharField(max_length=50, blank=True)
+    email = models.EmailField(blank=True)
+    lead_time_days = models.PositiveIntegerField(default=2, help_text="Days from ordering to delivery")
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('outlet', 'name')
+
+class Tax(models.Model):
+    """A tax or service charge, added on top of the prices of the products that carry it."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='taxes')
+    name = models.CharField(max_length=100)
+    rate = models.DecimalField(max_digits=5, decimal_places=2, help_text="Percent, e.g. 8 for 8%")
+    applies_to_rooms = models.BooleanField(default=False, help_text="Also charged on karaoke room time")
+    is_active = models.BooleanField(default=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.name} ({self.rate}%)"
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('outlet', 'name')
+
 class Product(models.Model):
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='products', null=True)
     name = models.CharField(max_length=200)
@@ -57,12 +96,104 @@ class Product(models.Model):
     cost_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
     current_stock_level = models.IntegerField(default=0)
+    # Recipe usage not yet taken off current_stock_level (see core.inventory.deduct_sale_stock)
+    stock_remainder = models.DecimalField(max_digits=10, decimal_places=3, default=0, help_text="Fractional recipe usage carried to the next sale")
+    low_stock_threshold = models.IntegerField(null=True, blank=True, help_text="Reorder below this level; blank uses the report default")
+    optimal_stock = models.IntegerField(null=True, blank=True, help_text="Level to reorder up to")
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
     is_favorite = models.BooleanField(default=False)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    modifier_groups = models.ManyToManyField('ModifierGroup', blank=True, related_name='products')
+    taxes = models.ManyToManyField(Tax, blank=True, related_name='products')
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
 
     def __str__(self):
         return f"{self.name} ({self.category if self.category else 'No Category'})"
 
+class ProductVariant(models.Model):
+    """A sellable option of a product (e.g. Large / Oat milk). Variants share their product's stock."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='product_variants')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
+    name = models.CharField(max_length=200, help_text="Option values, e.g. 'Large / Oat'")
+    sku = models.CharField(max_length=50, null=True, blank=True)
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Blank uses the product price")
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Blank uses the product cost")
+    position = models.PositiveIntegerField(default=0)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.outlet_id is None:
+            self.outlet_id = self.product.outlet_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.product.name} - {self.name}"
+
+    class Meta:
+        ordering = ['position', 'id']
+        unique_together = ('product', 'name')
+
+class ModifierGroup(models.Model):
+    """A set of add-ons offered on some products (e.g. Milk, Extra shots)."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='modifier_groups')
+    name = models.CharField(max_length=100)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('outlet', 'name')
+
+class Modifier(models.Model):
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='modifiers')
+    group = models.ForeignKey(ModifierGroup, on_delete=models.CASCADE, related_name='modifiers')
+    name = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Added to the line price")
+    position = models.PositiveIntegerField(default=0)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.outlet_id is None:
+            self.outlet_id = self.group.outlet_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.group.name}: {self.name}"
+
+    class Meta:
+        ordering = ['position', 'id']
+
+class ProductComponent(models.Model):
+    """Bill of materials: selling `product` uses `quantity` of `component` (e.g. a cocktail's spirits and mixers)."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='product_components')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='components')
+    component = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='used_in')
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, default=1, help_text="Units of the component per unit sold")
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.outlet_id is None:
+            self.outlet_id = self.product.outlet_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity} x {self.component.name}"
+
+    class Meta:
+        unique_together = ('product', 'component')
+
 class InventoryLog(models.Model):
     """Log all inventory changes - purchases, sales, adjustments, etc."""
     ACTION_CHOICES = [
@@ -72,6 +203,14 @@ class InventoryLog(models.Model):
         ('Spoilage', 'Spoilage'),
         ('Transfer', 'Transfer'),
     ]
+    REASON_CHOICES = [
+        ('expired', 'Expired'),
+        ('damaged', 'Damaged / Breakage'),
+        ('waste', 'Waste'),
+        ('missing', 'Missing / Theft'),
+        ('stock_take', 'Stock-take Count'),
+        ('correction', 'Correction'),
+    ]
     
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='inventory_logs', null=True)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_logs')
@@ -79,10 +218,14 @@ class InventoryLog(models.Model):
     quantity_changed = models.IntegerField(help_text="Positive for additions, negative for deductions")
     previous_level = models.IntegerField(default=0)
     new_level = models.IntegerField(default=0)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, blank=True, help_text="Why a spoilage or adjustment was made")
     reference = models.CharField(max_length=100, blank=True, null=True, help_text="Transaction ID, PO number, etc.")
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"{self.product.name} ({self.action}: {self.quantity_changed})"
     
@@ -97,6 +240,58 @@ class InventoryLog(models.Model):
 # Legacy alias for backward compatibility
 StockAdjustment = InventoryLog
 
+
+class InventoryLogArchive(models.Model):
+    """InventoryLog rows moved out of the hot table by archive_inventory_logs; ids are kept."""
+    id = models.BigIntegerField(primary_key=True)
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='archived_inventory_logs', null=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_inventory_logs')
+    action = models.CharField(max_length=20, choices=InventoryLog.ACTION_CHOICES)
+    quantity_changed = models.IntegerField()
+    previous_level = models.IntegerField(default=0)
+    new_level = models.IntegerField(default=0)
+    reason = models.CharField(max_length=20, choices=InventoryLog.REASON_CHOICES, blank=True)
+    reference = models.CharField(max_length=100, blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.product.name} ({self.action}: {self.quantity_changed})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['outlet', 'created_at']),
+            models.Index(fields=['product', 'created_at']),
+        ]
+
+
+class InventoryMonthlySummary(models.Model):
+    """Net quantity per product, month and action for archived InventoryLog rows."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='inventory_summaries', null=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_summaries')
+    month = models.DateField(help_text="First day of the month")
+    action = models.CharField(max_length=20, choices=InventoryLog.ACTION_CHOICES)
+    quantity_changed = models.IntegerField(default=0)
+    entry_count = models.IntegerField(default=0)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.product.name} {self.month:%Y-%m} {self.action}: {self.quantity_changed}"
+
+    class Meta:
+        ordering = ['-month']
+        unique_together = ('product', 'month', 'action')
+        indexes = [
+            models.Index(fields=['outlet', 'month']),
+        ]
+
 # --- SALES & CUSTOMERS ---
 
 class Customer(models.Model):
@@ -110,26 +305,79 @@ class Customer(models.Model):
     visit_count = models.PositiveIntegerField(default=0)
     notes = models.TextField(blank=True, null=True)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"{self.name} ({self.visit_count} visits)"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'current_balance']),
+        ]
+
 class SaleTransaction(models.Model):
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='sales', null=True)
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True) 
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Before tax")
+    tax_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=50, default='Cash')
     customer_name = models.CharField(max_length=100, blank=True, null=True)
     status = models.CharField(max_length=20, default='Completed')
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"Transaction #{self.id} - {self.total_amount}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'date']),
+        ]
+
 class SaleItem(models.Model):
     sale = models.ForeignKey(SaleTransaction, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True)
+    modifiers = models.ManyToManyField(Modifier, blank=True)
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Product cost when sold, so margins don't move when cost_price is re-imported
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Tax on the whole line")
+
+    # SaleItem has no outlet column; it is scoped through its sale
+    tenant_outlet_field = 'sale__outlet'
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.unit_cost is None and self.product_id:
+            variant_cost = self.variant.cost_price if self.variant_id else None
+            self.unit_cost = self.product.cost_price if variant_cost is None else variant_cost
+        super().save(*args, **kwargs)
+
+class SaleTaxLine(models.Model):
+    """One tax component of a sale, stored at checkout so reports sum it instead of recomputing."""
+    sale = models.ForeignKey(SaleTransaction, on_delete=models.CASCADE, related_name='tax_lines')
+    tax = models.ForeignKey(Tax, on_delete=models.SET_NULL, null=True, blank=True)
+    # Name and rate as charged, so editing a Tax doesn't rewrite history
+    name = models.CharField(max_length=100)
+    rate = models.DecimalField(max_digits=5, decimal_places=2)
+    taxable_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    tenant_outlet_field = 'sale__outlet'
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.name} {self.amount}"
 
 class CreditPayment(models.Model):
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='credit_payments', null=True)
@@ -138,6 +386,9 @@ class CreditPayment(models.Model):
     notes = models.TextField(blank=True, null=True)
     date = models.DateTimeField(auto_now_add=True)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
 # --- EXPENSES ---
 
 class Expense(models.Model):
@@ -146,9 +397,17 @@ class Expense(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(auto_now_add=True)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return self.description
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'date']),
+        ]
+
 # --- HR & PAYROLL ---
 
 class Attendance(models.Model):
@@ -161,6 +420,9 @@ class Attendance(models.Model):
     hours_worked = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Calculated hours worked")
     notes = models.TextField(blank=True, null=True)
     
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"{self.employee.name} - {self.date}"
     
@@ -214,6 +476,9 @@ class Payroll(models.Model):
     calculated_at = models.DateTimeField(null=True, blank=True)
     paid_at = models.DateTimeField(null=True, blank=True)
     
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"{self.employee.name} - {self.year}-{self.month:02d}"
     
@@ -266,4 +531,151 @@ class Payroll(models.Model):
         self.net_pay = self.total_earnings - self.deductions
         self.status = 'Calculated'
         self.save()
-        return self.net_pay
\ No newline at end of file
+        return self.net_pay
+
+# --- REPORTING ---
+
+class OutletDailyRollup(models.Model):
+    """Pre-aggregated totals for one outlet and one closed day; built by the build_rollups command."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    pos_sales = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    karaoke_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    session_count = models.IntegerField(default=0)
+    expenses = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    built_at = models.DateTimeField(auto_now=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.outlet} - {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('outlet', 'date')
+
+
+class StockSnapshot(models.Model):
+    """One product's stock level and unit cost at a point in time; taken by the snapshot_stock command."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='stock_snapshots')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    quantity = models.IntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    taken_at = models.DateTimeField()
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.product.name} on {self.date}: {self.quantity}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('product', 'date')
+        indexes = [
+            models.Index(fields=['outlet', 'taken_at']),
+        ]
+
+
+class ProductDailySales(models.Model):
+    """Units of one product sold on one closed day (POS and room orders); built by forecast_demand."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='product_daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.product.name} on {self.date}: {self.quantity}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('product', 'date')
+        indexes = [
+            models.Index(fields=['outlet', 'date']),
+        ]
+
+
+class ProductForecast(models.Model):
+    """Latest demand forecast and reorder suggestion for a product; rebuilt nightly by forecast_demand."""
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='product_forecasts')
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='forecast')
+    daily_velocity = models.FloatField(default=0, help_text="Recent units per day, seasonally adjusted")
+    forecast_demand = models.FloatField(default=0, help_text="Expected units sold over the reorder horizon")
+    horizon_days = models.PositiveIntegerField(default=0, help_text="Supplier lead time plus review period")
+    days_of_cover = models.FloatField(null=True, blank=True, help_text="Days current stock lasts; blank when not selling")
+    suggested_order = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"Forecast for {self.product.name}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'suggested_order']),
+        ]
+
+
+# --- PURCHASING ---
+
+class PurchaseOrder(models.Model):
+    STATUS_CHOICES = [
+        ('Draft', 'Draft'),
+        ('Ordered', 'Ordered'),
+        ('Partial', 'Partially Received'),
+        ('Received', 'Received'),
+        ('Cancelled', 'Cancelled'),
+    ]
+    OPEN_STATUSES = ('Draft', 'Ordered', 'Partial')
+
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='purchase_orders')
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchase_orders')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Draft')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    received_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"PO-{self.pk} ({self.supplier or 'No supplier'})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['outlet', 'status']),
+        ]
+
+
+class PurchaseOrderLine(models.Model):
+    order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchase_order_lines')
+    quantity_ordered = models.PositiveIntegerField(default=0)
+    quantity_received = models.PositiveIntegerField(default=0)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    # Lines have no outlet column; they are scoped through their order
+    tenant_outlet_field = 'order__outlet'
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def __str__(self):
+        return f"{self.product.name} x {self.quantity_ordered}"
+
+    @property
+    def quantity_outstanding(self):
+        return max(self.quantity_ordered - self.quantity_received, 0)
+
+    class Meta:
+        unique_together = ('order', 'product')
@@ -1,37 +1,133 @@
 """
 Multi-Tenant Utilities for CafeManager
 Provides managers, querysets, and utilities for outlet-based data isolation
+
+OutletMiddleware sets a request-scoped tenant context (a contextvar). Models whose
+default manager is OutletManager are then filtered to that outlet automatically,
+and querying them in a tenant request with no outlet raises TenantScopeError.
+Outside a tenant context (management commands, workers, public pages) the managers
+are unscoped. Use Model.all_outlets or unscoped() for deliberate cross-outlet access.
 """
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import PermissionDenied
 from django.db import models
 from django.db.models import Q
 
+# (outlet, required) while a tenant request is being handled, else None
+_tenant = ContextVar('tenant', default=None)
+
+
+class TenantScopeError(PermissionDenied):
+    """A tenant-scoped model was queried in a tenant code path that has no outlet."""
+
+
+def set_tenant(outlet, required=True):
+    """Scope tenant managers to outlet. With required=True a missing outlet raises on query."""
+    _tenant.set((outlet, required))
+
+
+def clear_tenant():
+    _tenant.set(None)
+
+
+def get_current_outlet():
+    """The outlet of the current tenant context, or None."""
+    tenant = _tenant.get()
+    return tenant[0] if tenant else None
+
+
+@contextmanager
+def outlet_context(outlet, required=True):
+    """Scope tenant managers to outlet for the duration of the block (commands, workers, tests)."""
+    token = _tenant.set((outlet, required))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+@contextmanager
+def unscoped():
+    """Disable tenant scoping for the block, e.g. for owner-level cross-outlet reports."""
+    token = _tenant.set(None)
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def tenant_exempt(view_func):
+    """Mark a view (public booking pages, customer tablets) as not running in a tenant context."""
+    view_func.tenant_exempt = True
+    return view_func
+
 
 class OutletQuerySet(models.QuerySet):
     """Custom QuerySet that filters by outlet"""
     def for_outlet(self, outlet):
         """Filter queryset for a specific outlet"""
         if outlet:
-            return self.filter(outlet=outlet)
+            return self.filter(**{outlet_field(self.model): outlet})
         return self
 
 
+def outlet_field(model):
+    """Lookup path from a tenant model to its outlet; models without a direct FK set tenant_outlet_field."""
+    return getattr(model, 'tenant_outlet_field', 'outlet')
+
+
 class OutletManager(models.Manager):
-    """Custom Manager for outlet-based filtering"""
+    """
+    Default manager for tenant models: filters by the current tenant outlet.
+    Related managers (outlet.products, sale.items, ...) inherit the scoping.
+    """
     def get_queryset(self):
-        return OutletQuerySet(self.model, using=self._db)
+        qs = OutletQuerySet(self.model, using=self._db)
+        tenant = _tenant.get()
+        if tenant is None:
+            return qs
+        outlet, required = tenant
+        if outlet is not None:
+            return qs.filter(**{outlet_field(self.model): outlet})
+        if required:
+            raise TenantScopeError(f"{self.model.__name__} queried without an outlet in a tenant request")
+        return qs
     
     def for_outlet(self, outlet):
         """Filter for a specific outlet"""
         return self.get_queryset().for_outlet(outlet)
 
 
+# Session key holding the outlet a user switched to (see core.views.switch_outlet)
+OUTLET_SESSION_KEY = 'outlet_id'
+
+
+def get_outlet_by_id(outlet_id):
+    """Outlet by primary key, served from the cache; invalidated when the outlet is saved or deleted."""
+    from core.cache import cache_aside
+    from core.models import Outlet
+    return cache_aside('outlets', outlet_id, ('obj',), lambda: Outlet.objects.filter(pk=outlet_id).first())
+
+
+def can_switch_to(user, outlet):
+    """Superusers may work in any outlet, owners in the outlets they own."""
+    return user.is_superuser or outlet.owner_id == user.id
+
+
 def get_user_outlet(user):
     """
     Get the outlet for a given user.
+    - If a tenant context is active, return its outlet
     - If user is an employee, return their outlet
     - If user is staff/owner, return their first outlet
     - Otherwise return None
     """
+    outlet = get_current_outlet()
+    if outlet is not None:
+        return outlet
+
     try:
         if hasattr(user, 'employee') and user.employee:
             return user.employee.outlet
@@ -0,0 +1,310 @@
+"""
+Reporting Utilities for CafeManager
+Cross-outlet aggregates for owners with several outlets, the per-outlet
+financial summary (revenue, COGS, expenses, payroll, margins by period) and tax collected.
+
+Group reports run one grouped query per metric (GROUP BY outlet), so the
+number of queries does not grow with the number of outlets. Closed days are read from
+OutletDailyRollup once build_rollups has run; any outlet and day without a rollup row
+(today, a skipped nightly run, an outlet added later) is aggregated from the source tables.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DateField, DecimalField, ExpressionWrapper, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Trunc
+
+from core.cache import cache_aside
+from core.models import Outlet, Product, SaleTransaction, SaleItem, SaleTaxLine, Expense, Payroll, OutletDailyRollup
+
+ZERO = Decimal('0')
+
+# Per-day totals that can be summed over a date range (and so rolled up)
+FLOW_METRICS = {
+    'pos_sales': ZERO,
+    'transaction_count': 0,
+    'karaoke_revenue': ZERO,
+    'session_count': 0,
+    'expenses': ZERO,
+}
+
+
+def owner_outlets(user):
+    """Outlets included in a user's group reports: every outlet for superusers, else the ones they own."""
+    if user.is_superuser:
+        return Outlet.objects.all()
+    return Outlet.objects.filter(owner=user)
+
+
+def _empty_flows(outlet_ids):
+    return {outlet_id: dict(FLOW_METRICS) for outlet_id in outlet_ids}
+
+
+def live_flows(outlet_ids, start, end):
+    """Flow metrics per outlet for start..end (inclusive), aggregated from the source tables."""
+    from karaoke.models import RoomSession
+
+    result = _empty_flows(outlet_ids)
+    # Room session payments are counted once, as karaoke revenue; both are net of tax, like the financial summary
+    sales = SaleTransaction.all_outlets.filter(
+        outlet_id__in=outlet_ids, date__date__range=(start, end), room_session__isnull=True
+    ).values('outlet').annotate(total=Sum('subtotal'), count=Count('id')).order_by()
+    for row in sales:
+        result[row['outlet']].update(pos_sales=row['total'] or ZERO, transaction_count=row['count'])
+
+    sessions = RoomSession.all_outlets.filter(
+        outlet_id__in=outlet_ids, status='Completed', ended_at__date__range=(start, end)
+    ).values('outlet').annotate(total=Sum('total_charge'), count=Count('id')).order_by()
+    for row in sessions:
+        result[row['outlet']].update(karaoke_revenue=row['total'] or ZERO, session_count=row['count'])
+
+    expenses = Expense.all_outlets.filter(
+        outlet_id__in=outlet_ids, date__range=(start, end)
+    ).values('outlet').annotate(total=Sum('amount')).order_by()
+    for row in expenses:
+        result[row['outlet']]['expenses'] = row['total'] or ZERO
+    return result
+
+
+def rollup_flows(outlet_ids, start, end):
+    """Flow metrics per outlet for start..end (inclusive), summed from OutletDailyRollup."""
+    result = _empty_flows(outlet_ids)
+    rows = OutletDailyRollup.all_outlets.filter(
+        outlet_id__in=outlet_ids, date__range=(start, end)
+    ).values('outlet').annotate(**{metric: Sum(metric) for metric in FLOW_METRICS}).order_by()
+    for row in rows:
+        result[row['outlet']].update({metric: row[metric] or default for metric, default in FLOW_METRICS.items()})
+    return result
+
+
+def rollup_coverage(outlet_ids, start, end):
+    """{outlet_id: set of days in start..end (inclusive) that have a rollup row}."""
+    covered = {outlet_id: set() for outlet_id in outlet_ids}
+    rows = OutletDailyRollup.all_outlets.filter(outlet_id__in=outlet_ids, date__range=(start, end)).values_list('outlet_id', 'date')
+    for outlet_id, day in rows:
+        covered[outlet_id].add(day)
+    return covered
+
+
+def missing_ranges(covered, start, end):
+    """Contiguous (first, last) runs of days in start..end that are not in covered."""
+    ranges = []
+    day = start
+    while day <= end:
+        if day not in covered:
+            if ranges and ranges[-1][1] == day - timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        day += timedelta(days=1)
+    return ranges
+
+
+def _add_flows(result, extra):
+    for outlet_id, metrics in extra.items():
+        for metric, value in metrics.items():
+            result[outlet_id][metric] += value
+
+
+def flows(outlet_ids, start, end):
+    """
+    Flow metrics per outlet, from rollups for the (outlet, day) pairs they cover and live
+    queries for the rest. Outlets missing the same run of days share one live query.
+    """
+    result = rollup_flows(outlet_ids, start, end)
+    gaps = {}
+    for outlet_id, covered in rollup_coverage(outlet_ids, start, end).items():
+        for span in missing_ranges(covered, start, end):
+            gaps.setdefault(span, []).append(outlet_id)
+    for (first, last), gap_outlet_ids in gaps.items():
+        _add_flows(result, live_flows(gap_outlet_ids, first, last))
+    return result
+
+
+def stock_value(outlet_ids):
+    """Current stock value at cost per outlet."""
+    value = ExpressionWrapper(F('current_stock_level') * F('cost_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    rows = Product.all_outlets.filter(outlet_id__in=outlet_ids).values('outlet').annotate(total=Sum(value)).order_by()
+    return {row['outlet']: row['total'] or ZERO for row in rows}
+
+
+def payroll_cost(outlet_ids, start, end):
+    """Net payroll per outlet for every month that overlaps start..end."""
+    rows = Payroll.all_outlets.annotate(period=F('year') * 12 + F('month')).filter(
+        outlet_id__in=outlet_ids,
+        period__range=(start.year * 12 + start.month, end.year * 12 + end.month),
+    ).values('outlet').annotate(total=Sum('net_pay')).order_by()
+    return {row['outlet']: row['total'] or ZERO for row in rows}
+
+
+def group_summary(outlets, start, end):
+    """
+    Consolidated figures for outlets over start..end (inclusive).
+    Returns {'rows': [per-outlet dicts, highest revenue first], 'totals': {...}}.
+    """
+    outlets = list(outlets)
+    outlet_ids = [outlet.id for outlet in outlets]
+    flow = flows(outlet_ids, start, end)
+    stock = stock_value(outlet_ids)
+    payroll = payroll_cost(outlet_ids, start, end)
+
+    rows = []
+    for outlet in outlets:
+        row = {'outlet': outlet, **flow[outlet.id]}
+        row['revenue'] = row['pos_sales'] + row['karaoke_revenue']
+        row['payroll'] = payroll.get(outlet.id, ZERO)
+        row['costs'] = row['expenses'] + row['payroll']
+        row['net'] = row['revenue'] - row['costs']
+        row['stock_value'] = stock.get(outlet.id, ZERO)
+        rows.append(row)
+
+    summed = [metric for metric in rows[0] if metric != 'outlet'] if rows else []
+    totals = {metric: sum(row[metric] for row in rows) for metric in summed}
+    for row in rows:
+        row['revenue_share'] = (row['revenue'] / totals['revenue'] * 100) if totals.get('revenue') else ZERO
+    rows.sort(key=lambda row: row['revenue'], reverse=True)
+    return {'rows': rows, 'totals': totals}
+
+
+def build_daily_rollups(day, outlets=None):
+    """Write (or overwrite) OutletDailyRollup rows for one day. Returns the number of rows written."""
+    outlet_ids = list((outlets if outlets is not None else Outlet.objects.all()).values_list('id', flat=True))
+    if not outlet_ids:
+        return 0
+    data = live_flows(outlet_ids, day, day)
+    OutletDailyRollup.all_outlets.bulk_create(
+        [OutletDailyRollup(outlet_id=outlet_id, date=day, **metrics) for outlet_id, metrics in data.items()],
+        update_conflicts=True,
+        unique_fields=['outlet', 'date'],
+        update_fields=[*FLOW_METRICS, 'built_at'],
+    )
+    return len(outlet_ids)
+
+
+# --- FINANCIAL SUMMARY ---
+
+BUCKETS = ('day', 'week', 'month')
+FINANCE_METRICS = ('pos_revenue', 'karaoke_revenue', 'cogs', 'expenses', 'payroll')
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing day."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(start, end, bucket):
+    """Every bucket start from the bucket containing start up to end."""
+    current = bucket_start(start, bucket)
+    while current <= end:
+        yield current
+        if bucket == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == 'week' else 1)
+
+
+def _bucketed(queryset, date_field, bucket, value):
+    """{bucket start: total} from one grouped query."""
+    period = Trunc(date_field, bucket, output_field=DateField())
+    rows = queryset.annotate(period=period).values('period').annotate(total=Sum(value)).order_by()
+    return {row['period']: row['total'] or ZERO for row in rows}
+
+
+def compute_financial_summary(outlet, start, end, bucket='day'):
+    """
+    Revenue (net of tax), COGS, expenses, payroll and margins for one outlet over start..end
+    (inclusive), bucketed by day, week or month. One grouped query per metric.
+    Payroll is monthly, so each month's payroll lands in the first bucket of that month in range.
+    """
+    from karaoke.models import RoomOrderItem, RoomSession
+
+    # unit_cost is captured at sale time, so COGS doesn't join to today's Product.cost_price
+    cost = ExpressionWrapper(F('quantity') * F('unit_cost'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    # Room session payments are counted once, through the session (karaoke_revenue, room_cogs)
+    series = {
+        'pos_revenue': _bucketed(
+            SaleTransaction.all_outlets.filter(outlet=outlet, date__date__range=(start, end), room_session__isnull=True),
+            'date', bucket, 'subtotal'),
+        'karaoke_revenue': _bucketed(
+            RoomSession.all_outlets.filter(outlet=outlet, status='Completed', ended_at__date__range=(start, end)),
+            'ended_at', bucket, 'total_charge'),
+        'cogs': _bucketed(
+            SaleItem.all_outlets.filter(sale__outlet=outlet, sale__date__date__range=(start, end), sale__room_session__isnull=True),
+            'sale__date', bucket, cost),
+        'room_cogs': _bucketed(
+            RoomOrderItem.all_outlets.filter(
+                outlet=outlet, order__session__status='Completed', order__session__ended_at__date__range=(start, end)),
+            'order__session__ended_at', bucket, cost),
+        'expenses': _bucketed(
+            Expense.all_outlets.filter(outlet=outlet, date__range=(start, end)),
+            'date', bucket, 'amount'),
+    }
+
+    payroll = {}
+    months = Payroll.all_outlets.annotate(period=F('year') * 12 + F('month')).filter(
+        outlet=outlet, period__range=(start.year * 12 + start.month, end.year * 12 + end.month),
+    ).values('year', 'month').annotate(total=Sum('net_pay')).order_by()
+    for row in months:
+        key = bucket_start(max(date(row['year'], row['month'], 1), start), bucket)
+        payroll[key] = payroll.get(key, ZERO) + (row['total'] or ZERO)
+    series['payroll'] = payroll
+    # Room orders are billed through the session, so their cost falls where its revenue does
+    for period, total in series.pop('room_cogs').items():
+        series['cogs'][period] = series['cogs'].get(period, ZERO) + total
+
+    rows = []
+    for period in bucket_starts(start, end, bucket):
+        row = {'period': period, **{metric: series[metric].get(period, ZERO) for metric in FINANCE_METRICS}}
+        rows.append(_with_margins(row))
+    totals = _with_margins({metric: sum(row[metric] for row in rows) for metric in FINANCE_METRICS})
+    return {'start': start, 'end': end, 'bucket': bucket, 'rows': rows, 'totals': totals}
+
+
+def _with_margins(row):
+    row['revenue'] = row['pos_revenue'] + row['karaoke_revenue']
+    row['gross_profit'] = row['revenue'] - row['cogs']
+    row['gross_margin'] = (row['gross_profit'] / row['revenue'] * 100) if row['revenue'] else ZERO
+    row['net_profit'] = row['gross_profit'] - row['expenses'] - row['payroll']
+    return row
+
+
+def financial_summary(outlet, start, end, bucket='day'):
+    """compute_financial_summary, cached per (outlet, range, bucket) until the outlet's sales, costs or payroll change."""
+    return cache_aside(
+        'finance', outlet, (start.isoformat(), end.isoformat(), bucket),
+        lambda: compute_financial_summary(outlet, start, end, bucket),
+    )
+
+
+def tax_summary(outlet, start, end):
+    """Tax collected per tax and rate over start..end: one aggregate over the stored SaleTaxLine rows, cached like the financial summary."""
+    return cache_aside('finance', outlet, ('taxes', start.isoformat(), end.isoformat()), lambda: list(
+        SaleTaxLine.all_outlets.filter(sale__outlet=outlet, sale__date__date__range=(start, end))
+        .values('name', 'rate').annotate(taxable_amount=Sum('taxable_amount'), amount=Sum('amount')).order_by('name', 'rate')
+    ))
+
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_unit_costs(model, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Fill unit_cost on SaleItem/RoomOrderItem rows that have none from their product's
+    current cost_price, one primary-key range per UPDATE so no single statement holds
+    the table for long. Rows sold before unit_cost existed can only get today's cost.
+    Also works on historical models inside migrations. Returns the number of rows filled.
+    """
+    product_model = model._meta.get_field('product').related_model
+    cost = Subquery(product_model._base_manager.filter(pk=OuterRef('product_id')).values('cost_price')[:1])
+    pending = model._base_manager.filter(unit_cost__isnull=True, product__isnull=False)
+    bounds = pending.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    filled = 0
+    for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+        filled += pending.filter(pk__gte=low, pk__lt=low + batch_size).update(unit_cost=cost)
+    return filled
@@ -0,0 +1,237 @@
+"""
+Sales Service for CafeManager
+The single checkout, sales history and receipt code path shared by the counter POS and karaoke.
+
+checkout prices the cart from the cached menu (price_cart) and taxes (compute_taxes) before
+opening a transaction, then writes the sale with a fixed number of queries whatever the cart
+size: one insert each for the sale, its lines, tax lines and line modifiers, the bulk stock
+deduction and the customer update. History pages and receipts load everything their templates
+show up front, and the day's takings come from one conditional aggregate.
+
+Room tablet orders are priced the same way (add_room_order). Karaoke sessions are paid
+through checkout_room_session: one transaction that writes each table once (the session,
+its room, the customer, the sale, its lines, tax lines and stock) and links the sale to the
+session, so resubmitting the checkout returns the first sale instead of charging again.
+"""
+from decimal import Decimal
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Prefetch, Q, Sum
+from django.shortcuts import get_object_or_404
+
+from core.cache import invalidate
+from core.catalog import price_cart
+from core.inventory import deduct_sale_stock
+from core.models import Customer, SaleItem, SaleTransaction
+from core.taxes import compute_taxes, save_tax_lines
+
+ZERO = Decimal('0')
+PAYMENT_METHODS = ['Cash', 'Transfer', 'Card', 'Credit']
+SALES_HISTORY_PAGE_SIZE = 50
+
+
+def checkout(outlet, items, payment_method='Cash', customer_id=None, customer_name=None, claimed_total=None, sold_by=''):
+    """
+    Record a POS sale of items (price_cart cart lines) and return the SaleTransaction. Stock is
+    deducted for every payment method; credit sales need a customer of the outlet and are
+    added to their balance. Raises ValueError for empty, tampered or stale carts.
+    """
+    if not items:
+        raise ValueError("Cart is empty")
+    sale_items, line_modifiers, subtotal = price_cart(outlet, items, claimed_total)
+    taxes = compute_taxes(outlet, [(line.product_id, line.price * line.quantity) for line in sale_items])
+    total_amount = subtotal + taxes['tax_total']
+
+    with transaction.atomic():
+        # Lock the customer row (stock rows are locked by deduct_sale_stock; no-op on SQLite)
+        customer = None
+        if customer_id:
+            customer = Customer.all_outlets.select_for_update().filter(id=customer_id, outlet=outlet).first()
+        if payment_method == 'Credit' and customer is None:
+            raise ValueError("Credit sales require a customer account")
+
+        sale = SaleTransaction.all_outlets.create(
+            outlet=outlet,
+            customer=customer,
+            customer_name=customer.name if customer else (customer_name or 'Walk-in'),
+            subtotal=subtotal,
+            tax_total=taxes['tax_total'],
+            total_amount=total_amount,
+            payment_method=payment_method,
+            status='Completed',
+        )
+        for line, line_tax in zip(sale_items, taxes['line_taxes']):
+            line.sale = sale
+            line.tax_amount = line_tax
+        SaleItem.all_outlets.bulk_create(sale_items)
+        save_tax_lines(sale, taxes)
+        SaleItem.modifiers.through.objects.bulk_create([
+            SaleItem.modifiers.through(saleitem_id=line.pk, modifier_id=modifier_id)
+            for line, modifier_ids in zip(sale_items, line_modifiers) for modifier_id in modifier_ids
+        ])
+
+        # Composites are deducted through their recipes, in one bulk update
+        quantities = {}
+        for line in sale_items:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        deduct_sale_stock(outlet, quantities, reference=f"Transaction #{sale.id}", notes=f"Sold by {sold_by}")
+
+        if customer:
+            customer.visit_count += 1
+            if payment_method == 'Credit':
+                customer.current_balance += total_amount
+                customer.total_credit += total_amount
+            customer.save()
+    return sale
+
+
+def add_room_order(session, items):
+    """
+    Add a room tablet order of items (price_cart cart lines) to an open session and to its
+    running totals, priced from the cached menu. Modifier prices are included in each line's
+    price. Returns the RoomOrder; raises ValueError for closed sessions and for empty,
+    tampered or stale carts.
+    """
+    from karaoke.models import RoomOrder, RoomOrderItem, RoomSession
+
+    if not items:
+        raise ValueError("Cart is empty")
+    sale_items, _, subtotal = price_cart(session.outlet, items)
+    with transaction.atomic():
+        # Checked under the lock checkout_room_session takes, so no order lands after the bill
+        status = RoomSession.all_outlets.select_for_update().values_list('status', flat=True).get(pk=session.pk)
+        if status not in ('Booked', 'Active', 'Paused'):
+            raise ValueError("This session is closed")
+        order = RoomOrder.all_outlets.create(
+            session=session, outlet=session.outlet, total_price=subtotal,
+            item_count=sum(line.quantity for line in sale_items),
+        )
+        RoomOrderItem.all_outlets.bulk_create([
+            RoomOrderItem(order=order, outlet=session.outlet, product_id=line.product_id, quantity=line.quantity,
+                          price=line.price, unit_cost=line.unit_cost)
+            for line in sale_items
+        ])
+        order.add_to_session()
+    return order
+
+
+def _room_lines(session):
+    from karaoke.models import RoomOrderItem
+
+    return list(
+        RoomOrderItem.all_outlets.filter(order__session=session)
+        .order_by('order_id', 'id').values_list('product_id', 'quantity', 'price', 'unit_cost')
+    )
+
+
+def room_bill(session, lines=None):
+    """
+    A session's bill as if it ended now, computed in memory and never saved: charges on the
+    session itself, plus compute_taxes() (room time carries the room taxes, order lines their
+    products') and the grand total.
+    """
+    if session.status != 'Completed':
+        session.close()
+    lines = _room_lines(session) if lines is None else lines
+    taxes = compute_taxes(
+        session.outlet, [(product_id, price * quantity) for product_id, quantity, price, _ in lines],
+        room_amount=session.room_charge + session.extra_time_charge,
+    )
+    return {'taxes': taxes, 'grand_total': session.total_charge + taxes['tax_total']}
+
+
+def checkout_room_session(outlet, session_id, payment_method='Cash'):
+    """
+    Close a karaoke session and record its payment in one transaction: the session's final
+    charges, the room set to Cleaning, one SaleTransaction with a SaleItem per room order line
+    and its tax lines, the stock deduction for those lines and the customer's balance for credit. Returns (sale, created); a
+    session already paid returns its sale with created False. Raises ValueError for
+    cancelled sessions and credit without a customer.
+    """
+    from karaoke.models import Room, RoomSession
+
+    with transaction.atomic():
+        session = RoomSession.all_outlets.select_for_update().select_related('room').get(pk=session_id, outlet=outlet)
+        if session.sale_id:
+            return session.sale, False
+        if session.status == 'Cancelled':
+            raise ValueError("A cancelled session can't be checked out.")
+        if payment_method == 'Credit' and not session.customer_id:
+            raise ValueError("Credit payment requires a registered customer account.")
+
+        lines = _room_lines(session)
+        bill = room_bill(session, lines)
+        taxes = bill['taxes']
+        sale = SaleTransaction.all_outlets.create(
+            outlet=outlet,
+            customer_id=session.customer_id,
+            customer_name=session.customer_name,
+            subtotal=session.total_charge,
+            tax_total=taxes['tax_total'],
+            total_amount=bill['grand_total'],
+            payment_method=payment_method,
+            status='Completed',
+        )
+        # Only the first submit gets to link its sale; a concurrent one rolls back below
+        claimed = RoomSession.all_outlets.filter(pk=session.pk, sale__isnull=True).update(
+            sale=sale, status='Completed', ended_at=session.ended_at,
+            actual_duration_minutes=session.actual_duration_minutes,
+            room_charge=session.room_charge, extra_time_charge=session.extra_time_charge,
+            total_charge=session.total_charge,
+        )
+        if claimed:
+            SaleItem.all_outlets.bulk_create([
+                SaleItem(sale=sale, product_id=product_id, quantity=quantity, price=price, unit_cost=unit_cost, tax_amount=line_tax)
+                for (product_id, quantity, price, unit_cost), line_tax in zip(lines, taxes['line_taxes'])
+            ])
+            save_tax_lines(sale, taxes)
+            # Room F&B leaves stock through the same recipe path as POS sales
+            quantities = {}
+            for product_id, quantity, _, _ in lines:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            if quantities:
+                deduct_sale_stock(outlet, quantities, reference=f"Transaction #{sale.id}", notes=f"Room {session.room.name}")
+            Room.all_outlets.filter(pk=session.room_id).update(status='Cleaning')
+            if payment_method == 'Credit':
+                Customer.all_outlets.filter(pk=session.customer_id).update(
+                    current_balance=F('current_balance') + sale.total_amount,
+                    total_credit=F('total_credit') + sale.total_amount,
+                )
+        else:
+            transaction.set_rollback(True)
+
+    if not claimed:
+        return RoomSession.all_outlets.select_related('sale').get(pk=session_id).sale, False
+    # update() skips post_save, so the Room, RoomSession and Customer cache watchers don't fire
+    for namespace in ('rooms', 'dashboard', 'finance', 'customers'):
+        invalidate(namespace, outlet.pk)
+    return sale, True
+
+
+def sales_page(outlet, page=1):
+    """One page of an outlet's sales, newest first, with their customers joined in."""
+    sales = SaleTransaction.all_outlets.filter(outlet=outlet).select_related('customer').order_by('-date', '-id')
+    return Paginator(sales, SALES_HISTORY_PAGE_SIZE).get_page(page)
+
+
+def receipt_sale(outlet, transaction_id):
+    """A sale of the outlet with its lines, variants, modifiers and tax lines prefetched; 404 if missing."""
+    items = SaleItem.all_outlets.select_related('product', 'variant').prefetch_related('modifiers').order_by('id')
+    return get_object_or_404(
+        SaleTransaction.all_outlets.select_related('customer').prefetch_related(Prefetch('items', queryset=items), 'tax_lines'),
+        pk=transaction_id, outlet=outlet,
+    )
+
+
+def day_takings(outlet, day):
+    """
+    {'total', 'counter' (excluding room session payments), 'Cash', 'Transfer', ...} for the
+    outlet's sales on day, in one query.
+    """
+    totals = SaleTransaction.all_outlets.filter(outlet=outlet, date__date=day).aggregate(
+        total=Sum('total_amount'),
+        counter=Sum('total_amount', filter=Q(room_session__isnull=True)),
+        **{method: Sum('total_amount', filter=Q(payment_method=method)) for method in PAYMENT_METHODS},
+    )
+    return {key: value or ZERO for key, value in totals.items()}
@@ -0,0 +1,122 @@
+"""
+Tax Engine for CafeManager
+Per-line and per-sale taxes and service charges for POS sales and karaoke checkouts.
+
+An outlet's active taxes, and which products carry them, are read once into tax_config and
+cached under the 'tax' namespace until a Tax, a product's tax list or the outlet settings
+change, so pricing a cart runs no queries. Taxes are added on top of prices and are not
+compounded. Each line's tax is rounded to the cent and a sale's components are the sums of
+its lines, so line taxes always add up to the stored breakdown (SaleTaxLine rows and
+SaleItem.tax_amount) that reports aggregate.
+"""
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+
+from core.cache import cached, invalidate
+from core.models import Product, SaleTaxLine, Tax
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+TAX_COLUMN = re.compile(r'^Tax - "(.+)" \((\d+(?:\.\d+)?)%\)$')
+
+
+def _cents(amount):
+    return amount.quantize(CENT, ROUND_HALF_UP)
+
+
+@cached('tax')
+def tax_config(outlet):
+    """
+    {'taxes': {tax id: (name, rate, applies_to_rooms)}, 'products': {product id: [tax ids]},
+    'default': [tax ids for products with none of their own]}. An outlet without Tax rows
+    falls back to OutletSetting.tax_rate, charged on everything including room time.
+    """
+    from karaoke.models import OutletSetting
+
+    taxes = {
+        tax_id: (name, rate, applies_to_rooms)
+        for tax_id, name, rate, applies_to_rooms in Tax.all_outlets.filter(outlet=outlet, is_active=True)
+        .values_list('id', 'name', 'rate', 'applies_to_rooms')
+    }
+    products = {}
+    for product_id, tax_id in Product.taxes.through.objects.filter(tax__in=taxes).values_list('product_id', 'tax_id'):
+        products.setdefault(product_id, []).append(tax_id)
+    default = []
+    if not Tax.all_outlets.filter(outlet=outlet).exists():
+        rate = OutletSetting.all_outlets.filter(outlet=outlet).values_list('tax_rate', flat=True).first()
+        if rate:
+            taxes[None] = ('Tax', rate, True)
+            default = [None]
+    return {'taxes': taxes, 'products': products, 'default': default}
+
+
+def compute_taxes(outlet, lines, room_amount=ZERO):
+    """
+    Taxes for one sale. lines are (product_id, line amount before tax) pairs; room_amount is
+    karaoke room time. Returns {'line_taxes': [tax per line], 'room_tax', 'components':
+    [SaleTaxLine field dicts], 'tax_total'}.
+    """
+    config = tax_config(outlet)
+    components = {}
+
+    def charge(tax_id, amount):
+        name, rate, _ = config['taxes'][tax_id]
+        tax = _cents(amount * rate / HUNDRED)
+        component = components.setdefault(tax_id, {'tax_id': tax_id, 'name': name, 'rate': rate, 'taxable_amount': ZERO, 'amount': ZERO})
+        component['taxable_amount'] += amount
+        component['amount'] += tax
+        return tax
+
+    line_taxes = []
+    for product_id, amount in lines:
+        line_taxes.append(sum((charge(tax_id, amount) for tax_id in config['products'].get(product_id, config['default'])), ZERO))
+    room_tax = ZERO
+    if room_amount:
+        room_tax = sum((charge(tax_id, room_amount) for tax_id, (_, _, applies_to_rooms) in config['taxes'].items() if applies_to_rooms), ZERO)
+    components = list(components.values())
+    return {
+        'line_taxes': line_taxes,
+        'room_tax': room_tax,
+        'components': components,
+        'tax_total': sum((component['amount'] for component in components), ZERO),
+    }
+
+
+def save_tax_lines(sale, taxes):
+    """Store a compute_taxes() breakdown on its sale."""
+    SaleTaxLine.all_outlets.bulk_create([SaleTaxLine(sale=sale, **component) for component in taxes['components']])
+
+
+def import_taxes(outlet, df):
+    """
+    Create the taxes named by the Loyverse 'Tax - "Name" (rate%)' columns and set which
+    products carry them from their Y/N flags. Only taxes in the file are relinked. Returns
+    the number of product tax links.
+    """
+    tax_columns = {}
+    for column in df.columns:
+        match = TAX_COLUMN.match(column)
+        if match:
+            tax_columns[column] = (match.group(1), Decimal(match.group(2)))
+    if not tax_columns:
+        return 0
+    products = dict(Product.all_outlets.filter(outlet=outlet).values_list('name', 'id'))
+    named = df[df['Name'].notna()]
+    through = Product.taxes.through
+
+    with transaction.atomic():
+        Tax.all_outlets.bulk_create([Tax(outlet=outlet, name=name, rate=rate) for name, rate in tax_columns.values()], ignore_conflicts=True)
+        taxes = dict(Tax.all_outlets.filter(outlet=outlet, name__in=[name for name, _ in tax_columns.values()]).values_list('name', 'id'))
+        links = {
+            (products[name], taxes[tax_name])
+            for column, (tax_name, _) in tax_columns.items()
+            for name, flag in zip(named['Name'], named[column])
+            if name in products and str(flag).strip().upper() == 'Y'
+        }
+        through.objects.filter(product_id__in=[products[name] for name in named['Name'] if name in products], tax_id__in=taxes.values()).delete()
+        through.objects.bulk_create([through(product_id=product_id, tax_id=tax_id) for product_id, tax_id in links])
+    invalidate('tax', outlet.pk)
+    return len(links)
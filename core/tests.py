@@ -1,3 +1,786 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from io import StringIO
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.utils import timezone
+from django.db import connection, connections
+from django.core.management import CommandError, call_command
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from CafeManager import db
+from CafeManager.db_routers import PIN_SESSION_KEY, ReplicaPinningMiddleware, ReplicaRouter, read_replica
+from core.cache import cache_aside, get_cache, namespace_version
+from core.inventory import (
+    adjust_stock, archive_inventory_logs, deduct_sale_stock, expand_bom, low_stock_products, low_stock_stats, receive_goods,
+    sales_velocity, stock_as_of, stock_variance, take_stock_snapshots,
+)
+from core.models import (
+    CreditPayment, Customer, InventoryLog, InventoryLogArchive, InventoryMonthlySummary, Modifier, ModifierGroup, Outlet,
+    OutletDailyRollup, Product, ProductComponent, ProductDailySales, ProductForecast, ProductVariant, PurchaseOrder,
+    PurchaseOrderLine, SaleItem, SaleTaxLine, SaleTransaction, StockSnapshot, Supplier, Tax,
+)
+from core.multi_tenant import TenantScopeError, outlet_context
+from core.reporting import backfill_unit_costs, build_daily_rollups, compute_financial_summary, flows, missing_ranges, tax_summary
+from core.catalog import import_options, price_cart
+from core.forecasting import build_daily_sales, compute_forecasts
+from core.taxes import compute_taxes
+from core.sales import checkout
+
+
+class OutletTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.owner = User.objects.create_user('owner', password='pw')
+        self.outlet = Outlet.objects.create(name='Main', owner=self.owner)
+
+    def make_product(self, name='Coffee', price='10.00', cost='4.00', stock=100, outlet=None, **kwargs):
+        return Product.all_outlets.create(
+            outlet=outlet or self.outlet, name=name, selling_price=Decimal(price), cost_price=Decimal(cost),
+            current_stock_level=stock, **kwargs,
+        )
+
+
+@override_settings(RATE_LIMITS={'check_availability': [('ip', '3/m')], 'submit_booking_request': [('outlet', '2/m')]})
+class RateLimitTests(OutletTestCase):
+    def test_ip_bucket(self):
+        statuses = [self.client.get('/karaoke/api/availability/', {'date': '2030-01-01'}).status_code for _ in range(4)]
+        self.assertEqual(statuses[:3], [200] * 3)
+        self.assertEqual(statuses[3], 429)
+
+    def test_outlet_bucket_ignores_request_input(self):
+        self.client.force_login(self.owner)
+        statuses = [
+            self.client.post('/karaoke/booking/submit/', {'outlet': str(i)}).status_code
+            for i in range(3)
+        ]
+        self.assertNotEqual(statuses[1], 429)
+        self.assertEqual(statuses[2], 429)
+
+    def test_outlet_buckets_are_per_user_outlet(self):
+        other = User.objects.create_user('other', password='pw')
+        Outlet.objects.create(name='Other', owner=other)
+        for user in (self.owner, other):
+            self.client.force_login(user)
+            for _ in range(2):
+                self.assertNotEqual(self.client.post('/karaoke/booking/submit/').status_code, 429)
+
+    @override_settings(RATE_LIMITS={'submit_booking_request': [('ip', '1/m'), ('outlet', '1/m')]})
+    def test_anonymous_clients_get_their_own_buckets(self):
+        def post(ip):
+            return self.client.post('/karaoke/booking/submit/', REMOTE_ADDR=ip).status_code
+
+        self.assertNotEqual(post('10.0.0.1'), 429)
+        self.assertEqual(post('10.0.0.1'), 429)
+        self.assertNotEqual(post('10.0.0.2'), 429)
+
+
+class CachedViewTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+
+    def test_dashboard_follows_sales_and_stock(self):
+        product = self.make_product(stock=12)
+        self.assertEqual(self.client.get('/dashboard/').context['total_pos_sales'], 0)
+
+        checkout(self.outlet, [{'id': product.pk, 'quantity': 3}])
+        context = self.client.get('/dashboard/').context
+        self.assertEqual(context['total_pos_sales'], Decimal('30.00'))
+        self.assertEqual([item.current_stock_level for item in context['low_stock_items']], [9])
+
+    def test_pos_customer_list_follows_customer_changes(self):
+        self.assertEqual(self.client.get('/pos/').context['customers'], [])
+        customer = Customer.objects.create(outlet=self.outlet, name='Ali')
+        self.assertEqual(self.client.get('/pos/').context['customers'], [{'id': customer.pk, 'name': 'Ali'}])
+        customer.name = 'Ali B'
+        customer.save()
+        self.assertEqual(self.client.get('/pos/').context['customers'][0]['name'], 'Ali B')
+
+
+@override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 5000})
+class SqlitePragmaTests(SimpleTestCase):
+    def tearDown(self):
+        db._serving = False
+
+    def test_journal_mode_waits_for_the_server(self):
+        self.assertEqual(db.sqlite_pragmas(connection), {'busy_timeout': 5000})
+        db.enable_server_pragmas()
+        self.assertEqual(db.sqlite_pragmas(connection), {'journal_mode': 'WAL', 'busy_timeout': 5000})
+
+
+@mock.patch('CafeManager.db_routers.replica_configured', return_value=True)
+class ReplicaRoutingTests(OutletTestCase):
+    def request(self):
+        request = RequestFactory().post('/')
+        SessionMiddleware(lambda r: None).process_request(request)
+        return request
+
+    def read_alias(self, request, model=Product):
+        # TestCase wraps each test in a transaction, which the router keeps on the primary
+        with mock.patch.object(connections['default'], 'in_atomic_block', False):
+            return read_replica(lambda request: ReplicaRouter().db_for_read(model))(request)
+
+    def test_reports_read_from_the_replica(self, _):
+        self.assertIsNone(ReplicaRouter().db_for_read(Product))
+        self.assertEqual(self.read_alias(self.request()), 'replica')
+        self.assertIsNone(self.read_alias(self.request(), model=User))
+        self.assertEqual(read_replica(lambda request: ReplicaRouter().db_for_read(Product))(self.request()), 'default')
+
+    def test_a_write_pins_the_session_to_the_primary(self, _):
+        request = self.request()
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        Customer.objects.create(outlet=self.outlet, name='Ali')
+        middleware.process_response(request, HttpResponse())
+        self.assertGreater(request.session[PIN_SESSION_KEY], time.time())
+        self.assertIsNone(self.read_alias(request))
+
+    def test_reads_without_writes_do_not_pin(self, _):
+        request = self.request()
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        list(Customer.objects.all())
+        middleware.process_response(request, HttpResponse())
+        self.assertNotIn(PIN_SESSION_KEY, request.session)
+
+    def test_cached_values_are_loaded_from_the_primary(self, _):
+        def alias():
+            return ReplicaRouter().db_for_read(Product)
+
+        report = read_replica(lambda request: (alias(), cache_aside('finance', self.outlet, ('alias',), alias)))
+        with mock.patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(report(self.request()), ('replica', None))
+
+
+class TenantScopingTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_owner = User.objects.create_user('other', password='pw')
+        self.other = Outlet.objects.create(name='Other', owner=self.other_owner)
+        self.coffee = self.make_product('Coffee')
+        self.tea = self.make_product('Tea', outlet=self.other)
+
+    def test_managers_are_scoped_to_the_current_outlet(self):
+        checkout(self.outlet, [{'id': self.coffee.pk, 'quantity': 1}])
+        checkout(self.other, [{'id': self.tea.pk, 'quantity': 1}])
+        with outlet_context(self.outlet):
+            self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Coffee'])
+            self.assertEqual(list(SaleItem.objects.values_list('product__name', flat=True)), ['Coffee'])
+            self.assertEqual(Product.all_outlets.count(), 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_queries_without_an_outlet_fail_closed(self):
+        with outlet_context(None):
+            with self.assertRaises(TenantScopeError):
+                list(Product.objects.all())
+
+    def test_views_cannot_reach_another_outlets_rows(self):
+        sale = checkout(self.other, [{'id': self.tea.pk, 'quantity': 1}])
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(f'/receipt/{sale.pk}/').status_code, 404)
+        self.client.force_login(self.other_owner)
+        self.assertEqual(self.client.get(f'/receipt/{sale.pk}/').status_code, 200)
+
+
+class RollupTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.second = Outlet.objects.create(name='Second', owner=self.owner)
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def sell(self, outlet, price, day):
+        product = self.make_product(price=price, outlet=outlet)
+        sale = checkout(outlet, [{'id': product.pk, 'quantity': 1}])
+        SaleTransaction.all_outlets.filter(pk=sale.pk).update(date=sale.date - (self.today - day))
+
+    def pos_sales(self, start, end):
+        result = flows([self.outlet.pk, self.second.pk], start, end)
+        return result[self.outlet.pk]['pos_sales'], result[self.second.pk]['pos_sales']
+
+    def test_missing_ranges(self):
+        days = [self.today + timedelta(days=i) for i in range(6)]
+        self.assertEqual(missing_ranges({days[1], days[2], days[4]}, days[0], days[5]),
+                         [(days[0], days[0]), (days[3], days[3]), (days[5], days[5])])
+        self.assertEqual(missing_ranges(set(days), days[0], days[5]), [])
+
+    def test_rollups_match_live_figures(self):
+        self.sell(self.outlet, '100.00', self.yesterday)
+        self.sell(self.second, '500.00', self.yesterday)
+        live = self.pos_sales(self.yesterday, self.today)
+        call_command('build_rollups', stdout=StringIO())
+        self.assertEqual(OutletDailyRollup.all_outlets.count(), 2)
+        self.assertEqual(self.pos_sales(self.yesterday, self.today), live)
+
+    def test_outlets_without_rollups_are_read_live(self):
+        self.sell(self.outlet, '100.00', self.yesterday)
+        self.sell(self.second, '500.00', self.yesterday)
+        call_command('build_rollups', outlet=self.outlet.pk, stdout=StringIO())
+        self.sell(self.outlet, '7.00', self.today)
+        self.assertEqual(self.pos_sales(self.yesterday, self.today), (Decimal('107.00'), Decimal('500.00')))
+
+    def test_skipped_days_are_read_live(self):
+        two_days_ago = self.yesterday - timedelta(days=1)
+        self.sell(self.outlet, '30.00', two_days_ago)
+        self.sell(self.outlet, '20.00', self.yesterday)
+        call_command('build_rollups', date=two_days_ago, stdout=StringIO())
+        self.assertEqual(self.pos_sales(two_days_ago, self.yesterday), (Decimal('50.00'), 0))
+
+    def test_local_today_is_not_rolled_up(self):
+        local_today = date(2030, 1, 2)
+        with mock.patch('core.management.commands.build_rollups.timezone.localdate', return_value=local_today):
+            with self.assertRaises(CommandError):
+                call_command('build_rollups', date=local_today, stdout=StringIO())
+
+
+class BillOfMaterialsTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gin = self.make_product('Gin', stock=10)
+        self.tonic = self.make_product('Tonic', stock=100)
+        self.cocktail = self.make_product('G&T', stock=0)
+        ProductComponent.all_outlets.create(outlet=self.outlet, product=self.cocktail, component=self.gin, quantity=Decimal('0.05'))
+        ProductComponent.all_outlets.create(outlet=self.outlet, product=self.cocktail, component=self.tonic, quantity=1)
+
+    def level(self, product):
+        product.refresh_from_db()
+        return product.current_stock_level, product.stock_remainder
+
+    def test_nested_recipes_are_flattened(self):
+        double = self.make_product('Double G&T', stock=0)
+        ProductComponent.all_outlets.create(outlet=self.outlet, product=double, component=self.cocktail, quantity=2)
+        self.assertEqual(expand_bom(self.outlet, {double.pk: 3}), {self.gin.pk: Decimal('-0.30'), self.tonic.pk: -6})
+
+    def test_fractional_usage_is_carried_between_sales(self):
+        for _ in range(9):
+            checkout(self.outlet, [{'id': self.cocktail.pk, 'quantity': 1}])
+        self.assertEqual(self.level(self.gin), (10, Decimal('-0.450')))
+        checkout(self.outlet, [{'id': self.cocktail.pk, 'quantity': 1}])
+        self.assertEqual(self.level(self.gin), (9, Decimal('0.500')))
+        for _ in range(10):
+            checkout(self.outlet, [{'id': self.cocktail.pk, 'quantity': 1}])
+        self.assertEqual(self.level(self.gin), (9, Decimal('0.000')))
+        self.assertEqual(self.level(self.tonic), (80, Decimal('0.000')))
+        self.assertEqual(self.level(self.cocktail), (0, Decimal('0.000')))
+        self.assertEqual(InventoryLog.all_outlets.filter(product=self.gin).count(), 1)
+
+    def test_stock_take_clears_the_remainder(self):
+        deduct_sale_stock(self.outlet, {self.cocktail.pk: 4})
+        self.assertEqual(self.level(self.gin), (10, Decimal('-0.200')))
+        adjust_stock(self.outlet, 'stock_take', {self.gin.pk: 8}, self.owner)
+        self.assertEqual(self.level(self.gin), (8, Decimal('0.000')))
+
+    def test_low_stock_counts_composites_through_their_components(self):
+        for _ in range(20):
+            checkout(self.outlet, [{'id': self.cocktail.pk, 'quantity': 1}])
+        self.assertEqual([product.name for product in low_stock_products(self.outlet)], ['Gin'])
+        self.assertEqual(sales_velocity(self.outlet, [self.gin.pk, self.tonic.pk]), {self.gin.pk: 1 / 28, self.tonic.pk: 20 / 28})
+        stats = low_stock_stats(self.outlet)
+        self.assertEqual((stats['total_products'], stats['out_of_stock']), (2, 0))
+
+    def test_composites_are_never_reordered(self):
+        for product in (self.gin, self.cocktail):
+            ProductForecast.all_outlets.create(outlet=self.outlet, product=product, suggested_order=5)
+        self.client.force_login(self.owner)
+        groups = self.client.get('/stock/reorder/').context['groups']
+        self.assertEqual([forecast.product for group in groups for forecast in group['items']], [self.gin])
+        self.client.post('/purchasing/create/')
+        self.assertEqual(list(PurchaseOrderLine.all_outlets.values_list('product', 'quantity_ordered')), [(self.gin.pk, 5)])
+
+
+class LowStockReportTests(OutletTestCase):
+    def test_report_shows_usage_and_reorder_quantity(self):
+        product = self.make_product(stock=3, optimal_stock=20)
+        self.make_product('Tea', stock=50)
+        checkout(self.outlet, [{'id': product.pk, 'quantity': 1}])
+        self.client.force_login(self.owner)
+        response = self.client.get('/stock/low/')
+        self.assertEqual(response.status_code, 200)
+        [row] = response.context['low_stock_products']
+        self.assertEqual((row.name, row.units_per_day, row.reorder_quantity), ('Coffee', 1 / 28, 18))
+
+
+class TaxTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.coffee = self.make_product('Coffee', price='10.00')
+        self.water = self.make_product('Water', price='3.33')
+        self.gst = Tax.all_outlets.create(outlet=self.outlet, name='GST', rate=Decimal('8.00'))
+        self.service = Tax.all_outlets.create(outlet=self.outlet, name='Service', rate=Decimal('10.00'), applies_to_rooms=True)
+        self.coffee.taxes.add(self.gst, self.service)
+        self.water.taxes.add(self.gst)
+
+    def test_line_taxes_add_up_to_the_breakdown(self):
+        taxes = compute_taxes(self.outlet, [(self.coffee.pk, Decimal('20.00')), (self.water.pk, Decimal('3.33'))], room_amount=Decimal('100.00'))
+        self.assertEqual(taxes['line_taxes'], [Decimal('3.60'), Decimal('0.27')])
+        self.assertEqual(taxes['room_tax'], Decimal('10.00'))
+        self.assertEqual(taxes['tax_total'], Decimal('13.87'))
+        self.assertEqual({c['name']: c['amount'] for c in taxes['components']}, {'GST': Decimal('1.87'), 'Service': Decimal('12.00')})
+
+    def test_checkout_stores_the_tax_breakdown(self):
+        sale = checkout(self.outlet, [{'id': self.coffee.pk, 'quantity': 2}])
+        self.assertEqual((sale.subtotal, sale.tax_total, sale.total_amount), (Decimal('20.00'), Decimal('3.60'), Decimal('23.60')))
+        self.assertEqual(sum(line.amount for line in SaleTaxLine.all_outlets.filter(sale=sale)), sale.tax_total)
+        today = timezone.localdate()
+        self.assertEqual({row['name']: row['amount'] for row in tax_summary(self.outlet, today, today)},
+                         {'GST': Decimal('1.60'), 'Service': Decimal('2.00')})
+
+    def test_tax_changes_reach_the_next_sale(self):
+        checkout(self.outlet, [{'id': self.water.pk, 'quantity': 1}])
+        self.gst.is_active = False
+        self.gst.save()
+        self.assertEqual(checkout(self.outlet, [{'id': self.water.pk, 'quantity': 1}]).tax_total, 0)
+
+    def test_revenue_is_reported_net_of_tax(self):
+        checkout(self.outlet, [{'id': self.coffee.pk, 'quantity': 2}])
+        today = timezone.localdate()
+        self.assertEqual(flows([self.outlet.pk], today, today)[self.outlet.pk]['pos_sales'], Decimal('20.00'))
+        build_daily_rollups(today, Outlet.objects.filter(pk=self.outlet.pk))
+        self.assertEqual(OutletDailyRollup.all_outlets.get().pos_sales, Decimal('20.00'))
+        self.assertEqual(compute_financial_summary(self.outlet, today, today)['totals']['pos_revenue'], Decimal('20.00'))
+
+
+class CartPricingTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.latte = self.make_product('Latte', price='10.00', cost='3.00')
+        self.large = ProductVariant.all_outlets.create(outlet=self.outlet, product=self.latte, name='Large', selling_price=Decimal('12.00'))
+        group = ModifierGroup.all_outlets.create(outlet=self.outlet, name='Extras')
+        self.shot = Modifier.all_outlets.create(group=group, name='Extra shot', price=Decimal('2.50'))
+        self.latte.modifier_groups.add(group)
+
+    def test_prices_come_from_the_menu(self):
+        items, modifiers, subtotal = price_cart(self.outlet, [
+            {'id': self.latte.pk, 'quantity': 2, 'variant_id': self.large.pk, 'modifier_ids': [self.shot.pk]},
+            {'id': str(self.latte.pk), 'quantity': '1'},
+        ], claimed_total='39.00')
+        self.assertEqual([item.price for item in items], [Decimal('14.50'), Decimal('10.00')])
+        self.assertEqual(modifiers, [[self.shot.pk], []])
+        self.assertEqual(subtotal, Decimal('39.00'))
+
+    def test_bad_carts_are_rejected(self):
+        other = self.make_product('Elsewhere', outlet=Outlet.objects.create(name='Other', owner=self.owner))
+        bad_carts = {
+            'Invalid cart line': [[{'quantity': 1}], [{'id': self.latte.pk}], ['x'], [{'id': 'abc', 'quantity': 1}]],
+            'not on the menu': [[{'id': other.pk, 'quantity': 1}]],
+            'Invalid quantity': [[{'id': self.latte.pk, 'quantity': 0}]],
+            'has changed': [[{'id': self.latte.pk, 'quantity': 1, 'price': '1.00'}]],
+        }
+        for message, carts in bad_carts.items():
+            for cart in carts:
+                with self.assertRaisesMessage(ValueError, message):
+                    price_cart(self.outlet, cart)
+        with self.assertRaisesMessage(ValueError, 'does not match'):
+            price_cart(self.outlet, [{'id': self.latte.pk, 'quantity': 1}], claimed_total='5.00')
+
+    def test_pos_rejects_malformed_lines_with_a_400(self):
+        self.client.force_login(self.owner)
+        response = self.client.post('/api/pos/submit/', json.dumps({'items': [{'quantity': 1}]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid cart line')
+        self.assertFalse(SaleTransaction.all_outlets.exists())
+
+
+class OutletSwitcherTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.second = Outlet.objects.create(name='Second', owner=self.owner)
+        self.stranger = Outlet.objects.create(name='Stranger', owner=User.objects.create_user('stranger'))
+        self.client.force_login(self.owner)
+
+    def current_outlet(self):
+        return self.client.get('/dashboard/').context['outlet']
+
+    def test_owners_switch_between_their_outlets(self):
+        self.assertEqual(self.current_outlet(), self.outlet)
+        self.client.post('/outlet/switch/', {'outlet_id': self.second.pk})
+        self.assertEqual(self.current_outlet(), self.second)
+
+    def test_owners_cannot_switch_to_other_outlets(self):
+        self.client.post('/outlet/switch/', {'outlet_id': self.stranger.pk})
+        self.assertEqual(self.current_outlet(), self.outlet)
+        session = self.client.session
+        session['outlet_id'] = self.stranger.pk
+        session.save()
+        self.assertEqual(self.current_outlet(), self.outlet)
+
+
+class FinancialSummaryTests(OutletTestCase):
+    def test_margins_use_the_cost_at_sale_time(self):
+        product = self.make_product(price='10.00', cost='4.00')
+        checkout(self.outlet, [{'id': product.pk, 'quantity': 5}])
+        product.cost_price = Decimal('9.00')
+        product.save()
+        today = timezone.localdate()
+        totals = compute_financial_summary(self.outlet, today, today)['totals']
+        self.assertEqual((totals['revenue'], totals['cogs'], totals['gross_profit']), (Decimal('50.00'), Decimal('20.00'), Decimal('30.00')))
+        self.assertEqual(totals['gross_margin'], Decimal('60'))
+
+    def test_buckets_cover_the_whole_range(self):
+        start = date(2026, 1, 1)
+        summary = compute_financial_summary(self.outlet, start, date(2026, 3, 15), bucket='month')
+        self.assertEqual([row['period'] for row in summary['rows']], [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+        self.assertEqual(summary['totals']['revenue'], 0)
+
+    def test_backfill_fills_missing_unit_costs(self):
+        product = self.make_product(cost='4.00')
+        sale = checkout(self.outlet, [{'id': product.pk, 'quantity': 1}])
+        SaleItem.all_outlets.filter(sale=sale).update(unit_cost=None)
+        self.assertEqual(backfill_unit_costs(SaleItem, batch_size=1), 1)
+        self.assertEqual(SaleItem.all_outlets.get(sale=sale).unit_cost, Decimal('4.00'))
+
+
+class ForecastingTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = date(2026, 6, 1)
+        self.gin = self.make_product('Gin', stock=10)
+        self.tonic = self.make_product('Tonic', stock=100)
+        self.cocktail = self.make_product('G&T', stock=0)
+        ProductComponent.all_outlets.create(outlet=self.outlet, product=self.cocktail, component=self.gin, quantity=Decimal('0.05'))
+        ProductComponent.all_outlets.create(outlet=self.outlet, product=self.cocktail, component=self.tonic, quantity=1)
+
+    def sell_daily(self, product, quantity, days=28):
+        ProductDailySales.all_outlets.bulk_create([
+            ProductDailySales(outlet=self.outlet, product=product, date=self.today - timedelta(days=day), quantity=quantity)
+            for day in range(1, days + 1)
+        ])
+
+    def test_recipe_sales_are_forecast_as_their_components(self):
+        ProductForecast.all_outlets.create(outlet=self.outlet, product=self.cocktail, suggested_order=5)
+        self.sell_daily(self.cocktail, 10)
+        self.sell_daily(self.tonic, 2)
+        self.assertEqual(compute_forecasts(self.outlet, self.today), 2)
+        velocity = dict(ProductForecast.all_outlets.values_list('product', 'daily_velocity'))
+        self.assertEqual(velocity, {self.gin.pk: 0.5, self.tonic.pk: 12.0})
+
+    def sale(self, product, days_ago, quantity=1, outlet=None):
+        sale = checkout(outlet or self.outlet, [{'id': product.pk, 'quantity': quantity}])
+        SaleTransaction.all_outlets.filter(pk=sale.pk).update(date=timezone.now() - timedelta(days=days_ago))
+
+    def daily_sales(self, outlet=None):
+        return set(ProductDailySales.all_outlets.filter(outlet=outlet or self.outlet).values_list('product__name', 'date', 'quantity'))
+
+    def test_build_only_reads_days_since_the_last_build(self):
+        today = timezone.localdate()
+        self.sale(self.tonic, 5, quantity=2)
+        self.sale(self.tonic, 5)
+        self.assertEqual(build_daily_sales(), 1)
+        self.sale(self.tonic, 2)
+        self.sale(self.tonic, 20)
+        build_daily_sales()
+        self.assertEqual(self.daily_sales(), {('Tonic', today - timedelta(days=5), 3), ('Tonic', today - timedelta(days=2), 1)})
+
+    def test_each_outlet_keeps_its_own_cursor(self):
+        other = Outlet.objects.create(name='Branch', owner=self.owner)
+        cola = self.make_product('Cola', outlet=other)
+        self.sale(self.tonic, 1)
+        self.sale(cola, 10, outlet=other)
+        build_daily_sales(outlets=Outlet.objects.filter(pk=self.outlet.pk))
+        build_daily_sales()
+        self.assertEqual(self.daily_sales(other), {('Cola', timezone.localdate() - timedelta(days=10), 1)})
+
+    def test_forecast_of_a_steady_seller(self):
+        supplier = Supplier.objects.create(outlet=self.outlet, name='Mixers Ltd', lead_time_days=3)
+        Product.all_outlets.filter(pk=self.tonic.pk).update(current_stock_level=10, low_stock_threshold=5, supplier=supplier)
+        self.sell_daily(self.tonic, 4)
+        compute_forecasts(self.outlet, self.today)
+        forecast = ProductForecast.all_outlets.get(product=self.tonic)
+        self.assertEqual(
+            (forecast.daily_velocity, forecast.horizon_days, forecast.forecast_demand, forecast.days_of_cover, forecast.suggested_order),
+            (4.0, 10, 40.0, 2.5, 35),
+        )
+
+
+class PurchasingTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.supplier = Supplier.objects.create(outlet=self.outlet, name='Beans & Co')
+        self.beans = self.make_product('Beans', cost='6.00', stock=2, supplier=self.supplier)
+        self.milk = self.make_product('Milk', stock=5)
+
+    def order(self, quantity=10):
+        order = PurchaseOrder.objects.create(outlet=self.outlet, supplier=self.supplier, status='Ordered')
+        PurchaseOrderLine.objects.create(order=order, product=self.beans, quantity_ordered=quantity)
+        return order
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.current_stock_level
+
+    def test_orders_are_drafted_from_the_suggestions(self):
+        ProductForecast.all_outlets.create(outlet=self.outlet, product=self.beans, suggested_order=12)
+        self.client.force_login(self.owner)
+        self.client.post('/purchasing/create/', {'supplier': self.supplier.pk})
+        order = PurchaseOrder.all_outlets.get()
+        self.assertEqual((order.supplier, order.status), (self.supplier, 'Draft'))
+        self.assertEqual(list(order.lines.values_list('product', 'quantity_ordered', 'unit_cost')), [(self.beans.pk, 12, Decimal('6.00'))])
+
+    def test_partial_then_full_receipt(self):
+        order = self.order()
+        receive_goods(self.outlet, {self.beans.pk: 4}, self.owner, order=order)
+        order.refresh_from_db()
+        self.assertEqual((order.status, self.stock(self.beans)), ('Partial', 6))
+
+        receive_goods(self.outlet, {self.beans.pk: 6, self.milk.pk: 3}, self.owner, order=order)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'Received')
+        self.assertEqual(dict(order.lines.values_list('product', 'quantity_received')), {self.beans.pk: 10, self.milk.pk: 3})
+        self.assertEqual((self.stock(self.beans), self.stock(self.milk)), (12, 8))
+        self.assertEqual(InventoryLog.all_outlets.filter(reference=f"PO-{order.pk}").count(), 3)
+
+    def test_received_orders_are_not_received_twice(self):
+        order = self.order()
+        receive_goods(self.outlet, {self.beans.pk: 10}, self.owner, order=order)
+        with self.assertRaises(ValueError):
+            receive_goods(self.outlet, {self.beans.pk: 10}, self.owner, order=order)
+        self.assertEqual(self.stock(self.beans), 12)
+
+    def test_receipts_that_change_nothing_leave_the_order_open(self):
+        order = self.order()
+        stranger = self.make_product('Elsewhere', outlet=Outlet.objects.create(name='Other', owner=self.owner))
+        self.assertEqual(receive_goods(self.outlet, {stranger.pk: 5}, self.owner, order=order), {})
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.received_at), ('Ordered', None))
+
+    def test_bulk_entry_rejects_malformed_fields(self):
+        self.client.force_login(self.owner)
+        for field, value in ((f'stock_{self.beans.pk}', 'two'), ('stock_beans', '2'), (f'stock_{self.beans.pk}', '-1')):
+            response = self.client.post('/stock/bulk/', {field: value})
+            self.assertEqual(response.status_code, 302, field)
+        self.assertEqual(self.stock(self.beans), 2)
+        self.client.post('/stock/bulk/', {f'stock_{self.beans.pk}': '3'})
+        self.assertEqual(self.stock(self.beans), 5)
+
+
+class StockAdjustmentTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.coffee = self.make_product('Coffee', cost='4.00')
+        self.tea = self.make_product('Tea', cost='2.00')
+
+    def test_losses_are_booked_with_their_reason(self):
+        reference, levels = adjust_stock(self.outlet, 'damaged', {self.coffee.pk: 3}, self.owner, reference='BREAK-1')
+        self.assertEqual((reference, levels), ('BREAK-1', {self.coffee.pk: 97}))
+        log = InventoryLog.all_outlets.get()
+        self.assertEqual(
+            (log.action, log.reason, log.quantity_changed, log.previous_level, log.new_level, log.reference),
+            ('Spoilage', 'damaged', -3, 100, 97, 'BREAK-1'),
+        )
+
+    def test_unknown_reasons_are_rejected(self):
+        with self.assertRaises(ValueError):
+            adjust_stock(self.outlet, 'gift', {self.coffee.pk: 3}, self.owner)
+        self.assertFalse(InventoryLog.all_outlets.exists())
+
+    def test_variance_by_product_and_reason(self):
+        adjust_stock(self.outlet, 'damaged', {self.coffee.pk: 3}, self.owner)
+        adjust_stock(self.outlet, 'correction', {self.tea.pk: 1}, self.owner)
+        today = timezone.localdate()
+        variance = stock_variance(self.outlet, today, today)
+        self.assertEqual(
+            [(row['product__name'], row['reason'], row['quantity'], row['value']) for row in variance['rows']],
+            [('Coffee', 'damaged', -3, Decimal('-12.00')), ('Tea', 'correction', 1, Decimal('2.00'))],
+        )
+        self.assertEqual((variance['total_quantity'], variance['total_value']), (-2, Decimal('-10.00')))
+        self.assertEqual(variance['by_reason']['Damaged / Breakage'], {'quantity': -3, 'value': Decimal('-12.00')})
+
+    def test_api_rejects_malformed_bodies(self):
+        self.client.force_login(self.owner)
+        for body in ([1, 2], 7, {'reason': 'waste', 'items': {'id': 1}}, {'reason': 'waste', 'items': [{'id': self.tea.pk, 'quantity': 1e400}]}):
+            response = self.client.post('/api/stock/adjust/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        response = self.client.post('/api/stock/adjust/', json.dumps({'reason': 'waste', 'items': [{'id': self.tea.pk, 'quantity': 2}]}),
+                                    content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['variance_quantity']), (200, -2))
+
+    def test_spoilage_form_rejects_malformed_fields(self):
+        self.client.force_login(self.owner)
+        for field, value in (('qty_tea', '1'), (f'qty_{self.tea.pk}', 'one')):
+            self.assertEqual(self.client.post('/spoilage/', {'reason': 'waste', field: value}).status_code, 302)
+        self.assertFalse(InventoryLog.all_outlets.exists())
+
+
+class StockAsOfTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.coffee = self.make_product('Coffee', cost='4.00', stock=100)
+        self.today = timezone.localdate()
+
+    def midnight(self, days_ago):
+        return timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time()))
+
+    def adjust(self, quantity, days_ago=0):
+        adjust_stock(self.outlet, 'correction', {self.coffee.pk: quantity}, self.owner)
+        InventoryLog.all_outlets.filter(pk=InventoryLog.all_outlets.latest('pk').pk).update(
+            created_at=self.midnight(days_ago) + timedelta(hours=12))
+
+    def snapshot(self, quantity, taken_at):
+        StockSnapshot.all_outlets.create(
+            outlet=self.outlet, product=self.coffee, date=timezone.localdate(taken_at), quantity=quantity,
+            unit_cost=Decimal('3.00'), taken_at=taken_at,
+        )
+
+    def quantity(self, day):
+        [row] = stock_as_of(self.outlet, day)['rows']
+        return row['quantity'], row['value']
+
+    def test_without_snapshots_the_log_is_replayed_back(self):
+        self.adjust(-10, days_ago=1)
+        self.adjust(-5)
+        self.assertEqual(self.quantity(self.today), (85, Decimal('340.00')))
+        self.assertEqual(self.quantity(self.today - timedelta(days=1)), (90, Decimal('360.00')))
+        self.assertEqual(self.quantity(self.today - timedelta(days=2)), (100, Decimal('400.00')))
+
+    def test_a_snapshot_before_the_day_adds_the_later_log(self):
+        self.snapshot(100, self.midnight(3))
+        self.adjust(-10, days_ago=2)
+        self.adjust(-5)
+        self.assertEqual(self.quantity(self.today - timedelta(days=2)), (90, Decimal('270.00')))
+
+    def test_a_snapshot_on_the_cutoff_is_used_as_is(self):
+        self.adjust(-10, days_ago=2)
+        self.snapshot(90, self.midnight(1))
+        self.adjust(-5)
+        result = stock_as_of(self.outlet, self.today - timedelta(days=2))
+        self.assertEqual(result['snapshot_taken_at'], self.midnight(1))
+        self.assertEqual((result['rows'][0]['quantity'], result['total_value']), (90, Decimal('270.00')))
+
+    def test_snapshots_taken_twice_a_day_replace_each_other(self):
+        self.assertEqual(take_stock_snapshots(), 1)
+        self.adjust(-5)
+        take_stock_snapshots()
+        self.assertEqual(list(StockSnapshot.all_outlets.values_list('date', 'quantity')), [(self.today, 95)])
+
+
+class ArchiveTests(OutletTestCase):
+    def test_old_logs_move_to_the_archive_once(self):
+        coffee = self.make_product('Coffee')
+        for quantity in (-3, -4, 10, -1):
+            adjust_stock(self.outlet, 'correction', {coffee.pk: quantity}, self.owner)
+        old = list(InventoryLog.all_outlets.order_by('pk').values_list('pk', flat=True)[:3])
+        InventoryLog.all_outlets.filter(pk__in=old[:2]).update(created_at=timezone.make_aware(datetime(2026, 1, 10, 12)))
+        InventoryLog.all_outlets.filter(pk=old[2]).update(created_at=timezone.make_aware(datetime(2026, 2, 10, 12)))
+        before = timezone.make_aware(datetime(2026, 3, 1))
+
+        self.assertEqual(archive_inventory_logs(before, batch_size=2), 3)
+        self.assertEqual(sorted(InventoryLogArchive.all_outlets.values_list('pk', flat=True)), old)
+        self.assertFalse(InventoryLog.all_outlets.filter(pk__in=old).exists())
+        self.assertEqual(InventoryLog.all_outlets.count(), 1)
+        summaries = set(InventoryMonthlySummary.all_outlets.values_list('month', 'action', 'quantity_changed', 'entry_count'))
+        self.assertEqual(summaries, {(date(2026, 1, 1), 'Adjustment', -7, 2), (date(2026, 2, 1), 'Adjustment', 10, 1)})
+
+        self.assertEqual(archive_inventory_logs(before), 0)
+        self.assertEqual(set(InventoryMonthlySummary.all_outlets.values_list('month', 'action', 'quantity_changed', 'entry_count')), summaries)
+        self.assertEqual(stock_as_of(self.outlet, date(2026, 1, 31))['rows'][0]['quantity'], 93)
+
+
+class OptionImportTests(OutletTestCase):
+    def test_variants_are_upserted_and_only_the_files_groups_replaced(self):
+        latte = self.make_product('Latte')
+        tea = self.make_product('Tea')
+        small = ProductVariant.all_outlets.create(outlet=self.outlet, product=latte, name='Small', selling_price=Decimal('3.00'))
+        milk = ModifierGroup.all_outlets.create(outlet=self.outlet, name='Milk')
+        house = ModifierGroup.all_outlets.create(outlet=self.outlet, name='House extras')
+        latte.modifier_groups.add(house)
+        tea.modifier_groups.add(milk)
+        version = namespace_version('menu', self.outlet)
+
+        df = pd.DataFrame({
+            'Handle': ['latte', 'latte', 'tea'],
+            'Name': ['Latte', None, 'Tea'],
+            'Option 1 value': ['Small', 'Large', None],
+            'Price [Chillo]': [4.0, 5.0, 3.0],
+            'Cost': [1.0, 1.5, 1.0],
+            'Modifier - "Milk"': ['Y', None, 'N'],
+        })
+        self.assertEqual(import_options(self.outlet, df), (2, 1))
+
+        variants = {variant.name: variant for variant in latte.variants.all()}
+        self.assertEqual(variants['Small'].pk, small.pk)
+        self.assertEqual((variants['Small'].selling_price, variants['Large'].selling_price, variants['Large'].position),
+                         (Decimal('4.00'), Decimal('5.00'), 1))
+        self.assertEqual(set(latte.modifier_groups.all()), {milk, house})
+        self.assertFalse(tea.modifier_groups.exists())
+        self.assertGreater(namespace_version('menu', self.outlet), version)
+
+
+class CreditTests(OutletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(outlet=self.outlet, name='Ali')
+        self.coffee = self.make_product('Coffee')
+        self.client.force_login(self.owner)
+
+    def balance(self):
+        self.customer.refresh_from_db()
+        return self.customer.current_balance
+
+    def test_credit_sales_from_both_routes_add_to_the_balance(self):
+        for url in ('/api/pos/submit/', '/karaoke/submit-sale/'):
+            body = {'items': [{'id': self.coffee.pk, 'quantity': 1}], 'payment_method': 'Credit', 'customer_id': self.customer.pk}
+            response = self.client.post(url, json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 200, url)
+        self.assertEqual(self.balance(), Decimal('20.00'))
+
+    def test_partial_payments_reduce_the_balance(self):
+        Customer.all_outlets.filter(pk=self.customer.pk).update(current_balance=Decimal('50.00'))
+        self.client.post(f'/credit/clear/{self.customer.pk}/', {'amount': '20'})
+        self.assertEqual(self.balance(), Decimal('30.00'))
+        self.assertEqual(CreditPayment.all_outlets.get().amount_paid, Decimal('20.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', "Row locks need a server database; select_for_update() is a no-op on SQLite")
+class ConcurrentWriteTests(TransactionTestCase):
+    WORKERS = 8
+
+    def setUp(self):
+        get_cache().clear()
+        self.owner = User.objects.create_user('owner', password='pw')
+        self.outlet = Outlet.objects.create(name='Main', owner=self.owner)
+        self.customer = Customer.all_outlets.create(outlet=self.outlet, name='Ali', current_balance=Decimal('100.00'))
+        self.coffee = Product.all_outlets.create(
+            outlet=self.outlet, name='Coffee', selling_price=Decimal('10.00'), cost_price=Decimal('4.00'), current_stock_level=100,
+        )
+
+    def run_at_once(self, request):
+        """Run request(client, worker) from WORKERS threads released together; returns the status codes."""
+        barrier = threading.Barrier(self.WORKERS)
+        statuses = []
+
+        def worker(number):
+            client = Client()
+            client.force_login(self.owner)
+            barrier.wait()
+            try:
+                statuses.append(request(client, number))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_concurrent_credit_sales_and_payments_lose_no_updates(self):
+        body = json.dumps({'items': [{'id': self.coffee.pk, 'quantity': 1}], 'payment_method': 'Credit', 'customer_id': self.customer.pk})
+        urls = ('/api/pos/submit/', '/karaoke/submit-sale/')
+        statuses = self.run_at_once(lambda client, number: client.post(urls[number % 2], body, content_type='application/json').status_code)
+        self.assertEqual(statuses, [200] * self.WORKERS)
+        statuses = self.run_at_once(lambda client, number: client.post(f'/credit/clear/{self.customer.pk}/', {'amount': '5'}).status_code)
+        self.assertEqual(statuses, [302] * self.WORKERS)
+
+        self.customer.refresh_from_db()
+        self.coffee.refresh_from_db()
+        self.assertEqual(self.customer.current_balance, Decimal('100.00') + 8 * Decimal('10.00') - 8 * Decimal('5.00'))
+        self.assertEqual(self.coffee.current_stock_level, 100 - self.WORKERS)
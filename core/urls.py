@@ -5,19 +5,28 @@ urlpatterns = [
     # Landing page & Dashboard
     path('', views.homepage, name='homepage'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/group/', views.group_dashboard, name='group_dashboard'),
+    path('outlet/switch/', views.switch_outlet, name='switch_outlet'),
     
     # POS System
     path('pos/', views.record_sale, name='record_sale'),
     path('api/pos/submit/', views.submit_sale, name='submit_sale'),
     path('api/product/<int:product_id>/toggle-favorite/', views.toggle_favorite, name='toggle_favorite'),
     path('receipt/<int:transaction_id>/', views.receipt_detail, name='receipt_detail'),
+    path('sales/', views.sales_history, name='sales_history'),
     
     # Tools
     path('import/', views.import_data, name='import_data'),
     path('export/', views.export_data, name='export_data'),
     path('stock/bulk/', views.bulk_stock_entry, name='bulk_stock_entry'),
+    path('purchasing/', views.purchase_orders, name='purchase_orders'),
+    path('purchasing/create/', views.create_purchase_order, name='create_purchase_order'),
     path('stock/low/', views.low_stock_report, name='low_stock_report'),
+    path('api/stock/as-of/', views.stock_as_of_api, name='stock_as_of'),
+    path('stock/reorder/', views.reorder_suggestions, name='reorder_suggestions'),
     path('spoilage/', views.log_spoilage, name='log_spoilage'),
+    path('api/stock/adjust/', views.stock_adjust_api, name='stock_adjust_api'),
+    path('stock/variance/', views.stock_variance_report, name='stock_variance_report'),
     
     # Financials
     path('reports/financial/', views.financial_summary_report, name='financial_summary'),
@@ -3,16 +3,36 @@ import json
 import pandas as pd
 from decimal import Decimal
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count
-from core.models import Outlet, Product, SaleTransaction, SaleItem, Employee, Customer, CreditPayment, InventoryLog, Attendance, Payroll
+from django.views.decorators.http import require_POST
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
+from django.db import transaction
+from django.db.models import Sum, Count, F
+from core.models import Outlet, Product, Employee, Customer, CreditPayment, InventoryLog, Attendance, Payroll, Supplier, ProductForecast, PurchaseOrder, PurchaseOrderLine
 from datetime import datetime, timedelta, date
 from django.utils import timezone
+from core.cache import cached
+from core.multi_tenant import get_current_outlet, OUTLET_SESSION_KEY
+from core.reporting import owner_outlets, group_summary, financial_summary, tax_summary, BUCKETS
+from core.inventory import (
+    stock_as_of, low_stock_stats, low_stock_products, receive_goods, adjust_stock, stock_variance, import_components,
+    DEFAULT_LOW_STOCK_THRESHOLD,
+)
+from core.catalog import pos_catalog, pos_products, import_options
+from core.taxes import import_taxes
+from core.sales import checkout, sales_page, receipt_sale, day_takings
+from core.forms import StockAdjustmentForm
+from CafeManager.db_routers import read_replica
 
 # --- HELPER UTILITIES ---
 def get_user_outlet(user):
+    # The outlet OutletMiddleware resolved for this request, if any
+    outlet = get_current_outlet()
+    if outlet is not None:
+        return outlet
     try:
         # Check for employee profile
         return user.employee.outlet 
@@ -26,42 +46,85 @@ def homepage(request):
         return redirect('dashboard')
     return render(request, 'core/landing_page.html')
 
-@login_required
-def dashboard(request):
-    outlet = get_user_outlet(request.user)
-    today = date.today()
-    
-    # POS Sales today
-    pos_sales = SaleTransaction.objects.filter(outlet=outlet, date__date=today)
-    total_pos_sales = pos_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or Decimal('0')
+@cached('dashboard')
+def dashboard_figures(outlet, day):
+    """Today's takings and the low stock list for the manager dashboard; day is an ISO date."""
+    day = date.fromisoformat(day)
+    # POS Sales today (room checkouts are in the karaoke revenue below)
+    total_pos_sales = day_takings(outlet, day)['counter']
     
     # Karaoke Revenue today (completed sessions only)
     from karaoke.models import RoomSession
-    karaoke_sessions = RoomSession.objects.filter(outlet=outlet, status='Completed', ended_at__date=today)
+    karaoke_sessions = RoomSession.objects.filter(outlet=outlet, status='Completed', ended_at__date=day)
     total_karaoke_revenue = karaoke_sessions.aggregate(Sum('total_charge'))['total_charge__sum'] or Decimal('0')
     
-    # Total Revenue
-    total_revenue = total_pos_sales + total_karaoke_revenue
-    
-    # Low Stock Items
-    low_stock_items = Product.objects.filter(outlet=outlet, current_stock_level__lt=10).order_by('current_stock_level')[:5]
+    return {
+        'total_pos_sales': total_pos_sales,
+        'total_karaoke_revenue': total_karaoke_revenue,
+        'total_revenue': total_pos_sales + total_karaoke_revenue,
+        'low_stock_items': list(Product.objects.filter(outlet=outlet, components__isnull=True, current_stock_level__lt=10).order_by('current_stock_level')[:5]),
+    }
+
+@login_required
+def dashboard(request):
+    outlet = get_user_outlet(request.user)
+    today = date.today()
     
     return render(request, 'core/manager_dashboard.html', {
         'outlet': outlet,
-        'total_pos_sales': total_pos_sales,
-        'total_karaoke_revenue': total_karaoke_revenue,
-        'total_revenue': total_revenue,
-        'low_stock_items': low_stock_items,
+        **dashboard_figures(outlet, today.isoformat()),
+        'owned_outlet_count': owner_outlets(request.user).count(),
         'today': today,
         'now': timezone.now()
     })
 
+@login_required
+@read_replica
+def group_dashboard(request):
+    """Consolidated figures across every outlet the user owns, with a per-outlet comparison."""
+    outlets = list(owner_outlets(request.user))
+    if not outlets:
+        messages.error(request, "You don't own any outlets yet.")
+        return redirect('dashboard')
+
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), 366)
+    except ValueError:
+        days = 7
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+
+    return render(request, 'core/group_dashboard.html', {
+        'summary': group_summary(outlets, start, end),
+        'outlet_count': len(outlets),
+        'start': start,
+        'end': end,
+        'days': days,
+        'period_choices': [1, 7, 30, 90],
+    })
+
+@login_required
+@require_POST
+def switch_outlet(request):
+    """Work in another outlet: stores the choice in the session for OutletMiddleware."""
+    outlet_id = request.POST.get('outlet_id', '')
+    outlet = owner_outlets(request.user).filter(pk=outlet_id).first() if outlet_id.isdigit() else None
+    if outlet:
+        request.session[OUTLET_SESSION_KEY] = outlet.pk
+        messages.success(request, f"Switched to {outlet.name}.")
+    else:
+        messages.error(request, "You can't switch to that outlet.")
+
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = 'dashboard'
+    return redirect(next_url)
+
 # --- SALES HISTORY ---
 @login_required
 def sales_history(request):
     outlet = get_user_outlet(request.user)
-    sales = SaleTransaction.objects.filter(outlet=outlet).order_by('-date')
-    return render(request, 'karaoke/sales_history.html', {'sales': sales})
+    return render(request, 'karaoke/sales_history.html', {'sales': sales_page(outlet, request.GET.get('page'))})
 
 # --- CUSTOMER CREDIT ---
 @login_required
@@ -74,11 +137,12 @@ def clear_partial_credit(request, customer_id):
     if request.method == 'POST':
         amount_str = request.POST.get('amount', '0')
         amount = Decimal(amount_str) if amount_str else Decimal('0')
-        customer = get_object_or_404(Customer, id=customer_id)
         if amount > 0:
-            CreditPayment.objects.create(customer=customer, amount_paid=amount, notes="Partial payment received")
-            customer.current_balance -= amount
-            customer.save()
+            with transaction.atomic():
+                customer = get_object_or_404(Customer.objects.select_for_update(), id=customer_id)
+                CreditPayment.objects.create(customer=customer, amount_paid=amount, notes="Partial payment received")
+                customer.current_balance -= amount
+                customer.save()
             messages.success(request, f"MVR {amount} recorded for {customer.name}.")
     return redirect('customer_credit_list')
 
@@ -90,20 +154,34 @@ def import_data(request):
         outlet = get_user_outlet(request.user)
         try:
             df = pd.read_csv(csv_file, low_memory=False)
+            suppliers = {}
             for _, row in df.iterrows():
                 name = row.get('Name')
                 if pd.isna(name): continue
+                # Only set a supplier the file names, so ones assigned in the admin survive re-imports
+                extra = {}
+                if pd.notna(row.get('Supplier')):
+                    supplier_name = str(row.get('Supplier')).strip()
+                    if supplier_name not in suppliers:
+                        suppliers[supplier_name] = Supplier.objects.get_or_create(outlet=outlet, name=supplier_name)[0]
+                    extra['supplier'] = suppliers[supplier_name]
                 Product.objects.update_or_create(
                     name=name, outlet=outlet,
                     defaults={
+                        **extra,
                         'sku': row.get('SKU'),
                         'category': str(row.get('Category')) if pd.notna(row.get('Category')) else "General",
                         'cost_price': float(row.get('Cost', 0)) if pd.notna(row.get('Cost')) else 0.0,
                         'selling_price': float(row.get('Price [Chillo]', 0)) if pd.notna(row.get('Price [Chillo]')) else 0.0,
                         'current_stock_level': int(float(row.get('In stock [Chillo]', 0))) if pd.notna(row.get('In stock [Chillo]')) else 0,
+                        'low_stock_threshold': int(float(row.get('Low stock [Chillo]'))) if pd.notna(row.get('Low stock [Chillo]')) else None,
+                        'optimal_stock': int(float(row.get('Optimal stock [Chillo]'))) if pd.notna(row.get('Optimal stock [Chillo]')) else None,
                     }
                 )
-            messages.success(request, "Import successful!")
+            components = import_components(outlet, df)
+            variants, modifier_links = import_options(outlet, df)
+            tax_links = import_taxes(outlet, df)
+            messages.success(request, f"Import successful! {variants} variants, {modifier_links} modifier links, {tax_links} product taxes and {components} recipe components loaded.")
         except Exception as e:
             messages.error(request, f"Error: {e}")
         return redirect('dashboard')
@@ -122,17 +200,29 @@ def export_data(request):
     return response
 
 # --- POS SYSTEM ---
+@cached('catalog')
+def product_categories(outlet):
+    """Sorted, non-empty product categories for an outlet."""
+    categories = Product.objects.filter(outlet=outlet).values_list('category', flat=True).distinct().order_by('category')
+    return [c for c in categories if c]
+
+@cached('customers')
+def customer_choices(outlet):
+    """(id, name) of the outlet's customers for the POS customer picker."""
+    return list(Customer.objects.filter(outlet=outlet).order_by('name').values('id', 'name'))
+
 @login_required
 def record_sale(request):
     outlet = get_user_outlet(request.user)
-    products = Product.objects.filter(outlet=outlet).order_by('name')
-    customers = Customer.objects.filter(outlet=outlet).order_by('name')
+    # One tile per product from the cached menu; variants and modifiers ride along as JSON
+    products = pos_products(outlet)
+    catalog = pos_catalog(outlet)
+    customers = customer_choices(outlet)
     
     # Get unique category list only
-    categories = Product.objects.filter(outlet=outlet).values_list('category', flat=True).distinct().order_by('category')
-    categories = [c for c in categories if c]
+    categories = product_categories(outlet)
     
-    favorites = products.filter(is_favorite=True)
+    favorites = [product for product in products if product['favorite']]
     
     # Get rooms for this outlet (dynamic, not hardcoded)
     from karaoke.models import Room
@@ -140,6 +230,7 @@ def record_sale(request):
     
     return render(request, 'core/pos.html', {
         'products': products,
+        'product_options': {'products': catalog['options'], 'modifier_groups': catalog['modifier_groups']},
         'customers': customers,
         'categories': categories,
         'favorites': favorites,
@@ -152,81 +243,25 @@ def submit_sale(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            cart = data.get('items', [])
-            payment_method = data.get('payment_method', 'Cash')
-            customer_id = data.get('customer_id')
-            table_number = data.get('table_number', 'Counter')
             outlet = get_user_outlet(request.user)
-            
-            if not cart:
-                return JsonResponse({'success': False, 'error': 'Cart is empty'}, status=400)
-            
-            total_float = sum(float(item['price']) * int(item['quantity']) for item in cart)
-            total_amount = Decimal(str(round(total_float, 2)))
-
-            # Get or create customer (filtered by outlet)
-            customer_obj = None
-            customer_name = None
-            if customer_id:
-                try:
-                    customer_obj = Customer.objects.get(id=customer_id, outlet=outlet)
-                    customer_name = customer_obj.name
-                except Customer.DoesNotExist:
-                    pass
-            
-            if not customer_name:
-                customer_name = table_number or "Walk-in"
-
-            # Create Transaction (Matching our new Model fields)
-            transaction = SaleTransaction.objects.create(
-                outlet=outlet, 
-                customer=customer_obj,
-                total_amount=total_amount, 
-                payment_method=payment_method,
-                customer_name=customer_name,
-                status='Completed'
+            sale = checkout(
+                outlet, data.get('items', []),
+                payment_method=data.get('payment_method', 'Cash'),
+                customer_id=data.get('customer_id'),
+                # Counter sales without a customer are recorded under their table
+                customer_name=data.get('customer_name') or data.get('table_number') or 'Walk-in',
+                claimed_total=data.get('total_price'),
+                sold_by=request.user.username,
             )
-
-            # Create Sale Items and deduct stock
-            for item in cart:
-                try:
-                    product = Product.objects.get(id=item['id'], outlet=outlet)
-                    qty = int(item['quantity'])
-                    
-                    SaleItem.objects.create(
-                        sale=transaction, 
-                        product=product, 
-                        quantity=qty, 
-                        price=Decimal(str(item['price']))
-                    )
-                    
-                    # Log inventory deduction
-                    previous_level = product.current_stock_level
-                    product.current_stock_level -= qty
-                    product.save()
-                    
-                    # Create inventory log
-                    InventoryLog.objects.create(
-                        outlet=outlet,
-                        product=product,
-                        action='Sale',
-                        quantity_changed=-qty,
-                        previous_level=previous_level,
-                        new_level=product.current_stock_level,
-                        reference=f"Transaction #{transaction.id}",
-                        notes=f"Sold by {request.user.username}"
-                    )
-                except Product.DoesNotExist:
-                    continue
-
-            # Update customer visit count and balance if applicable
-            if customer_obj:
-                customer_obj.visit_count += 1
-                if payment_method == 'Credit':
-                    customer_obj.current_balance += total_amount
-                customer_obj.save()
-
-            return JsonResponse({'success': True, 'transaction_id': transaction.id})
+            return JsonResponse({
+                'success': True,
+                'transaction_id': sale.id,
+                'subtotal': sale.subtotal,
+                'tax_total': sale.tax_total,
+                'total': sale.total_amount,
+            })
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
     return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
@@ -240,55 +275,267 @@ def toggle_favorite(request, product_id):
 
 @login_required
 def receipt_detail(request, transaction_id):
-    sale = get_object_or_404(SaleTransaction, id=transaction_id)
+    sale = receipt_sale(get_user_outlet(request.user), transaction_id)
     return render(request, 'karaoke/receipt.html', {'sale': sale})
 
 # --- KARAOKE & TOOLS ---
 # Note: karaoke_list is in karaoke/views.py - removed duplicate
 
 @login_required
-def bulk_stock_entry(request): return render(request, 'core/bulk_stock.html')
+def bulk_stock_entry(request):
+    """Goods received: book a whole delivery (optionally against a purchase order) in one request."""
+    outlet = get_user_outlet(request.user)
+    open_orders = PurchaseOrder.objects.filter(outlet=outlet, status__in=PurchaseOrder.OPEN_STATUSES).select_related('supplier')
+    order_id = request.POST.get('purchase_order') or request.GET.get('po')
+    order = get_object_or_404(open_orders, pk=order_id) if order_id else None
+
+    if request.method == 'POST':
+        quantities = {}
+        for key, value in request.POST.items():
+            if key.startswith('stock_') and value.strip():
+                try:
+                    product_id, quantity = int(key[len('stock_'):]), int(value)
+                except ValueError:
+                    quantity = -1
+                if quantity < 0:
+                    messages.error(request, "Quantities must be whole numbers of zero or more.")
+                    return redirect(request.get_full_path())
+                quantities[product_id] = quantity
+        if not any(quantities.values()):
+            messages.error(request, "Enter at least one quantity received.")
+            return redirect(request.get_full_path())
+        try:
+            levels = receive_goods(outlet, quantities, request.user, order=order, reference=request.POST.get('reference', '').strip())
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('purchase_orders')
+        messages.success(request, f"Stock received for {len(levels)} product{'s' if len(levels) != 1 else ''}.")
+        return redirect('purchase_orders' if order else 'bulk_stock_entry')
+
+    # Prefill what is still outstanding on the chosen order
+    expected = {}
+    if order:
+        expected = {line.product_id: line.quantity_outstanding for line in order.lines.all()}
+    products = Product.objects.filter(outlet=outlet).order_by('name').only('id', 'name', 'sku', 'current_stock_level')
+    for product in products:
+        product.expected = expected.get(product.id)
+    return render(request, 'core/bulk_stock.html', {
+        'outlet': outlet,
+        'products': products,
+        'open_orders': open_orders,
+        'order': order,
+    })
+
 @login_required
-def log_spoilage(request): return render(request, 'core/log_spoilage.html')
+def purchase_orders(request):
+    """Open and recent purchase orders with their totals."""
+    outlet = get_user_outlet(request.user)
+    orders = PurchaseOrder.objects.filter(outlet=outlet).select_related('supplier').annotate(
+        line_count=Count('lines'),
+        total_cost=Sum(F('lines__quantity_ordered') * F('lines__unit_cost')),
+    )[:50]
+    return render(request, 'core/purchase_orders.html', {'outlet': outlet, 'orders': orders})
+
+@login_required
+@require_POST
+def create_purchase_order(request):
+    """Draft a purchase order for one supplier from the nightly reorder suggestions."""
+    outlet = get_user_outlet(request.user)
+    supplier_id = request.POST.get('supplier') or None
+    supplier = get_object_or_404(Supplier, pk=supplier_id, outlet=outlet) if supplier_id else None
+    # Composites are made from their components, so they are never ordered themselves
+    forecasts = ProductForecast.objects.filter(
+        outlet=outlet, suggested_order__gt=0, product__supplier=supplier, product__components__isnull=True,
+    ).select_related('product')
+    if not forecasts:
+        messages.info(request, "Nothing to order from this supplier.")
+        return redirect('reorder_suggestions')
+    with transaction.atomic():
+        order = PurchaseOrder.objects.create(outlet=outlet, supplier=supplier, created_by=request.user)
+        PurchaseOrderLine.objects.bulk_create([
+            PurchaseOrderLine(order=order, product=forecast.product, quantity_ordered=forecast.suggested_order,
+                              unit_cost=forecast.product.cost_price)
+            for forecast in forecasts
+        ])
+    messages.success(request, f"{order} drafted with {len(forecasts)} line{'s' if len(forecasts) != 1 else ''}.")
+    return redirect('purchase_orders')
+
+
+@login_required
+def log_spoilage(request):
+    """Spoilage, breakage and stock-take batches: many products in one request and one transaction."""
+    outlet = get_user_outlet(request.user)
+    form = StockAdjustmentForm(request.POST or None, initial={'reason': request.GET.get('reason', 'expired')})
+    if request.method == 'POST' and form.is_valid():
+        quantities = {}
+        for key, value in request.POST.items():
+            if key.startswith('qty_') and value.strip():
+                try:
+                    quantities[int(key[len('qty_'):])] = int(value)
+                except ValueError:
+                    messages.error(request, "Quantities must be whole numbers.")
+                    return redirect('log_spoilage')
+        if not quantities:
+            messages.error(request, "Enter at least one quantity.")
+            return redirect('log_spoilage')
+        reference, levels = adjust_stock(
+            outlet, form.cleaned_data['reason'], quantities, request.user,
+            reference=form.cleaned_data['reference'], notes=form.cleaned_data['notes'],
+        )
+        messages.success(request, f"{len(levels)} product{'s' if len(levels) != 1 else ''} adjusted ({reference}).")
+        return redirect(f"{reverse('stock_variance_report')}?{urlencode({'reference': reference})}")
+
+    products = Product.objects.filter(outlet=outlet).order_by('category', 'name').only('id', 'name', 'sku', 'category', 'current_stock_level')
+    return render(request, 'core/log_spoilage.html', {'outlet': outlet, 'form': form, 'products': products})
+
+@login_required
+@require_POST
+def stock_adjust_api(request):
+    """
+    JSON batch adjustment: {"reason": "damaged", "items": [{"id": 1, "quantity": 2}, ...],
+    "reference": "...", "notes": "..."}. A stock_take reason treats quantities as counted levels.
+    """
+    outlet = get_user_outlet(request.user)
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict) or not isinstance(data.get('items', []), list):
+            raise TypeError
+        quantities = {int(item['id']): int(item['quantity']) for item in data.get('items', [])}
+    except (ValueError, TypeError, KeyError, OverflowError):
+        return JsonResponse({'success': False, 'error': 'items must be a list of {"id", "quantity"} integers'}, status=400)
+    form = StockAdjustmentForm(data)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'error': form.errors.get_json_data()}, status=400)
+    if not quantities:
+        return JsonResponse({'success': False, 'error': 'No items'}, status=400)
+    reference, levels = adjust_stock(
+        outlet, form.cleaned_data['reason'], quantities, request.user,
+        reference=form.cleaned_data['reference'], notes=form.cleaned_data['notes'],
+    )
+    variance = stock_variance(outlet, reference=reference)
+    return JsonResponse({
+        'success': True,
+        'reference': reference,
+        'levels': levels,
+        'variance_quantity': variance['total_quantity'],
+        'variance_value': variance['total_value'],
+    })
+
+@login_required
+@read_replica
+def stock_variance_report(request):
+    """Spoilage and adjustment variance by product and reason, for a date range or one batch."""
+    outlet = get_user_outlet(request.user)
+    reference = request.GET.get('reference', '').strip()
+    today = timezone.localdate()
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else today - timedelta(days=30)
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else today
+    except ValueError:
+        messages.error(request, "Please choose valid dates.")
+        start, end = today - timedelta(days=30), today
+    if reference:
+        variance = stock_variance(outlet, reference=reference)
+    else:
+        variance = stock_variance(outlet, start, end)
+    return render(request, 'core/stock_variance.html', {
+        'outlet': outlet,
+        'variance': variance,
+        'reference': reference,
+        'start': start,
+        'end': end,
+    })
+
+
 @login_required
-def financial_summary_report(request): return render(request, 'core/financial_summary.html')
+@read_replica
+def financial_summary_report(request):
+    """Revenue, COGS, expenses, payroll and margins for a date range, bucketed by day/week/month."""
+    outlet = get_user_outlet(request.user)
+    today = date.today()
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else today.replace(day=1)
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else today
+    except ValueError:
+        messages.error(request, "Please choose valid dates.")
+        start, end = today.replace(day=1), today
+    if end < start:
+        start, end = end, start
+    bucket = request.GET.get('bucket')
+    if bucket not in BUCKETS:
+        # Keep long ranges readable by default
+        bucket = 'day' if (end - start).days <= 62 else 'month'
+
+    return render(request, 'core/financial_report.html', {
+        'outlet': outlet,
+        'summary': financial_summary(outlet, start, end, bucket),
+        'taxes': tax_summary(outlet, start, end),
+        'buckets': BUCKETS,
+    })
 @login_required
 def add_expense(request): return render(request, 'core/add_expense.html')
 @login_required
 def payroll_report(request): return render(request, 'core/payroll_report.html')
 @login_required
+@read_replica
+def stock_as_of_api(request):
+    """Stock level and value per product at the end of ?date=YYYY-MM-DD (default today)."""
+    outlet = get_user_outlet(request.user)
+    try:
+        day = date.fromisoformat(request.GET['date']) if request.GET.get('date') else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'date must be YYYY-MM-DD'}, status=400)
+    return JsonResponse({'success': True, **stock_as_of(outlet, day)})
+
+@login_required
+@read_replica
 def low_stock_report(request):
     """Display low stock alert dashboard for manager."""
     outlet = get_user_outlet(request.user)
-    threshold = int(request.GET.get('threshold', 10))
+    # Default for products without their own low_stock_threshold
+    threshold = int(request.GET.get('threshold', DEFAULT_LOW_STOCK_THRESHOLD))
     
-    # Get low stock products
-    low_stock_products = Product.objects.filter(
-        outlet=outlet,
-        current_stock_level__lt=threshold
-    ).order_by('current_stock_level')
+    # Products below their threshold, with sales velocity and reorder suggestions
+    products = low_stock_products(outlet, threshold)
     
-    # Get recent inventory logs for these products
+    # Get recent inventory logs for these products (ids, so the (product, created_at) index applies)
     recent_logs = InventoryLog.objects.filter(
         outlet=outlet,
-        product__in=low_stock_products
-    ).order_by('-created_at')[:20]
+        product_id__in=[product.id for product in products]
+    ).select_related('product').order_by('-created_at')[:20]
     
-    stats = {
-        'total_products': Product.objects.filter(outlet=outlet).count(),
-        'low_stock_count': low_stock_products.count(),
-        'critical_stock': Product.objects.filter(outlet=outlet, current_stock_level__lt=5).count(),
-        'out_of_stock': Product.objects.filter(outlet=outlet, current_stock_level__lte=0).count(),
-    }
+    stats = low_stock_stats(outlet, threshold)
     
     return render(request, 'core/low_stock_report.html', {
-        'low_stock_products': low_stock_products,
+        'low_stock_products': products,
         'recent_logs': recent_logs,
         'stats': stats,
         'threshold': threshold,
         'outlet': outlet
     })
 
+@login_required
+@read_replica
+def reorder_suggestions(request):
+    """Nightly forecast (forecast_demand) of what to order, grouped by supplier."""
+    outlet = get_user_outlet(request.user)
+    forecasts = ProductForecast.objects.filter(
+        outlet=outlet, suggested_order__gt=0, product__components__isnull=True,
+    ).select_related('product', 'product__supplier').order_by('product__supplier__name', 'days_of_cover', 'product__name')
+
+    groups = {}
+    for forecast in forecasts:
+        supplier = forecast.product.supplier
+        group = groups.setdefault(supplier.pk if supplier else None, {'supplier': supplier, 'items': [], 'total_cost': Decimal('0')})
+        group['items'].append(forecast)
+        group['total_cost'] += forecast.suggested_order * forecast.product.cost_price
+
+    return render(request, 'core/reorder_suggestions.html', {
+        'outlet': outlet,
+        'groups': list(groups.values()),
+        'computed_at': max((forecast.computed_at for forecast in forecasts), default=None),
+    })
+
 @login_required
 def attendance_check_in(request):
     """Employee check-in."""
@@ -341,6 +588,7 @@ def attendance_check_out(request):
     return redirect('dashboard')
 
 @login_required
+@read_replica
 def attendance_report(request):
     """View attendance for the outlet."""
     outlet = get_user_outlet(request.user)
@@ -392,6 +640,7 @@ def payroll_calculate(request):
     return redirect('payroll_report', year=year, month=month)
 
 @login_required
+@read_replica
 def payroll_report(request):
     """View payroll for the outlet."""
     outlet = get_user_outlet(request.user)
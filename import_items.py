@@ -16,7 +16,10 @@ except Exception as e:
     print(f"DJANGO SETUP ERROR: {e}")
     sys.exit(1)
 
-from core.models import Product, Outlet
+from core.models import Product, Outlet, Supplier
+from core.inventory import import_components
+from core.catalog import import_options
+from core.taxes import import_taxes
 
 def run_import():
     # Define the CSV name precisely
@@ -62,16 +65,25 @@ def run_import():
             price = float(row.get('Price [Chillo]', 0)) if pd.notna(row.get('Price [Chillo]')) else 0.0
             cost = float(row.get('Cost', 0)) if pd.notna(row.get('Cost')) else 0.0
             stock = int(float(row.get('In stock [Chillo]', 0))) if pd.notna(row.get('In stock [Chillo]')) else 0
+            low_stock = int(float(row.get('Low stock [Chillo]'))) if pd.notna(row.get('Low stock [Chillo]')) else None
+            optimal = int(float(row.get('Optimal stock [Chillo]'))) if pd.notna(row.get('Optimal stock [Chillo]')) else None
+            # Only set a supplier the file names, so ones assigned in the admin survive re-imports
+            extra = {}
+            if pd.notna(row.get('Supplier')):
+                extra['supplier'], _ = Supplier.objects.get_or_create(outlet=outlet, name=str(row.get('Supplier')).strip())
 
             Product.objects.update_or_create(
                 name=name,
                 outlet=outlet,
                 defaults={
+                    **extra,
                     'sku': row.get('SKU'),
                     'category': category,
                     'cost_price': cost,
                     'selling_price': price,
-                    'current_stock_level': stock
+                    'current_stock_level': stock,
+                    'low_stock_threshold': low_stock,
+                    'optimal_stock': optimal,
                 }
             )
             success_count += 1
@@ -82,6 +94,10 @@ def run_import():
             print(f"Row {index} Skip Error: {e}")
 
     print(f"--- SUCCESS: {success_count} items imported into {outlet.name} ---")
+    print(f"--- RECIPES: {import_components(outlet, df)} components loaded ---")
+    variants, modifier_links = import_options(outlet, df)
+    print(f"--- OPTIONS: {variants} variants, {modifier_links} modifier links loaded ---")
+    print(f"--- TAXES: {import_taxes(outlet, df)} product taxes linked ---")
 
 if __name__ == "__main__":
     run_import()
\ No newline at end of file
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Room, RoomSession, BookingRequest, RoomOrder, RoomOrderItem
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from .models import Room, RoomSession, BookingRequest, RoomOrder, RoomOrderItem, Notification
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
@@ -14,7 +16,7 @@ class RoomSessionAdmin(admin.ModelAdmin):
     list_filter = ('status', 'outlet')
     search_fields = ('customer_name', 'room__name')
     ordering = ('-started_at',)
-    readonly_fields = ('booked_at', 'room_charge', 'total_charge')
+    readonly_fields = ('booked_at', 'room_charge', 'food_beverage_charge', 'item_count', 'pending_order_count', 'total_charge', 'sale')
 
 @admin.register(BookingRequest)
 class BookingRequestAdmin(admin.ModelAdmin):
@@ -22,13 +24,73 @@ class BookingRequestAdmin(admin.ModelAdmin):
     list_filter = ('status', 'requested_date', 'outlet')
     search_fields = ('customer_name', 'phone_number')
 
+class RunningTotalsAdmin(admin.ModelAdmin):
+    """
+    Admin saves and deletes bypass RoomOrder.add_to_session/void, so after each change the
+    running counters of the sessions it touched are rebuilt from their orders. Those are
+    the object's session and, when the form moved it, the session it came from.
+    """
+    def affected_sessions(self, obj, form=None):
+        return {obj.session_id, form.initial.get('session') if form else None}
+
+    def changed(self, obj, form=None):
+        """Hook run after a save or delete, before the sessions are rebuilt."""
+
+    def rebuild(self, session_ids):
+        session_ids = {pk for pk in session_ids if pk}
+        if session_ids:
+            RoomSession.rebuild_running_totals(RoomSession.all_outlets.filter(pk__in=session_ids))
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.changed(obj, form)
+        self.rebuild(self.affected_sessions(obj, form))
+
+    def delete_model(self, request, obj):
+        session_ids = self.affected_sessions(obj)
+        super().delete_model(request, obj)
+        self.changed(obj)
+        self.rebuild(session_ids)
+
+    def delete_queryset(self, request, queryset):
+        objs = list(queryset)
+        session_ids = set().union(*(self.affected_sessions(obj) for obj in objs))
+        super().delete_queryset(request, queryset)
+        for obj in objs:
+            self.changed(obj)
+        self.rebuild(session_ids)
+
+
 @admin.register(RoomOrder)
-class RoomOrderAdmin(admin.ModelAdmin):
+class RoomOrderAdmin(RunningTotalsAdmin):
     list_display = ('session', 'created_at', 'total_price', 'is_served', 'outlet')
     list_filter = ('is_served', 'created_at', 'outlet')
     ordering = ('-created_at',)
 
 @admin.register(RoomOrderItem)
-class RoomOrderItemAdmin(admin.ModelAdmin):
+class RoomOrderItemAdmin(RunningTotalsAdmin):
     list_display = ('order', 'product', 'quantity', 'price')
-    list_filter = ('outlet',)
\ No newline at end of file
+    list_filter = ('outlet',)
+
+    def affected_orders(self, obj, form=None):
+        return {pk for pk in (obj.order_id, form.initial.get('order') if form else None) if pk}
+
+    def affected_sessions(self, obj, form=None):
+        # Items have no session of their own; their orders (old and new) lead to it
+        return set(RoomOrder.all_outlets.filter(pk__in=self.affected_orders(obj, form)).values_list('session_id', flat=True))
+
+    def changed(self, obj, form=None):
+        # An order's total_price and item_count are the sums of its items
+        for order in RoomOrder.all_outlets.filter(pk__in=self.affected_orders(obj, form)):
+            totals = order.items.aggregate(
+                total=Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField())),
+                count=Sum('quantity'),
+            )
+            RoomOrder.all_outlets.filter(pk=order.pk).update(total_price=totals['total'] or 0, item_count=totals['count'] or 0)
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'created_at', 'sent_at', 'outlet')
+    list_filter = ('status', 'outlet')
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'last_error', 'claim_token')
\ No newline at end of file
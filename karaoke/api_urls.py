@@ -5,7 +5,7 @@ from . import views
 
 urlpatterns = [
     # C1: Availability check
-    #path('availability/', views.check_availability, name='api_availability_check'), 
+    path('availability/', views.check_availability, name='api_availability_check'),
     
     # M2: In-Room Order Placement 
     path('orders/place/', views.place_order, name='api_place_order'), 
@@ -2,4 +2,12 @@ from django.apps import AppConfig
 
 class KaraokeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'karaoke'
\ No newline at end of file
+    name = 'karaoke'
+
+    def ready(self):
+        from core.cache import watch_model
+        from karaoke.models import Room, RoomSession, OutletSetting
+
+        watch_model(Room, ['rooms'])
+        watch_model(RoomSession, ['rooms', 'dashboard', 'finance'])
+        watch_model(OutletSetting, ['tax'])
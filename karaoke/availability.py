@@ -0,0 +1,150 @@
+"""
+Booking Availability Engine for Karaoke Rooms
+Builds a sorted interval index of busy time per room from open sessions and
+approved bookings, and answers "which rooms are free from X for N minutes".
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Room, RoomSession, BookingRequest
+
+OPEN_SESSION_STATUSES = ('Booked', 'Active', 'Paused')
+
+
+class IntervalIndex:
+    """
+    Sorted, non-overlapping list of busy [start, end) intervals for one room.
+    Overlapping or touching intervals are merged on insert, so both the start
+    and end lists stay sorted and lookups are a bisect.
+    """
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def add(self, start, end):
+        """Insert a busy interval, merging it with any neighbours it touches."""
+        if end <= start:
+            return
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def is_free(self, start, end):
+        """True if [start, end) does not overlap any busy interval."""
+        idx = bisect_right(self.ends, start)
+        return idx == len(self.starts) or self.starts[idx] >= end
+
+    def free_slots(self, window_start, window_end, min_length=timedelta(0)):
+        """Return the free gaps inside the window that are at least min_length long."""
+        slots = []
+        cursor = window_start
+        idx = bisect_right(self.ends, window_start)
+        while cursor < window_end:
+            next_busy = self.starts[idx] if idx < len(self.starts) else window_end
+            gap_end = min(next_busy, window_end)
+            if gap_end - cursor >= min_length and gap_end > cursor:
+                slots.append((cursor, gap_end))
+            if idx >= len(self.starts):
+                break
+            cursor = max(cursor, self.ends[idx])
+            idx += 1
+        return slots
+
+
+def booking_start(booking):
+    """Aware datetime at which a booking request begins."""
+    return timezone.make_aware(datetime.combine(booking.requested_date, booking.requested_time))
+
+
+def session_interval(session, now=None):
+    """Busy interval for a session: booked length plus extra time and pauses, never ending before now if open."""
+    now = now or timezone.now()
+    start = session.started_at or session.booked_at
+    minutes = session.booked_duration_minutes + session.extra_time_minutes + session.total_pause_minutes
+    end = session.ended_at or start + timedelta(minutes=minutes)
+    if session.status in OPEN_SESSION_STATUSES and session.started_at and end < now:
+        end = now
+    return start, end
+
+
+def build_room_index(outlet, window_start, window_end, exclude_booking=None):
+    """
+    Build {room_id: IntervalIndex} for every room of the outlet, covering the
+    sessions and approved bookings that overlap the window.
+    Approved bookings without an assigned room are placed greedily in the
+    first room that is free for them.
+    """
+    rooms = list(Room.objects.filter(outlet=outlet).order_by('name'))
+    index = {room.id: IntervalIndex() for room in rooms}
+
+    sessions = RoomSession.objects.filter(outlet=outlet, room__in=rooms).filter(
+        Q(status__in=OPEN_SESSION_STATUSES) |
+        Q(status='Completed', started_at__lt=window_end, ended_at__gt=window_start)
+    ).only('room_id', 'status', 'booked_at', 'started_at', 'ended_at',
+           'booked_duration_minutes', 'extra_time_minutes', 'total_pause_minutes')
+    now = timezone.now()
+    for session in sessions:
+        start, end = session_interval(session, now)
+        if start < window_end and end > window_start:
+            index[session.room_id].add(start, end)
+
+    # A booking can start the evening before and run past midnight into the window
+    bookings = BookingRequest.objects.filter(
+        outlet=outlet,
+        status='Approved',
+        requested_date__range=(window_start.date() - timedelta(days=1), window_end.date()),
+    ).order_by('room_id', 'requested_date', 'requested_time')
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking.pk)
+
+    unassigned = []
+    for booking in bookings:
+        start = booking_start(booking)
+        end = start + timedelta(minutes=booking.duration_minutes)
+        if start >= window_end or end <= window_start:
+            continue
+        if booking.room_id in index:
+            index[booking.room_id].add(start, end)
+        else:
+            unassigned.append((start, end))
+
+    for start, end in unassigned:
+        for room in rooms:
+            if index[room.id].is_free(start, end):
+                index[room.id].add(start, end)
+                break
+
+    return rooms, index
+
+
+def free_rooms(outlet, start, duration_minutes, exclude_booking=None):
+    """Rooms of the outlet that are free for the whole of [start, start + duration)."""
+    end = start + timedelta(minutes=duration_minutes)
+    rooms, index = build_room_index(outlet, start, end, exclude_booking=exclude_booking)
+    return [room for room in rooms if index[room.id].is_free(start, end)]
+
+
+def day_free_slots(outlet, day):
+    """Free slots per room for a whole day, honouring each room's minimum booking duration."""
+    window_start = timezone.make_aware(datetime.combine(day, time.min))
+    window_end = window_start + timedelta(days=1)
+    rooms, index = build_room_index(outlet, window_start, window_end)
+    return [
+        (room, index[room.id].free_slots(window_start, window_end, timedelta(minutes=room.min_booking_duration)))
+        for room in rooms
+    ]
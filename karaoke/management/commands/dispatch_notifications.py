@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from karaoke.notifications import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications from the outbox in batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep running as a background worker")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = dispatch_pending(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+            if not options['loop']:
+                break
+            # Drain full batches back to back; only sleep once the outbox is caught up
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from karaoke.models import RoomSession
+
+
+class Command(BaseCommand):
+    help = "Check RoomSession running F&B totals against RoomOrder rows and rebuild any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Report drift without fixing it")
+        parser.add_argument('--outlet', type=int, help="Only check sessions for this outlet id")
+        parser.add_argument('--open-only', action='store_true', help="Only check Booked/Active/Paused sessions")
+
+    def handle(self, *args, **options):
+        sessions = RoomSession.objects.all()
+        if options['outlet']:
+            sessions = sessions.filter(outlet_id=options['outlet'])
+        if options['open_only']:
+            sessions = sessions.filter(status__in=['Booked', 'Active', 'Paused'])
+
+        drifted = RoomSession.rebuild_running_totals(sessions, fix=not options['check'])
+        for session in drifted:
+            self.stdout.write(
+                f"Session #{session.pk}: stored {session.food_beverage_charge} / {session.item_count} items / "
+                f"{session.pending_order_count} pending, actual {session.actual_charge or 0} / "
+                f"{session.actual_items or 0} items / {session.actual_pending or 0} pending"
+            )
+
+        verb = "found" if options['check'] else "rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} session(s) {verb} with drifted totals."))
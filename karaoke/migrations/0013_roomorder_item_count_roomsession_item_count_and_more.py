@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:25
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_running_totals(apps, schema_editor):
+    RoomOrder = apps.get_model('karaoke', 'RoomOrder')
+    RoomSession = apps.get_model('karaoke', 'RoomSession')
+
+    for order in RoomOrder.objects.annotate(qty=Sum('items__quantity')).iterator():
+        RoomOrder.objects.filter(pk=order.pk).update(item_count=order.qty or 0)
+
+    sessions = RoomSession.objects.annotate(
+        charge=Sum('orders__total_price'),
+        items=Sum('orders__item_count'),
+        pending=Count('orders', filter=Q(orders__is_served=False)),
+    )
+    for session in sessions.iterator():
+        RoomSession.objects.filter(pk=session.pk).update(
+            food_beverage_charge=session.charge or Decimal('0'),
+            item_count=session.items or 0,
+            pending_order_count=session.pending or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('karaoke', '0012_delete_roomsession_roomsession_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomorder',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='roomsession',
+            name='item_count',
+            field=models.IntegerField(default=0, help_text='Total quantity of items ordered'),
+        ),
+        migrations.AddField(
+            model_name='roomsession',
+            name='pending_order_count',
+            field=models.IntegerField(default=0, help_text='Orders not yet served'),
+        ),
+        migrations.AlterField(
+            model_name='roomsession',
+            name='food_beverage_charge',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Running total of room orders, kept in sync by RoomOrder', max_digits=10),
+        ),
+        migrations.RunPython(backfill_running_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_outlet_logo'),
+        ('karaoke', '0013_roomorder_item_count_roomsession_item_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingrequest',
+            name='room',
+            field=models.ForeignKey(blank=True, help_text='Assigned on approval', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='karaoke.room'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingrequest',
+            index=models.Index(fields=['outlet', 'status', 'requested_date'], name='karaoke_boo_outlet__13cd69_idx'),
+        ),
+    ]
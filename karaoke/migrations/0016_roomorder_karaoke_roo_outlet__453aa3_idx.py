@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_outlets(apps, schema_editor):
+    """Give legacy rows without an outlet one, so outlet-scoped managers can see them."""
+    Outlet = apps.get_model('core', 'Outlet')
+    Room = apps.get_model('karaoke', 'Room')
+    RoomSession = apps.get_model('karaoke', 'RoomSession')
+    RoomOrder = apps.get_model('karaoke', 'RoomOrder')
+    RoomOrderItem = apps.get_model('karaoke', 'RoomOrderItem')
+    BookingRequest = apps.get_model('karaoke', 'BookingRequest')
+
+    RoomSession.objects.filter(outlet__isnull=True).update(
+        outlet=Subquery(Room.objects.filter(pk=OuterRef('room_id')).values('outlet_id')[:1])
+    )
+    RoomOrder.objects.filter(outlet__isnull=True).update(
+        outlet=Subquery(RoomSession.objects.filter(pk=OuterRef('session_id')).values('outlet_id')[:1])
+    )
+    RoomOrderItem.objects.filter(outlet__isnull=True).update(
+        outlet=Subquery(RoomOrder.objects.filter(pk=OuterRef('order_id')).values('outlet_id')[:1])
+    )
+    BookingRequest.objects.filter(outlet__isnull=True, room__isnull=False).update(
+        outlet=Subquery(Room.objects.filter(pk=OuterRef('room_id')).values('outlet_id')[:1])
+    )
+
+    # Bookings from the public page before outlets were recorded: only attributable with a single outlet
+    outlet_ids = list(Outlet.objects.values_list('id', flat=True)[:2])
+    if len(outlet_ids) == 1:
+        BookingRequest.objects.filter(outlet__isnull=True).update(outlet_id=outlet_ids[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_customer_core_custom_outlet__751204_idx_and_more'),
+        ('karaoke', '0015_notification'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_outlets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='roomorder',
+            index=models.Index(fields=['outlet', 'is_served', 'created_at'], name='karaoke_roo_outlet__453aa3_idx'),
+        ),
+    ]
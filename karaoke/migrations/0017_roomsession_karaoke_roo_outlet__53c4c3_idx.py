@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_expense_core_expens_outlet__f1b01f_idx'),
+        ('karaoke', '0016_roomorder_karaoke_roo_outlet__453aa3_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomsession',
+            index=models.Index(fields=['outlet', 'status', 'ended_at'], name='karaoke_roo_outlet__53c4c3_idx'),
+        ),
+    ]
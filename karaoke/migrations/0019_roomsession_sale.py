@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_taxes'),
+        ('karaoke', '0018_roomorderitem_unit_cost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomsession',
+            name='sale',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='room_session', to='core.saletransaction'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum, Count, Q
 from django.utils import timezone
 from decimal import Decimal
-from core.models import Outlet, Product, Customer
+from core.models import Outlet, Product, Customer, SaleTransaction
+from core.cache import invalidate
+from core.multi_tenant import OutletManager
 
 # --- ROOM MANAGEMENT MODELS ---
 
@@ -32,6 +35,9 @@ class Room(models.Model):
     # Configuration
     min_booking_duration = models.IntegerField(default=60, help_text="Minimum duration in minutes")
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"{self.name} ({self.room_type})"
 
@@ -75,18 +81,30 @@ class RoomSession(models.Model):
     base_rate = models.DecimalField(max_digits=10, decimal_places=2, default=100)
     room_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     extra_time_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    food_beverage_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    food_beverage_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Running total of room orders, kept in sync by RoomOrder")
     total_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     
+    # Running order counters (denormalized from RoomOrder)
+    item_count = models.IntegerField(default=0, help_text="Total quantity of items ordered")
+    pending_order_count = models.IntegerField(default=0, help_text="Orders not yet served")
+
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Booked')
     notes = models.TextField(blank=True, null=True)
+    # Payment recorded at checkout; set once, so a resubmitted checkout can't charge twice
+    sale = models.OneToOneField(SaleTransaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='room_session')
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
 
     def __str__(self):
         return f"{self.room.name} - {self.customer_name or 'Guest'} ({self.status})"
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['outlet', 'status', 'ended_at']),
+        ]
 
     def get_elapsed_minutes(self):
         """Get minutes elapsed since session started (excluding pauses)."""
@@ -146,15 +164,51 @@ class RoomSession(models.Model):
             self.status = 'Active'
             self.save()
 
+    def close(self):
+        """End the session now and finalize its charges in memory, without saving."""
+        now = timezone.now()
+        if self.status in ('Active', 'Paused'):
+            self.ended_at = now
+            self.actual_duration_minutes = self.get_elapsed_minutes() + self.extra_time_minutes
+        self.ended_at = self.ended_at or now
+        self.status = 'Completed'
+        self.recalculate_total()
+
     def complete_session(self):
         """Complete the session and finalize charges."""
         if self.status in ('Active', 'Paused'):
-            self.ended_at = timezone.now()
-            self.status = 'Completed'
-            self.actual_duration_minutes = self.get_elapsed_minutes() + self.extra_time_minutes
-            self.recalculate_total()
+            self.close()
             self.save()
 
+    @classmethod
+    def rebuild_running_totals(cls, sessions=None, fix=True):
+        """
+        Recompute food_beverage_charge, item_count and pending_order_count
+        from RoomOrder rows. Returns the sessions whose stored totals drifted.
+        """
+        sessions = cls.objects.all() if sessions is None else sessions
+        actual = sessions.annotate(
+            actual_charge=Sum('orders__total_price'),
+            actual_items=Sum('orders__item_count'),
+            actual_pending=Count('orders', filter=Q(orders__is_served=False)),
+        ).only('id', 'outlet_id', 'food_beverage_charge', 'item_count', 'pending_order_count')
+
+        drifted = []
+        for session in actual:
+            charge = session.actual_charge or Decimal('0')
+            items = session.actual_items or 0
+            pending = session.actual_pending or 0
+            if (session.food_beverage_charge, session.item_count, session.pending_order_count) != (charge, items, pending):
+                drifted.append(session)
+                if fix:
+                    cls.objects.filter(pk=session.pk).update(
+                        food_beverage_charge=charge,
+                        item_count=items,
+                        pending_order_count=pending,
+                    )
+                    invalidate('rooms', session.outlet_id)
+        return drifted
+
 
 # Alias for compatibility
 KaraokeSession = RoomSession
@@ -167,6 +221,7 @@ class BookingRequest(models.Model):
     ]
     
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='booking_requests', null=True)
+    room = models.ForeignKey(Room, on_delete=models.SET_NULL, related_name='bookings', null=True, blank=True, help_text="Assigned on approval")
     customer_name = models.CharField(max_length=200)
     phone_number = models.CharField(max_length=20, blank=True)
     requested_date = models.DateField()
@@ -175,9 +230,17 @@ class BookingRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"Booking: {self.customer_name} on {self.requested_date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'status', 'requested_date']),
+        ]
+
 # --- NEW: KITCHEN/BAR ORDER MODELS ---
 
 class RoomOrder(models.Model):
@@ -185,10 +248,55 @@ class RoomOrder(models.Model):
     session = models.ForeignKey(RoomSession, on_delete=models.CASCADE, related_name='orders')
     created_at = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    item_count = models.IntegerField(default=0)
     is_served = models.BooleanField(default=False)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
-        return f"Order for {self.session.room_name} at {self.created_at}"
+        return f"Order for {self.session.room.name} at {self.created_at}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['outlet', 'is_served', 'created_at']),
+        ]
+
+    def add_to_session(self):
+        """Add this order's totals to its session's running counters."""
+        RoomSession.objects.filter(pk=self.session_id).update(
+            food_beverage_charge=F('food_beverage_charge') + self.total_price,
+            item_count=F('item_count') + self.item_count,
+            pending_order_count=F('pending_order_count') + (0 if self.is_served else 1),
+        )
+        invalidate('rooms', self.outlet_id)
+
+    def mark_served(self):
+        """Mark the order served; only the first call decrements the pending counter."""
+        with transaction.atomic():
+            updated = RoomOrder.objects.filter(pk=self.pk, is_served=False).update(is_served=True)
+            if updated:
+                RoomSession.objects.filter(pk=self.session_id).update(
+                    pending_order_count=F('pending_order_count') - 1
+                )
+                invalidate('rooms', self.outlet_id)
+        self.is_served = True
+        return bool(updated)
+
+    def void(self):
+        """Delete the order and take it back off its session's running counters."""
+        with transaction.atomic():
+            order = RoomOrder.objects.select_for_update().filter(pk=self.pk).first()
+            if order is None:
+                return False
+            RoomSession.objects.filter(pk=order.session_id).update(
+                food_beverage_charge=F('food_beverage_charge') - order.total_price,
+                item_count=F('item_count') - order.item_count,
+                pending_order_count=F('pending_order_count') - (0 if order.is_served else 1),
+            )
+            order.delete()
+        invalidate('rooms', order.outlet_id)
+        return True
 
 class RoomOrderItem(models.Model):
     outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='room_order_items', null=True)
@@ -196,6 +304,16 @@ class RoomOrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Product cost when ordered (see core.models.SaleItem.unit_cost)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.unit_cost is None and self.product_id:
+            self.unit_cost = self.product.cost_price
+        super().save(*args, **kwargs)
 
 # --- EXISTING UTILITY MODELS ---
 
@@ -206,7 +324,44 @@ class OutletSetting(models.Model):
     notification_email = models.EmailField(blank=True, null=True)
     tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
 
+    objects = OutletManager()
+    all_outlets = models.Manager()
+
     def __str__(self):
         return f"Settings for {self.outlet.name}"
     
-    
\ No newline at end of file
+    
+
+class Notification(models.Model):
+    """Outbox row for a notification; written in the caller's transaction and delivered by a worker."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    recipients = models.TextField(help_text="Comma-separated email addresses")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    claim_token = models.CharField(max_length=32, blank=True, null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    @property
+    def recipient_list(self):
+        return [r.strip() for r in self.recipients.split(',') if r.strip()]
@@ -0,0 +1,156 @@
+"""
+Notification Outbox for Karaoke
+Notifications are written as Notification rows inside the caller's transaction
+and delivered later, in batches, by the dispatch_notifications worker.
+Delivery backends are pluggable via settings.KARAOKE_NOTIFICATION_BACKEND.
+"""
+import json
+import sys
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, OutletSetting
+
+DEFAULT_BACKEND = 'karaoke.notifications.EmailBackend'
+DEFAULT_RECIPIENTS = ['sita@chillokay.com']
+DEFAULT_FROM_EMAIL = 'system@chillokay.com'
+MAX_ATTEMPTS = 5
+STALE_CLAIM_MINUTES = 10
+
+
+# --- BACKENDS ---
+
+class BaseBackend(ABC):
+    """Delivers a batch of notifications."""
+    @abstractmethod
+    def send_batch(self, notifications):
+        """Send notifications; returns {notification_id: error message} for the ones that failed."""
+
+
+class EmailBackend(BaseBackend):
+    """Sends the whole batch over one Django mail connection."""
+    def send_batch(self, notifications):
+        errors = {}
+        from_email = getattr(settings, 'KARAOKE_NOTIFICATION_FROM', DEFAULT_FROM_EMAIL)
+        with get_connection(fail_silently=False) as connection:
+            for notification in notifications:
+                try:
+                    EmailMessage(
+                        notification.subject, notification.message, from_email,
+                        notification.recipient_list, connection=connection
+                    ).send()
+                except Exception as e:
+                    errors[notification.id] = str(e)
+        return errors
+
+
+class ConsoleBackend(BaseBackend):
+    """Writes notifications to stdout; useful in development."""
+    stream = sys.stdout
+
+    def send_batch(self, notifications):
+        for notification in notifications:
+            self.stream.write(f"[notification #{notification.id}] To: {notification.recipients}\n"
+                              f"Subject: {notification.subject}\n{notification.message}\n\n")
+        self.stream.flush()
+        return {}
+
+
+class FileBackend(BaseBackend):
+    """Appends notifications as JSON lines to settings.KARAOKE_NOTIFICATION_FILE; useful in tests."""
+    def send_batch(self, notifications):
+        path = getattr(settings, 'KARAOKE_NOTIFICATION_FILE', settings.BASE_DIR / 'notifications.log')
+        with open(path, 'a') as f:
+            for notification in notifications:
+                f.write(json.dumps({
+                    'id': notification.id,
+                    'recipients': notification.recipient_list,
+                    'subject': notification.subject,
+                    'message': notification.message,
+                }) + '\n')
+        return {}
+
+
+def get_backend():
+    return import_string(getattr(settings, 'KARAOKE_NOTIFICATION_BACKEND', DEFAULT_BACKEND))()
+
+
+# --- OUTBOX ---
+
+def queue_notification(subject, message, outlet=None, recipients=None):
+    """
+    Write a notification to the outbox. Call this inside the same transaction as
+    the change it reports, so it is only delivered if that change commits.
+    """
+    if recipients is None:
+        setting = OutletSetting.objects.filter(outlet=outlet).first() if outlet else None
+        if setting and setting.notification_email:
+            recipients = [setting.notification_email]
+        else:
+            recipients = getattr(settings, 'KARAOKE_NOTIFICATION_RECIPIENTS', DEFAULT_RECIPIENTS)
+    return Notification.objects.create(
+        outlet=outlet,
+        subject=subject,
+        message=message,
+        recipients=','.join(recipients),
+    )
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size due notifications for this worker.
+    The claim is a single conditional UPDATE, so concurrent workers never get the same row.
+    """
+    now = timezone.now()
+    stale = now - timedelta(minutes=STALE_CLAIM_MINUTES)
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        # On PostgreSQL, skip rows another worker is claiming instead of waiting for them
+        due = Notification.objects.select_for_update(skip_locked=True).filter(
+            Q(status='Pending', next_attempt_at__lte=now) | Q(status='Sending', next_attempt_at__lte=stale)
+        ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+
+        Notification.objects.filter(
+            Q(status='Pending') | Q(status='Sending', next_attempt_at__lte=stale),
+            id__in=list(due),
+        ).update(status='Sending', claim_token=token, next_attempt_at=now)
+    return list(Notification.objects.filter(claim_token=token, status='Sending'))
+
+
+def dispatch_pending(batch_size=50, backend=None):
+    """Deliver one batch of due notifications. Returns (sent, failed) counts."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    backend = backend or get_backend()
+    try:
+        errors = backend.send_batch(batch)
+    except Exception as e:
+        errors = {notification.id: str(e) for notification in batch}
+
+    now = timezone.now()
+    sent_ids = [n.id for n in batch if n.id not in errors]
+    Notification.objects.filter(id__in=sent_ids).update(
+        status='Sent', sent_at=now, claim_token=None, last_error=None, attempts=F('attempts') + 1
+    )
+    for notification in batch:
+        if notification.id not in errors:
+            continue
+        attempts = notification.attempts + 1
+        Notification.objects.filter(pk=notification.pk).update(
+            status='Failed' if attempts >= MAX_ATTEMPTS else 'Pending',
+            attempts=attempts,
+            last_error=errors[notification.id][:1000],
+            claim_token=None,
+            next_attempt_at=now + timedelta(minutes=2 ** attempts),
+        )
+    return len(sent_ids), len(errors)
@@ -0,0 +1,295 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from core.cache import get_cache
+from core.models import Customer, InventoryLog, Outlet, Product, SaleItem, SaleTransaction, Tax
+from core.sales import add_room_order, checkout_room_session
+from karaoke.availability import IntervalIndex, free_rooms
+from karaoke.notifications import MAX_ATTEMPTS, BaseBackend, claim_batch, dispatch_pending, queue_notification
+from karaoke.models import BookingRequest, Notification, Room, RoomOrder, RoomOrderItem, RoomSession
+
+
+class KaraokeTestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.owner = User.objects.create_superuser('owner', password='pw')
+        self.outlet = Outlet.objects.create(name='Main', owner=self.owner)
+        self.room = Room.all_outlets.create(outlet=self.outlet, name='Room 1', price_per_hour=Decimal('100.00'))
+        self.product = Product.all_outlets.create(
+            outlet=self.outlet, name='Soda', selling_price=Decimal('5.00'), cost_price=Decimal('2.00'), current_stock_level=100,
+        )
+
+    def start_session(self, **kwargs):
+        return RoomSession.all_outlets.create(
+            outlet=self.outlet, room=self.room, customer_name='Guest', status='Active', started_at=timezone.now(), **kwargs
+        )
+
+    def add_order(self, session, quantity=2, price=Decimal('5.00')):
+        order = RoomOrder.all_outlets.create(
+            outlet=self.outlet, session=session, total_price=price * quantity, item_count=quantity,
+        )
+        RoomOrderItem.all_outlets.create(outlet=self.outlet, order=order, product=self.product, quantity=quantity, price=price)
+        order.add_to_session()
+        return order
+
+
+class RunningTotalsTests(KaraokeTestCase):
+    def counters(self, session):
+        session.refresh_from_db()
+        return session.food_beverage_charge, session.item_count, session.pending_order_count
+
+    def test_orders_keep_session_counters_in_sync(self):
+        session = self.start_session()
+        order = self.add_order(session)
+        self.add_order(session, quantity=1)
+        self.assertEqual(self.counters(session), (Decimal('15.00'), 3, 2))
+
+        self.assertTrue(order.mark_served())
+        self.assertFalse(order.mark_served())
+        self.assertEqual(self.counters(session), (Decimal('15.00'), 3, 1))
+
+        self.assertTrue(order.void())
+        self.assertFalse(order.void())
+        self.assertEqual(self.counters(session), (Decimal('5.00'), 1, 1))
+        self.assertEqual(RoomSession.rebuild_running_totals(RoomSession.all_outlets.all()), [])
+
+    def test_rebuild_fixes_drifted_counters(self):
+        session = self.start_session()
+        self.add_order(session)
+        RoomSession.all_outlets.filter(pk=session.pk).update(item_count=99)
+        self.assertEqual([s.pk for s in RoomSession.rebuild_running_totals(RoomSession.all_outlets.all())], [session.pk])
+        self.assertEqual(self.counters(session), (Decimal('10.00'), 2, 1))
+
+    def test_admin_changes_keep_counters_in_sync(self):
+        session = self.start_session()
+        order = self.add_order(session)
+        self.client.force_login(self.owner)
+        item = order.items.get()
+
+        response = self.client.post(f'/admin/karaoke/roomorderitem/{item.pk}/change/', {
+            'outlet': self.outlet.pk, 'order': order.pk, 'product': self.product.pk, 'quantity': 5, 'price': '5.00',
+        })
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.total_price, order.item_count), (Decimal('25.00'), 5))
+        self.assertEqual(self.counters(session), (Decimal('25.00'), 5, 1))
+
+        response = self.client.post(f'/admin/karaoke/roomorder/{order.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.counters(session), (Decimal('0.00'), 0, 0))
+
+    def test_moving_an_order_in_the_admin_updates_both_sessions(self):
+        session, other = self.start_session(), self.start_session()
+        order = self.add_order(session)
+        order.session = other
+        admin.site._registry[RoomOrder].save_model(None, order, SimpleNamespace(initial={'session': session.pk}), True)
+        self.assertEqual(self.counters(session), (Decimal('0.00'), 0, 0))
+        self.assertEqual(self.counters(other), (Decimal('10.00'), 2, 1))
+
+
+class AvailabilityTests(KaraokeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.room2 = Room.all_outlets.create(outlet=self.outlet, name='Room 2')
+        self.day = timezone.localdate() + timedelta(days=7)
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def test_interval_index_merges_and_answers_overlaps(self):
+        index = IntervalIndex([(1, 3), (5, 7), (3, 4)])
+        self.assertEqual(list(index), [(1, 4), (5, 7)])
+        self.assertTrue(index.is_free(4, 5))
+        self.assertFalse(index.is_free(6, 8))
+        self.assertEqual(index.free_slots(0, 10, min_length=2), [(7, 10)])
+
+    def test_free_rooms_excludes_approved_bookings(self):
+        BookingRequest.objects.create(
+            outlet=self.outlet, room=self.room, customer_name='A', status='Approved',
+            requested_date=self.day, requested_time=time(20), duration_minutes=120,
+        )
+        self.assertEqual(free_rooms(self.outlet, self.at(21), 60), [self.room2])
+        self.assertEqual(free_rooms(self.outlet, self.at(22), 60), [self.room, self.room2])
+
+    def test_availability_endpoint(self):
+        url = '/karaoke/api/availability/'
+        params = {'outlet': self.outlet.pk, 'date': self.day.isoformat(), 'time': '20:00'}
+        response = self.client.get(url, {**params, 'duration': 90})
+        self.assertEqual(response.json()['available_count'], 2)
+        self.assertEqual(response.json()['end'], self.at(21).replace(minute=30).isoformat())
+
+    def test_availability_rejects_bad_durations(self):
+        url = '/karaoke/api/availability/'
+        params = {'outlet': self.outlet.pk, 'date': self.day.isoformat(), 'time': '20:00'}
+        for duration in (0, -5, 24 * 60 + 1, 10 ** 12):
+            self.assertEqual(self.client.get(url, {**params, 'duration': duration}).status_code, 400, duration)
+        response = self.client.get(url, {**params, 'date': date.max.isoformat(), 'time': '23:00'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RecordingBackend(BaseBackend):
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    def send_batch(self, notifications):
+        self.sent.extend(n.subject for n in notifications if n.subject not in self.fail)
+        return {n.id: 'boom' for n in notifications if n.subject in self.fail}
+
+
+class NotificationOutboxTests(KaraokeTestCase):
+    def test_backends_must_implement_send_batch(self):
+        with self.assertRaises(TypeError):
+            BaseBackend()
+
+    def test_claimed_rows_are_not_claimed_again(self):
+        for i in range(3):
+            queue_notification(f"n{i}", 'body', outlet=self.outlet)
+        first = claim_batch(2)
+        second = claim_batch(5)
+        self.assertEqual(len(first), 2)
+        self.assertEqual([n.subject for n in second], ['n2'])
+        self.assertEqual(claim_batch(5), [])
+
+    def test_stale_claims_are_reclaimed(self):
+        queue_notification('stuck', 'body', outlet=self.outlet)
+        claim_batch(1)
+        Notification.objects.update(next_attempt_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual([n.subject for n in claim_batch(1)], ['stuck'])
+
+    def test_failures_back_off_then_give_up(self):
+        notification = queue_notification('bad', 'body', outlet=self.outlet)
+        queue_notification('good', 'body', outlet=self.outlet)
+        backend = RecordingBackend(fail={'bad'})
+        self.assertEqual(dispatch_pending(backend=backend), (1, 1))
+        self.assertEqual(backend.sent, ['good'])
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('Pending', 1))
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(minutes=1))
+        self.assertEqual(dispatch_pending(backend=backend), (0, 0))
+
+        for attempt in range(2, MAX_ATTEMPTS + 1):
+            Notification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+            dispatch_pending(backend=backend)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('Failed', MAX_ATTEMPTS))
+
+
+class RoomBoardCacheTests(KaraokeTestCase):
+    def board(self):
+        response = self.client.get('/karaoke/rooms/')
+        return {room['name']: room for room in response.context['rooms']}
+
+    def test_board_follows_sessions_and_orders(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.board()['Room 1']['status'], 'Available')
+
+        session = self.start_session()
+        self.assertEqual(self.board()['Room 1']['session_id'], session.pk)
+
+        self.add_order(session, quantity=3)
+        self.assertEqual(self.board()['Room 1']['item_count'], 3)
+
+        session.complete_session()
+        self.assertNotIn('session_id', self.board()['Room 1'])
+
+
+class RoomOrderTests(KaraokeTestCase):
+    def order(self, session, items):
+        self.client.force_login(self.owner)
+        return self.client.post(f'/karaoke/room-order/{session.pk}/', json.dumps({'items': items}), content_type='application/json')
+
+    def test_orders_are_priced_from_the_menu(self):
+        session = self.start_session()
+        self.assertEqual(self.order(session, [{'id': self.product.pk, 'quantity': 3, 'price': 5}]).status_code, 200)
+        item = RoomOrderItem.all_outlets.get()
+        self.assertEqual((item.price, item.unit_cost), (Decimal('5.00'), Decimal('2.00')))
+        session.refresh_from_db()
+        self.assertEqual((session.food_beverage_charge, session.item_count), (Decimal('15.00'), 3))
+
+    def test_tampered_and_malformed_orders_are_rejected(self):
+        session = self.start_session()
+        for items in ([{'id': self.product.pk, 'quantity': 1, 'price': '0.01'}], [{'quantity': 1}], []):
+            self.assertEqual(self.order(session, items).status_code, 400, items)
+        self.assertFalse(RoomOrder.all_outlets.exists())
+
+    def test_closed_sessions_take_no_orders(self):
+        session = self.start_session()
+        session.complete_session()
+        self.assertEqual(self.order(session, [{'id': self.product.pk, 'quantity': 1}]).status_code, 400)
+
+    def test_orders_after_checkout_are_rejected(self):
+        session = self.start_session()
+        checkout_room_session(self.outlet, session.pk)
+        # session still holds the status read before checkout, as a tablet request racing it would
+        with self.assertRaises(ValueError):
+            add_room_order(session, [{'id': self.product.pk, 'quantity': 1}])
+        self.assertEqual(self.order(session, [{'id': self.product.pk, 'quantity': 1}]).status_code, 400)
+        self.assertFalse(RoomOrder.all_outlets.exists())
+
+
+class RoomCheckoutTests(KaraokeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(outlet=self.outlet, name='Regular')
+        self.session = self.start_session(customer=self.customer)
+        self.add_order(self.session, quantity=4)
+
+    def test_checkout_is_idempotent(self):
+        self.client.force_login(self.owner)
+        url = f'/karaoke/session/checkout/{self.session.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(SaleTransaction.all_outlets.exists())
+
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'payment_method': 'Credit'}).status_code, 302)
+        sale = SaleTransaction.all_outlets.get()
+        self.assertEqual(sale.room_session.pk, self.session.pk)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.current_balance, sale.total_amount)
+        self.assertRedirects(self.client.get(url), f'/receipt/{sale.pk}/')
+
+        sale_again, created = checkout_room_session(self.outlet, self.session.pk)
+        self.assertEqual((sale_again.pk, created), (sale.pk, False))
+
+    def test_room_lines_leave_stock_once(self):
+        sale, created = checkout_room_session(self.outlet, self.session.pk)
+        self.assertTrue(created)
+        self.assertEqual(list(SaleItem.all_outlets.filter(sale=sale).values_list('quantity', 'unit_cost')), [(4, Decimal('2.00'))])
+        checkout_room_session(self.outlet, self.session.pk)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_stock_level, 96)
+        self.assertEqual(InventoryLog.all_outlets.get(product=self.product).reference, f"Transaction #{sale.pk}")
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.status, 'Cleaning')
+
+    def test_cancelled_sessions_are_not_charged(self):
+        RoomSession.all_outlets.filter(pk=self.session.pk).update(status='Cancelled')
+        with self.assertRaises(ValueError):
+            checkout_room_session(self.outlet, self.session.pk)
+        self.assertFalse(SaleTransaction.all_outlets.exists())
+
+
+class BillTotalsTests(KaraokeTestCase):
+    def test_preview_tablet_and_checkout_agree(self):
+        service = Tax.all_outlets.create(outlet=self.outlet, name='Service', rate=Decimal('10.00'), applies_to_rooms=True)
+        self.product.taxes.add(service)
+        session = self.start_session()
+        RoomSession.all_outlets.filter(pk=session.pk).update(started_at=timezone.now() - timedelta(minutes=90, seconds=20))
+        self.add_order(session, quantity=3)
+
+        self.client.force_login(self.owner)
+        tablet = self.client.get(f'/karaoke/api/session/{session.pk}/bill/').json()
+        preview = self.client.get(f'/karaoke/session/preview/{session.pk}/').content.decode()
+        sale, _ = checkout_room_session(self.outlet, session.pk)
+        self.assertEqual(sale.total_amount, Decimal('181.50'))
+        self.assertEqual((tablet['tax_total'], tablet['grand_total']), (16.5, 181.5))
+        self.assertIn('MVR 181.50', preview)
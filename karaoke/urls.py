@@ -1,9 +1,11 @@
 from django.urls import path
+from django.views.generic import RedirectView
+from core import views as core_views
 from . import views
 
 urlpatterns = [
     # Dashboard & Management
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', views.dashboard, name='karaoke_dashboard'),
     path('summary/', views.daily_summary, name='daily_summary'),
     path('monitor/', views.karaoke_list, name='karaoke_monitor'),
     
@@ -21,11 +23,11 @@ urlpatterns = [
     path('room-order/<int:session_id>/', views.add_to_room_order, name='add_to_room_order'),
     path('tablet-order/<int:session_id>/', views.customer_tablet_order, name='tablet_order'),
     
-    # POS & Sales
-    path('pos/', views.record_sale, name='record_sale'),
-    path('submit-sale/', views.submit_sale, name='submit_sale'),
-    path('sales-history/', views.sales_history, name='sales_history'),
-    path('receipt/<int:transaction_id>/', views.receipt_detail, name='receipt_detail'),
+    # POS & Sales: served by the core views; the old karaoke URLs still work
+    path('pos/', RedirectView.as_view(pattern_name='record_sale', permanent=True)),
+    path('submit-sale/', core_views.submit_sale),
+    path('sales-history/', RedirectView.as_view(pattern_name='sales_history', permanent=True, query_string=True)),
+    path('receipt/<int:transaction_id>/', RedirectView.as_view(pattern_name='receipt_detail', permanent=True)),
     
     # Customers & Loyalty
     path('customers/', views.customer_list, name='customer_list'),
@@ -33,8 +35,8 @@ urlpatterns = [
     path('customers/pay-credit/<int:customer_id>/', views.pay_credit, name='pay_credit'),
     
     # Inventory & Tools
-    path('low-stock/', views.low_stock_report, name='low_stock_report'),
-    path('toggle-favorite/<int:product_id>/', views.toggle_favorite, name='toggle_favorite'),
+    path('low-stock/', RedirectView.as_view(pattern_name='low_stock_report', permanent=True, query_string=True)),
+    path('toggle-favorite/<int:product_id>/', core_views.toggle_favorite),
     
     # Public Booking
     path('booking/', views.booking_landing, name='booking_landing'),
@@ -42,6 +44,7 @@ urlpatterns = [
     path('booking/submit/', views.submit_booking_request, name='submit_booking_request'),
     path('welcome/submit/', views.submit_booking_request, name='submit_booking_legacy'),
     path('booking/approve/<int:booking_id>/', views.approve_booking, name='approve_booking'),
+    path('api/availability/', views.check_availability, name='check_availability'),
     
     # Live Bill API for Tablet
     path('api/session/<int:session_id>/bill/', views.get_session_bill, name='get_session_bill'),
@@ -1,56 +1,66 @@
 import json
 from decimal import Decimal
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.db.models import Sum, Count
 from core.models import Outlet, Product, SaleTransaction, Customer, SaleItem, CreditPayment
+from core.cache import cached
+from core.multi_tenant import get_current_outlet, tenant_exempt
+from core.sales import day_takings, add_room_order, checkout_room_session, room_bill, PAYMENT_METHODS
+from CafeManager.db_routers import read_replica
 from .models import RoomSession, BookingRequest, RoomOrder, RoomOrderItem, Room
+from .availability import free_rooms, day_free_slots, booking_start
+from .notifications import queue_notification
 
 # --- CONFIGURATION ---
-PAYMENT_METHODS = ['Cash', 'Transfer', 'Card', 'Credit']
 CURRENCY = "MVR"
 
 def get_user_outlet(user):
+    # The outlet OutletMiddleware resolved for this request, if any
+    outlet = get_current_outlet()
+    if outlet is not None:
+        return outlet
     try:
         return user.employee.outlet 
     except:
         return Outlet.objects.first()
 
-def notify_sita(subject, message):
-    try:
-        send_mail(subject, message, 'system@chillokay.com', ['sita@chillokay.com'], fail_silently=True)
-    except:
-        pass
+def get_public_outlet(request):
+    """Outlet for unauthenticated pages: ?outlet=<id>, else the first outlet with rooms."""
+    outlet_id = request.POST.get('outlet') or request.GET.get('outlet')
+    if outlet_id and str(outlet_id).isdigit():
+        return Outlet.objects.filter(pk=outlet_id).first()
+    return Outlet.objects.filter(karaoke_rooms__isnull=False).first() or Outlet.objects.first()
+
+def notify_sita(subject, message, outlet=None):
+    """Queue a staff notification; delivered by the dispatch_notifications worker."""
+    return queue_notification(subject, message, outlet=outlet)
 
 
 @login_required
 def preview_bill(request, session_id):
     """Preview bill without modifying session state."""
     from django.utils.html import escape
-    session = get_object_or_404(RoomSession, id=session_id)
+    session = get_object_or_404(RoomSession.objects.select_related('room'), id=session_id)
     outlet = get_user_outlet(request.user)
     
     if session.outlet != outlet:
         return HttpResponse("<p>Session not found.</p>")
     
-    # Use session's base_rate (set when session started) or room's hourly rate
-    room_rate = session.base_rate or session.room.price_per_hour or Decimal('100')
-    
-    # Calculate duration
-    if session.started_at:
-        duration = timezone.now() - session.started_at
-        hours = max(1, round(duration.total_seconds() / 3600))
-    else:
-        hours = 1
-    
-    room_charge = Decimal(hours) * room_rate
-    kitchen_total = session.orders.aggregate(Sum('total_price'))['total_price__sum'] or Decimal('0')
-    grand_total = room_charge + kitchen_total
+    # Same figures checkout charges, as if the session ended now; nothing is saved
+    bill = room_bill(session)
+    hours = Decimal(session.actual_duration_minutes) / 60
+    room_charge = session.room_charge + session.extra_time_charge
+    kitchen_total = session.food_beverage_charge
+    tax_rows = ''.join(
+        f'<tr><td>{escape(tax["name"])} ({tax["rate"]:g}%)</td><td class="text-end fw-semibold">{CURRENCY} {tax["amount"]:.2f}</td></tr>'
+        for tax in bill['taxes']['components']
+    )
     
     # Escape user-provided data
     room_name = escape(session.room.name)
@@ -61,9 +71,10 @@ def preview_bill(request, session_id):
         <h6 class="fw-bold mb-3" style="color: #1a1a2e;">Bill Preview - {room_name}</h6>
         <p class="text-muted small mb-2">Customer: {customer_name}</p>
         <table class="table table-sm">
-            <tr><td>Room ({hours} hrs @ {room_rate})</td><td class="text-end fw-semibold">{CURRENCY} {room_charge:.2f}</td></tr>
+            <tr><td>Room ({hours:.1f} hrs)</td><td class="text-end fw-semibold">{CURRENCY} {room_charge:.2f}</td></tr>
             <tr><td>Food & Beverages</td><td class="text-end fw-semibold">{CURRENCY} {kitchen_total:.2f}</td></tr>
-            <tr class="table-light"><td class="fw-bold">Total</td><td class="text-end fw-bold" style="color: #1a1a2e;">{CURRENCY} {grand_total:.2f}</td></tr>
+            {tax_rows}
+            <tr class="table-light"><td class="fw-bold">Total</td><td class="text-end fw-bold" style="color: #1a1a2e;">{CURRENCY} {bill['grand_total']:.2f}</td></tr>
         </table>
         <p class="text-muted small mt-2 mb-0"><i class="fas fa-info-circle me-1"></i> This is a preview. Session is still active.</p>
     </div>
@@ -73,65 +84,38 @@ def preview_bill(request, session_id):
 
 @login_required
 def checkout_session(request, session_id):
-    """Checkout and close a karaoke session."""
-    session = get_object_or_404(RoomSession, id=session_id)
+    """Show a session's bill (GET, read-only) and take its payment (POST, once)."""
+    session = get_object_or_404(RoomSession.objects.select_related('room', 'customer'), id=session_id)
     outlet = get_user_outlet(request.user)
     
     # Ensure outlet isolation
-    if session.outlet != outlet:
+    if session.outlet_id != outlet.pk:
         return redirect('karaoke_list')
-    
-    # Complete session and calculate charges
-    session.complete_session()
-    kitchen_total = session.orders.aggregate(Sum('total_price'))['total_price__sum'] or Decimal('0')
-    session.food_beverage_charge = Decimal(kitchen_total)
-    session.recalculate_total()
 
     if request.method == 'POST':
-        payment_method = request.POST.get('payment_method', 'Cash')
-        
-        # Credit sales require a linked customer
-        if payment_method == 'Credit' and not session.customer:
-            messages.error(request, "Credit payment requires a registered customer account.")
-            return render(request, 'karaoke/checkout.html', {
-                'session': session, 'room_charge': session.room_charge,
-                'extra_time_charge': session.extra_time_charge,
-                'kitchen_total': session.food_beverage_charge,
-                'grand_total': session.total_charge,
-                'payment_methods': PAYMENT_METHODS, 'currency': CURRENCY
-            })
-        
-        session.status = 'Completed'
-        session.save()
-        
-        # Record payment
-        SaleTransaction.objects.create(
-            outlet=outlet, 
-            customer=session.customer,
-            total_amount=session.total_charge,
-            payment_method=payment_method,
-            customer_name=session.customer_name, 
-            status='Completed'
-        )
-        
-        # Update customer balance for credit sales
-        if payment_method == 'Credit' and session.customer:
-            session.customer.current_balance += session.total_charge
-            session.customer.total_credit += session.total_charge
-            session.customer.save()
-        
-        # Mark room as available for cleaning
-        session.room.status = 'Cleaning'
-        session.room.save()
-        
-        return redirect('karaoke_list')
-
+        try:
+            sale, created = checkout_room_session(outlet, session.pk, request.POST.get('payment_method', 'Cash'))
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            if created:
+                messages.success(request, f"{session.room.name} checked out: {CURRENCY} {sale.total_amount}.")
+            else:
+                messages.info(request, f"{session.room.name} was already checked out.")
+            return redirect('karaoke_list')
+    elif session.sale_id:
+        # Already paid: refreshing the checkout page shows the receipt instead of a new bill
+        return redirect('receipt_detail', session.sale_id)
+
+    # Charges as if the session ended now; nothing is saved until the payment is taken
+    bill = room_bill(session)
     return render(request, 'karaoke/checkout.html', {
         'session': session,
         'room_charge': session.room_charge,
         'extra_time_charge': session.extra_time_charge,
         'kitchen_total': session.food_beverage_charge,
-        'grand_total': session.total_charge,
+        'taxes': bill['taxes']['components'],
+        'grand_total': bill['grand_total'],
         'payment_methods': PAYMENT_METHODS,
         'currency': CURRENCY
     })
@@ -164,65 +148,175 @@ def manage_session(request, session_id):
     })
 
 # --- PUBLIC & BOOKING VIEWS ---
+@tenant_exempt
 def booking_landing(request):
-    return render(request, 'karaoke/booking_landing.html')
-
+    return render(request, 'karaoke/booking_landing.html', {'outlet': get_public_outlet(request)})
+
+# Longest slot a booking or availability query may ask for
+MAX_BOOKING_MINUTES = 24 * 60
+
+def parse_booking_slot(data):
+    """
+    Parse date/time/duration from request data. Returns (start, duration_minutes) or raises
+    ValueError (OverflowError for dates at the edge of the calendar).
+    """
+    day = date.fromisoformat(data.get('requested_date') or data.get('date') or '')
+    at = time.fromisoformat(data.get('requested_time') or data.get('time') or '')
+    duration = int(data.get('duration') or 60)
+    if not 0 < duration <= MAX_BOOKING_MINUTES:
+        raise ValueError(f"Duration must be between 1 and {MAX_BOOKING_MINUTES} minutes")
+    if day == date.max:
+        raise ValueError("The slot must end on a bookable date")
+    return timezone.make_aware(datetime.combine(day, at)), duration
+
+@tenant_exempt
 def submit_booking_request(request):
     if request.method == 'POST':
         customer_name = request.POST.get('customer_name')
-        BookingRequest.objects.create(
-            customer_name=customer_name,
-            phone_number=request.POST.get('phone_number'),
-            requested_date=request.POST.get('requested_date'),
-            requested_time=request.POST.get('requested_time'),
-            duration_minutes=request.POST.get('duration')
-        )
-        notify_sita("New Booking!", f"{customer_name} submitted a request.")
+        outlet = get_public_outlet(request)
+        try:
+            start, duration = parse_booking_slot(request.POST)
+        except (ValueError, OverflowError):
+            return render(request, 'karaoke/booking_landing.html', {
+                'outlet': outlet, 'booking_error': "Please choose a valid date, time and duration."
+            })
+
+        if outlet and not free_rooms(outlet, start, duration):
+            return render(request, 'karaoke/booking_landing.html', {
+                'outlet': outlet,
+                'booking_error': f"Sorry, no rooms are free on {start:%d %b} from {start:%H:%M} for {duration // 60}h {duration % 60:02d}m. Please try another time.",
+            })
+
+        with transaction.atomic():
+            BookingRequest.objects.create(
+                outlet=outlet,
+                customer_name=customer_name,
+                phone_number=request.POST.get('phone_number'),
+                requested_date=start.date(),
+                requested_time=start.time(),
+                duration_minutes=duration
+            )
+            notify_sita("New Booking!", f"{customer_name} submitted a request.", outlet=outlet)
         return render(request, 'karaoke/booking_success.html', {'name': customer_name})
     return redirect('booking_landing')
 
+@tenant_exempt
+def check_availability(request):
+    """
+    Public availability API.
+    With ?date=&time=&duration= returns the rooms free for that whole slot;
+    with only ?date= returns each room's free slots for the day.
+    """
+    outlet = get_public_outlet(request)
+    if outlet is None:
+        return JsonResponse({'success': False, 'error': 'Outlet not found'}, status=404)
+
+    if request.GET.get('time'):
+        try:
+            start, duration = parse_booking_slot(request.GET)
+            end = start + timedelta(minutes=duration)
+        except (ValueError, OverflowError):
+            return JsonResponse({'success': False, 'error': 'Invalid date, time or duration'}, status=400)
+        rooms = free_rooms(outlet, start, duration)
+        return JsonResponse({
+            'success': True,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'duration_minutes': duration,
+            'available_count': len(rooms),
+            'available_rooms': [
+                {
+                    'id': room.id,
+                    'name': room.name,
+                    'room_type': room.room_type,
+                    'capacity': room.capacity,
+                    'price_per_hour': str(room.price_per_hour),
+                }
+                for room in rooms
+            ],
+        })
+
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date'}, status=400)
+    return JsonResponse({
+        'success': True,
+        'date': day.isoformat(),
+        'rooms': [
+            {
+                'id': room.id,
+                'name': room.name,
+                'room_type': room.room_type,
+                'capacity': room.capacity,
+                'free_slots': [
+                    {'start': timezone.localtime(start).isoformat(), 'end': timezone.localtime(end).isoformat()}
+                    for start, end in slots
+                ],
+            }
+            for room, slots in day_free_slots(outlet, day)
+        ],
+    })
+
 @login_required
 def approve_booking(request, booking_id):
-    """Approve a pending booking request."""
+    """Approve a pending booking request and assign it a free room."""
     if request.method == 'POST':
         booking = get_object_or_404(BookingRequest, id=booking_id)
+        outlet = booking.outlet or get_user_outlet(request.user)
+        rooms = free_rooms(outlet, booking_start(booking), booking.duration_minutes, exclude_booking=booking)
+        if not rooms:
+            messages.error(request, f"No room is free for {booking.customer_name}'s requested slot.")
+            return redirect('karaoke_list')
+        booking.outlet = outlet
+        if booking.room not in rooms:
+            booking.room = rooms[0]
         booking.status = 'Approved'
         booking.save()
-        messages.success(request, f"Booking for {booking.customer_name} has been approved!")
+        messages.success(request, f"Booking for {booking.customer_name} has been approved for {booking.room.name}!")
     return redirect('karaoke_list')
 
 # --- DASHBOARD ---
+@cached('catalog')
+def category_counts(outlet):
+    """Product count per category for an outlet."""
+    return list(Product.objects.filter(outlet=outlet).values('category').annotate(item_count=Count('id')).order_by('category'))
+
+@cached('dashboard')
+def dashboard_figures(outlet, day):
+    """The karaoke dashboard's takings and stock figures for day (an ISO date)."""
+    products = Product.objects.filter(outlet=outlet)
+    return {
+        'total_sales': day_takings(outlet, date.fromisoformat(day))['total'],
+        'total_products': products.count(),
+        'low_stock_count': products.filter(components__isnull=True, current_stock_level__lt=10).count(),
+    }
+
 @login_required
 def dashboard(request):
     outlet = get_user_outlet(request.user)
     today = timezone.now().date()
-    today_sales = SaleTransaction.objects.filter(outlet=outlet, date__date=today)
-    total_rev = today_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
     hot_picks = RoomOrderItem.objects.filter(order__session__outlet=outlet).values('product__name').annotate(total_qty=Sum('quantity')).order_by('-total_qty')[:5]
-    low_stock_items = Product.objects.filter(outlet=outlet, current_stock_level__lt=10).count()
-    categories = Product.objects.filter(outlet=outlet).values('category').annotate(item_count=Count('id')).order_by('category')
+    categories = category_counts(outlet)
 
     return render(request, 'karaoke/dashboard.html', {
-        'total_sales': total_rev,
-        'total_products': Product.objects.filter(outlet=outlet).count(),
-        'low_stock_count': low_stock_items,
+        **dashboard_figures(outlet, today.isoformat()),
         'hot_picks': hot_picks,
         'categories': categories,
         'pending_bookings_count': BookingRequest.objects.filter(status='Pending').count()
     })
 
 # --- ROOM SESSIONS & TABLET ORDERING ---
-@login_required
-def karaoke_list(request):
-    outlet = request.outlet  # Use middleware-provided outlet
+@cached('rooms')
+def room_board(outlet):
+    """One card per room of the outlet, with the open session's running order totals."""
     active_sessions = RoomSession.objects.filter(outlet=outlet, status__in=['Booked', 'Active', 'Paused'])
-    bookings = BookingRequest.objects.filter(status='Pending').order_by('requested_date')
-    
-    # Get actual rooms from database
-    actual_rooms = Room.objects.filter(outlet=outlet)
+    sessions_by_room = {}
+    for active in active_sessions.order_by('-started_at'):
+        sessions_by_room.setdefault(active.room_id, active)
+
     rooms = []
-    
-    for room in actual_rooms:
+    for room in Room.objects.filter(outlet=outlet):
         room_data = {
             'id': room.id,
             'name': room.name,
@@ -234,23 +328,31 @@ def karaoke_list(request):
         }
         
         # Check if there's an active session in this room
-        session = active_sessions.filter(room=room).first()
+        session = sessions_by_room.get(room.id)
         if session:
             room_data.update({
                 'status': 'Occupied',
                 'color': 'danger',
                 'session_id': session.id,
                 'customer_name': session.customer_name,
-                'order_total': session.orders.aggregate(Sum('total_price'))['total_price__sum'] or 0
+                'order_total': session.food_beverage_charge,
+                'item_count': session.item_count,
+                'pending_order_count': session.pending_order_count,
             })
         
         rooms.append(room_data)
+    return rooms
+
+@login_required
+def karaoke_list(request):
+    outlet = request.outlet  # Use middleware-provided outlet
+    bookings = BookingRequest.objects.filter(status='Pending').order_by('requested_date')
     
     # Pass available_rooms for the start session modal
     available_rooms = Room.objects.filter(outlet=outlet)
     
     return render(request, 'karaoke/rooms.html', {
-        'rooms': rooms, 
+        'rooms': room_board(outlet), 
         'available_rooms': available_rooms,
         'bookings': bookings,
         'currency': CURRENCY
@@ -282,23 +384,20 @@ def start_session(request):
     rooms = Room.objects.filter(outlet=outlet, status='Available')
     return render(request, 'karaoke/start_session.html', {'rooms': rooms})
 
+@tenant_exempt
 def customer_tablet_order(request, session_id):
     session = get_object_or_404(RoomSession, id=session_id, status__in=['Booked', 'Active', 'Paused'])
     products = Product.objects.filter(outlet=session.outlet).exclude(category='Room Rate')
     return render(request, 'karaoke/tablet_order.html', {'session': session, 'products': products})
 
+@tenant_exempt
 def get_session_bill(request, session_id):
     """API endpoint for live bill display on customer tablet."""
-    session = get_object_or_404(RoomSession, id=session_id)
-    
-    duration_seconds = (timezone.now() - session.started_at).total_seconds()
-    hours = max(1, round(duration_seconds / 3600))
-    rate = 150 if "VIP" in session.room.name else session.room.get_hourly_rate()
-    room_charge = float(hours * rate)
+    session = get_object_or_404(RoomSession.objects.select_related('room'), id=session_id)
+    status = session.status
     
     orders_data = []
-    kitchen_total = 0
-    for order in session.orders.all():
+    for order in session.orders.prefetch_related('items__product'):
         order_items = []
         for item in order.items.all():
             order_items.append({
@@ -307,7 +406,6 @@ def get_session_bill(request, session_id):
                 'price': float(item.price),
                 'subtotal': float(item.price * item.quantity)
             })
-            kitchen_total += float(item.price * item.quantity)
         orders_data.append({
             'id': order.id,
             'status': 'Served' if order.is_served else 'Pending',
@@ -315,32 +413,31 @@ def get_session_bill(request, session_id):
             'total': float(order.total_price)
         })
     
+    # Same figures checkout charges, as if the session ended now; nothing is saved
+    bill = room_bill(session)
     return JsonResponse({
         'session_id': session.id,
         'room_name': session.room.name,
         'customer_name': session.customer_name,
-        'status': session.status,
-        'duration_hours': hours,
-        'room_charge': room_charge,
+        'status': status,
+        'duration_hours': round(session.actual_duration_minutes / 60, 1),
+        'room_charge': float(session.room_charge + session.extra_time_charge),
         'orders': orders_data,
-        'kitchen_total': kitchen_total,
-        'grand_total': room_charge + kitchen_total
+        'item_count': session.item_count,
+        'kitchen_total': float(session.food_beverage_charge),
+        'tax_total': float(bill['taxes']['tax_total']),
+        'grand_total': float(bill['grand_total'])
     })
 
 @login_required
 def add_to_room_order(request, session_id):
     if request.method == 'POST':
         session = get_object_or_404(RoomSession, id=session_id)
-        data = json.loads(request.body)
-        order = RoomOrder.objects.create(session=session)
-        total = 0
-        for item in data.get('items', []):
-            prod = Product.objects.get(id=item['id'])
-            qty = int(item['quantity'])
-            RoomOrderItem.objects.create(order=order, product=prod, quantity=qty, price=prod.selling_price)
-            total += (prod.selling_price * qty)
-        order.total_price = total
-        order.save()
+        try:
+            data = json.loads(request.body)
+            add_room_order(session, data.get('items', []))
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
         return JsonResponse({'success': True})
     return JsonResponse({'success': False})
 
@@ -352,76 +449,19 @@ def void_order(request, order_id):
         return redirect('kitchen_view')
         
     order = get_object_or_404(RoomOrder, id=order_id)
-    # Simply delete the order so it leaves the kitchen view and the bill
-    order.delete()
+    # Delete the order so it leaves the kitchen view and the session's running bill
+    order.void()
     messages.success(request, "Order was successfully voided.")
     return redirect('kitchen_view')
 
-# --- POS & SALES ---
-@login_required
-def record_sale(request):
-    outlet = get_user_outlet(request.user)
-    return render(request, 'core/pos.html', {
-        'products': Product.objects.filter(outlet=outlet),
-        'customers': Customer.objects.all(),
-        'payment_methods': PAYMENT_METHODS,
-        'categories': Product.objects.filter(outlet=outlet).values_list('category', flat=True).distinct()
-    })
-
-@login_required
-def submit_sale(request):
-    if request.method == 'POST':
-        data = json.loads(request.body)
-        outlet = get_user_outlet(request.user)
-        customer_id = data.get('customer_id')
-        customer = Customer.objects.filter(id=customer_id).first() if customer_id else None
-        payment_method = data.get('payment_method', 'Cash')
-        total_amount = Decimal(data.get('total_price'))
-        
-        # Credit sales require a customer
-        if payment_method == 'Credit' and not customer:
-            return JsonResponse({'success': False, 'error': 'Credit sales require a customer account'})
-        
-        transaction = SaleTransaction.objects.create(
-            outlet=outlet,
-            customer=customer,
-            customer_name=data.get('customer_name', 'Walk-in'),
-            table_number=data.get('table_number', 'Counter'),
-            total_amount=total_amount,
-            payment_method=payment_method,
-            status='Completed'
-        )
-        
-        # Deduct inventory for all payment methods including credit
-        for item in data.get('items', []):
-            product = Product.objects.get(id=item['id'])
-            SaleItem.objects.create(sale=transaction, product=product, quantity=item['quantity'], price=product.selling_price)
-            product.current_stock_level -= int(item['quantity'])
-            product.save()
-
-        if customer:
-            customer.visit_count += 1
-            # Update customer balance for credit sales
-            if payment_method == 'Credit':
-                customer.current_balance += total_amount
-                customer.total_credit += total_amount
-            customer.save()
-
-        return JsonResponse({'success': True, 'transaction_id': transaction.id})
-    return JsonResponse({'success': False})
-
 # --- DAILY SUMMARY ---
 @login_required
+@read_replica
 def daily_summary(request):
     outlet = get_user_outlet(request.user)
     today = timezone.now().date()
     sales_today = SaleTransaction.objects.filter(outlet=outlet, date__date=today)
-    
-    total_revenue = sales_today.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    cash_total = sales_today.filter(payment_method='Cash').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    card_total = sales_today.filter(payment_method='Card').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    transfer_total = sales_today.filter(payment_method='Transfer').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    credit_sales = sales_today.filter(payment_method='Credit').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+    takings = day_takings(outlet, today)
     
     # Track credit repayments separately (from dedicated CreditPayment model)
     credit_repayments = CreditPayment.objects.filter(outlet=outlet, date__date=today).aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
@@ -430,11 +470,11 @@ def daily_summary(request):
 
     return render(request, 'karaoke/summary.html', {
         'today': today,
-        'total_revenue': total_revenue,
-        'cash_total': cash_total,
-        'card_total': card_total,
-        'transfer_total': transfer_total,
-        'credit_sales': credit_sales,
+        'total_revenue': takings['total'],
+        'cash_total': takings['Cash'],
+        'card_total': takings['Card'],
+        'transfer_total': takings['Transfer'],
+        'credit_sales': takings['Credit'],
         'credit_repayments': credit_repayments,
         'best_sellers': best_sellers,
         'recent_sales': sales_today.order_by('-date')[:20]
@@ -448,18 +488,23 @@ def pay_credit(request, customer_id):
     
     if request.method == 'POST':
         amount = Decimal(request.POST.get('amount', 0))
-        if amount > 0 and amount <= customer.current_balance:
-            # Reduce outstanding balance
-            customer.current_balance -= amount
-            customer.save()
-            
-            # Record repayment using dedicated CreditPayment model (not SaleTransaction)
-            CreditPayment.objects.create(
-                outlet=outlet,
-                customer=customer,
-                amount_paid=amount,
-                notes=f"Credit payment received via POS"
-            )
+        with transaction.atomic():
+            # Check the balance under a row lock so concurrent payments can't overdraw it
+            customer = Customer.objects.select_for_update().get(pk=customer.pk)
+            valid = amount > 0 and amount <= customer.current_balance
+            if valid:
+                # Reduce outstanding balance
+                customer.current_balance -= amount
+                customer.save()
+
+                # Record repayment using dedicated CreditPayment model (not SaleTransaction)
+                CreditPayment.objects.create(
+                    outlet=outlet,
+                    customer=customer,
+                    amount_paid=amount,
+                    notes=f"Credit payment received via POS"
+                )
+        if valid:
             messages.success(request, f"Payment of {CURRENCY} {amount} received. Remaining balance: {CURRENCY} {customer.current_balance}")
         else:
             messages.error(request, "Invalid payment amount.")
@@ -479,39 +524,17 @@ def kitchen_view(request):
 @login_required
 def complete_order(request, order_id):
     order = get_object_or_404(RoomOrder, id=order_id)
-    order.is_served = True
-    order.save()
+    order.mark_served()
     return redirect('kitchen_view')
 
-@login_required
-def sales_history(request):
-    return render(request, 'karaoke/sales_history.html', {'sales': SaleTransaction.objects.all().order_by('-date')})
-
-@login_required
-def receipt_detail(request, transaction_id):
-    sale = get_object_or_404(SaleTransaction, id=transaction_id)
-    return render(request, 'karaoke/receipt.html', {'sale': sale})
-
 @login_required
 def customer_list(request):
     return render(request, 'karaoke/customers.html', {'customers': Customer.objects.all()})
 
 @login_required
+@read_replica
 def customer_history(request, customer_id):
     customer = get_object_or_404(Customer, id=customer_id)
     sales = SaleTransaction.objects.filter(customer=customer).order_by('-date')
     preferences = SaleItem.objects.filter(sale__customer=customer).values('product__name').annotate(total_qty=Sum('quantity')).order_by('-total_qty')[:10]
     return render(request, 'karaoke/customer_history.html', {'customer': customer, 'sales': sales, 'preferences': preferences})
-
-@login_required
-def low_stock_report(request):
-    outlet = get_user_outlet(request.user)
-    products = Product.objects.filter(outlet=outlet, current_stock_level__lt=10).order_by('current_stock_level')
-    return render(request, 'karaoke/low_stock.html', {'products': products, 'threshold': 10})
-
-@login_required
-def toggle_favorite(request, product_id):
-    p = get_object_or_404(Product, id=product_id)
-    p.is_favorite = not p.is_favorite
-    p.save()
-    return JsonResponse({'success': True, 'is_favorite': p.is_favorite})
\ No newline at end of file